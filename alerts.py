@@ -0,0 +1,231 @@
+import collections
+import json
+import queue
+import threading
+import time
+import urllib.request
+from discovery import EVENT_JOIN, EVENT_LEAVE, EVENT_MAC_CHANGE
+
+# --- Параметры правил ---
+DEBOUNCE = 300.0        # одно и то же оповещение по узлу — не чаще раза в DEBOUNCE с
+DOWN_AFTER_FAILS = 3    # пингов подряд без ответа, после которых отвечавший узел считается упавшим
+LOG_SIZE = 200          # сколько последних оповещений хранится для панели и /state
+WEBHOOK_TIMEOUT = 5.0
+
+# --- Правила ---
+RULE_NEW_DEVICE = "new_device"      # MAC, которого сеть еще не видела
+RULE_DEVICE_DOWN = "device_down"    # узел пропал из свипов или перестал отвечать на пинги
+RULE_DEVICE_UP = "device_up"        # пропавший узел вернулся
+RULE_MAC_CHANGE = "mac_change"      # у IP сменился MAC — возможна подмена ARP
+RULE_MAC_CONFLICT = "mac_conflict"  # один MAC отвечает за несколько IP
+SEVERITY = {RULE_NEW_DEVICE: "info", RULE_DEVICE_DOWN: "warning", RULE_DEVICE_UP: "info",
+            RULE_MAC_CHANGE: "critical", RULE_MAC_CONFLICT: "warning"}
+
+
+def format_alert(alert):
+    return (time.strftime("%H:%M:%S", time.localtime(alert['ts'])) +
+            f" [{alert['severity'].upper()}] {alert['message']}")
+
+
+# --- Получатели оповещений ---
+class StdoutSink:
+    def __call__(self, alert):
+        print(format_alert(alert))
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """Дописывает оповещения в файл, по одному JSON-объекту на строку."""
+
+    def __init__(self, path):
+        self._file = open(path, "a", encoding="utf-8")
+
+    def __call__(self, alert):
+        self._file.write(json.dumps(alert, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+
+class WebhookSink(threading.Thread):
+    """POST оповещения в JSON на URL из отдельного потока: медленный приемник не задерживает опрос ядра."""
+
+    def __init__(self, url, timeout=WEBHOOK_TIMEOUT):
+        super().__init__(name="alert-webhook", daemon=True)
+        self.url = url
+        self.timeout = timeout
+        self._queue = queue.SimpleQueue()
+        self.start()
+
+    def __call__(self, alert):
+        self._queue.put(alert)
+
+    def run(self):
+        while True:
+            alert = self._queue.get()
+            if alert is None: return
+            request = urllib.request.Request(self.url, data=json.dumps(alert).encode(),
+                                             headers={"Content-Type": "application/json"})
+            try:
+                urllib.request.urlopen(request, timeout=self.timeout).close()
+            except OSError as e:
+                print(f"Не удалось отправить оповещение на {self.url}: {e}")
+
+    def close(self):
+        self._queue.put(None)
+        self.join(timeout=self.timeout)
+
+
+def make_sink(spec):
+    """'stdout', 'http(s)://...' (webhook) или путь к файлу ('file:PATH' или просто PATH)."""
+    if spec in ("stdout", "-"):
+        return StdoutSink()
+    if spec.startswith(("http://", "https://")):
+        return WebhookSink(spec)
+    return FileSink(spec[5:] if spec.startswith("file:") else spec)
+
+
+class AlertEngine:
+    """
+    Правила изменений поверх событий обнаружения и результатов пингов.
+    Состояние хранится в хэш-индексах по IP и по MAC, поэтому каждое событие
+    разбирается за O(1), сколько бы узлов ни было в сети. Повтор того же правила
+    по тому же узлу в течение debounce секунд подавляется; возврат узла, о падении
+    которого не сообщалось, тоже не сообщается — мигающий узел не засыпает лог.
+    evaluate() вызывается под блокировкой ядра, поэтому получателям оповещения
+    передаются через очередь отдельного потока: запись в файл их не задерживает.
+    """
+
+    def __init__(self, sinks=(), debounce=DEBOUNCE, down_after=DOWN_AFTER_FAILS):
+        self.sinks = list(sinks)
+        self.debounce = debounce
+        self.down_after = down_after
+        self.learning = True  # первый свип холодного старта: запоминаем сеть молча
+        self.recent = collections.deque(maxlen=LOG_SIZE)
+        self.active = {}      # {ip: последнее оповещение} — для подсветки узлов
+        self.counts = collections.Counter()  # {правило: сколько оповещений отправлено}
+        self.suppressed = 0
+        self._mac_of = {}     # {ip: mac}
+        self._ips_of = {}     # {mac: {ip}}
+        self._known_macs = set()
+        self._fails = {}      # {ip: пингов подряд без ответа} — только для узлов, которые отвечали
+        self._down = {}       # {ip: было ли отправлено оповещение о падении}
+        self._last = {}       # {(правило, ip): время последнего оповещения}
+        self._pruned = time.time()  # когда из _last последний раз удалялись устаревшие записи
+        self._outbox = queue.SimpleQueue()
+        self._delivery = threading.Thread(target=self._deliver, name="alert-sinks", daemon=True)
+        if self.sinks: self._delivery.start()
+
+    def seed(self, devices, known_macs=()):
+        """
+        Теплый старт из инвентаризации: devices — online-устройства (их привязки IP <-> MAC),
+        known_macs — все когда-либо виденные MAC; вернувшееся offline-устройство новым не считается.
+        """
+        for dev in devices:
+            self._bind(dev['ip'], dev['mac'])
+            self._known_macs.add(dev['mac'])
+        self._known_macs.update(known_macs)
+        if self._known_macs: self.learning = False
+
+    def evaluate(self, events=(), results=()):
+        """Разбирает события обнаружения и результаты пингов. Возвращает новые оповещения."""
+        fired = []
+        for kind, ip, mac in events:
+            if kind == EVENT_JOIN:
+                self._up(ip, "answers ARP again", fired, mac)
+                if mac not in self._known_macs:
+                    self._known_macs.add(mac)
+                    if not self.learning:
+                        self._emit(RULE_NEW_DEVICE, ip, mac, f"New device {ip} ({mac})", fired)
+                self._bind(ip, mac, fired)
+            elif kind == EVENT_MAC_CHANGE:
+                old = self._mac_of.get(ip)
+                self._known_macs.add(mac)
+                self._emit(RULE_MAC_CHANGE, ip, mac, f"MAC of {ip} changed {old} -> {mac} (possible ARP spoofing)", fired)
+                self._bind(ip, mac, fired)
+            elif kind == EVENT_LEAVE:
+                old = self._unbind(ip)
+                self._fails.pop(ip, None)
+                if ip not in self._down:
+                    self._down[ip] = self._emit(RULE_DEVICE_DOWN, ip, old, f"Device {ip} stopped answering ARP", fired)
+        for ip, status, rtt_us, ts in results:
+            if status == "success":
+                self._fails[ip] = 0
+                self._up(ip, "answers ping again", fired)
+            elif ip in self._fails:
+                self._fails[ip] += 1
+                if self._fails[ip] == self.down_after and ip not in self._down:
+                    self._down[ip] = self._emit(RULE_DEVICE_DOWN, ip, self._mac_of.get(ip),
+                                                f"Device {ip} missed {self.down_after} pings in a row", fired)
+        return fired
+
+    def highlights(self, now, duration):
+        """{ip: оповещение} за последние duration секунд (устаревшие удаляются)."""
+        for ip in [ip for ip, alert in self.active.items() if now - alert['ts'] >= duration]:
+            del self.active[ip]
+        return self.active
+
+    def close(self):
+        if self._delivery.is_alive():
+            self._outbox.put(None)
+            self._delivery.join(timeout=WEBHOOK_TIMEOUT)
+        for sink in self.sinks:
+            sink.close()
+
+    def _deliver(self):
+        while True:
+            alert = self._outbox.get()
+            if alert is None: return
+            for sink in self.sinks:
+                try:
+                    sink(alert)
+                except Exception as e:
+                    print(f"Ошибка получателя оповещений: {e}")
+
+    # --- Индексы ---
+    def _bind(self, ip, mac, fired=None):
+        old = self._mac_of.get(ip)
+        if old == mac: return
+        if old is not None: self._ips_of[old].discard(ip)
+        self._mac_of[ip] = mac
+        others = self._ips_of.setdefault(mac, set())
+        if others and fired is not None:
+            self._emit(RULE_MAC_CONFLICT, ip, mac, f"MAC {mac} answers for {ip} and {', '.join(sorted(others))}", fired)
+        others.add(ip)
+
+    def _unbind(self, ip):
+        mac = self._mac_of.pop(ip, None)
+        if mac is not None:
+            ips = self._ips_of.get(mac)
+            ips.discard(ip)
+            if not ips: del self._ips_of[mac]
+        return mac
+
+    def _up(self, ip, reason, fired, mac=None):
+        """mac — из события ARP: после leave привязка IP -> MAC уже снята и в индексе его нет."""
+        if ip in self._down and self._down.pop(ip):
+            self._emit(RULE_DEVICE_UP, ip, mac or self._mac_of.get(ip), f"Device {ip} {reason}", fired)
+
+    def _emit(self, rule, ip, mac, message, fired):
+        """Отправляет оповещение, если то же правило по этому узлу не срабатывало недавно. Возвращает True, если отправлено."""
+        now = time.time()
+        key = (rule, ip)
+        if now - self._last.get(key, float("-inf")) < self.debounce:
+            self.suppressed += 1
+            return False
+        self._last[key] = now
+        # Записи старше debounce уже ничего не подавляют: раз в debounce секунд они удаляются,
+        # чтобы при смене адресов словарь не рос все время работы монитора
+        if now - self._pruned >= self.debounce:
+            self._last = {k: t for k, t in self._last.items() if now - t < self.debounce}
+            self._pruned = now
+        alert = {'ts': now, 'rule': rule, 'severity': SEVERITY[rule], 'ip': ip, 'mac': mac, 'message': message}
+        self.recent.append(alert)
+        self.active[ip] = alert
+        self.counts[rule] += 1
+        fired.append(alert)
+        if self.sinks: self._outbox.put(alert)
+        return True
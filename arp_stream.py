@@ -0,0 +1,137 @@
+import ipaddress
+import time
+from profiling import timed_import
+
+# --- Параметры потокового сканирования ---
+DEFAULT_PPS = 2000       # темп отправки ARP-запросов, пакетов/с
+MIN_WAIT = 0.05          # минимальное ожидание ответов после последнего запроса, с
+MAX_WAIT = 2.0           # верхняя граница ожидания (нет ответов / медленная сеть), с
+RTT_FACTOR = 4.0         # дедлайн = RTT_FACTOR * худший наблюдаемый RTT
+TARGET_IP_OFFSET = 38    # смещение поля target IP в кадре Ether (14 байт) + ARP (24 байта до pdst)
+MIN_FRAME = 60           # минимальный кадр Ethernet без FCS: короткий ARP-запрос дополняется нулями
+
+
+def _open_arp_socket(interface):
+    """Открывает L2-сокет; BPF-фильтр на ARP-ответы, если его удается скомпилировать."""
+    conf = timed_import("scapy.config").conf
+    try:
+        return conf.L2socket(iface=interface, filter="arp and arp[6:2] = 2")
+    except Exception:
+        return conf.L2socket(iface=interface)
+
+
+def sweep_targets(network, scope=None):
+    """
+    Адреса network для свипа. scope — сеть, частью которой является network (шард /24 внутри /16):
+    исключаются только ее адрес сети и широковещательный, внутренние .0 и .255 шардов остаются.
+    """
+    scope = scope or network
+    first, last = int(network.network_address), int(network.broadcast_address)
+    if scope.num_addresses > 2:
+        first = max(first, int(scope.network_address) + 1)
+        last = min(last, int(scope.broadcast_address) - 1)
+    return [str(ipaddress.IPv4Address(ip)) for ip in range(first, last + 1)]
+
+
+def arp_request_template(ARP, Ether, ip):
+    """
+    Широковещательный ARP-запрос к ip в байтах, дополненный до MIN_FRAME.
+    scapy собирает его один раз (MAC и IP отправителя — по маршруту к ip);
+    дальше для каждого адреса меняются только 4 байта target IP.
+    """
+    frame = bytes(Ether(dst="ff:ff:ff:ff:ff:ff") / ARP(pdst=ip))
+    return bytearray(frame.ljust(MIN_FRAME, b"\0"))
+
+
+def stream_arp_sweep(ip_range, interface, pps=DEFAULT_PPS, expected=None,
+                     min_wait=MIN_WAIT, max_wait=MAX_WAIT, sock=None, limiter=None, stop=None,
+                     scope=None, on_sent=None):
+    """
+    Потоковый ARP-свип: отправляет запросы с темпом pps и отдает
+    {'ip', 'mac', 'rtt'} сразу, как только приходит очередной ответ.
+
+    Завершается, когда ответили все адреса из expected (если задан),
+    либо по адаптивному дедлайну: после последнего запроса ждем
+    RTT_FACTOR * худший RTT (в пределах [min_wait, max_wait]).
+    expected — только для проверки заранее известного полного набора адресов:
+    ответ, не входящий в него и пришедший после последнего запроса, будет потерян,
+    поэтому обнаружение новых устройств expected не передает.
+
+    limiter — общий для нескольких свипов ограничитель темпа
+    (scan_planner.RateLimiter); если задан, pps игнорируется.
+
+    stop — threading.Event: если он выставлен, свип прекращает отправку
+    и ожидание ответов (не позже чем через один дедлайн ожидания).
+
+    scope — родительская сеть, если ip_range — ее шард (см. sweep_targets);
+    on_sent() вызывается после последнего запроса, перед ожиданием ответов.
+    """
+    # Из scapy нужны только слои ARP/Ether, и только когда свип действительно начинается
+    l2 = timed_import("scapy.layers.l2")
+    ARP, Ether = l2.ARP, l2.Ether
+    network = ipaddress.ip_network(ip_range, strict=False)
+    targets = sweep_targets(network, ipaddress.ip_network(scope, strict=False) if scope else None)
+    pending = set(expected).intersection(targets) if expected else None
+    if not pending:
+        pending = None
+    own_sock = sock is None
+    if own_sock:
+        sock = _open_arp_socket(interface)
+
+    frame = arp_request_template(ARP, Ether, targets[0]) if targets else None
+    sent_at = {}      # {ip: время отправки}
+    answered = set()
+    worst_rtt = 0.0
+    interval = 1.0 / pps if pps else 0.0
+
+    def handle(pkt):
+        nonlocal worst_rtt
+        if pkt is None or ARP not in pkt:
+            return None
+        arp = pkt[ARP]
+        ip = arp.psrc
+        if arp.op != 2 or ip not in sent_at or ip in answered:
+            return None
+        answered.add(ip)
+        rtt = time.monotonic() - sent_at[ip]
+        worst_rtt = max(worst_rtt, rtt)
+        if pending is not None:
+            pending.discard(ip)
+        return {'ip': ip, 'mac': arp.hwsrc, 'rtt': rtt}
+
+    def poll(timeout):
+        for ready in type(sock).select([sock], timeout):
+            reply = handle(ready.recv())
+            if reply:
+                yield reply
+
+    try:
+        next_send = time.monotonic()
+        for ip in targets:
+            if stop is not None and stop.is_set():
+                return
+            if limiter is not None:
+                next_send = limiter.reserve()
+            # Между отправками читаем уже пришедшие ответы, не дожидаясь конца свипа
+            while True:
+                now = time.monotonic()
+                if now >= next_send:
+                    break
+                yield from poll(next_send - now)
+            frame[TARGET_IP_OFFSET:TARGET_IP_OFFSET + 4] = ipaddress.IPv4Address(ip).packed
+            sent_at[ip] = time.monotonic()
+            sock.send(bytes(frame))
+            next_send += interval
+
+        last_send = time.monotonic()
+        if on_sent is not None:
+            on_sent()
+        while (pending is None or pending) and not (stop is not None and stop.is_set()):
+            wait = max_wait if not answered else min(max_wait, max(min_wait, worst_rtt * RTT_FACTOR))
+            remain = last_send + wait - time.monotonic()
+            if remain <= 0:
+                break
+            yield from poll(remain)
+    finally:
+        if own_sock:
+            sock.close()
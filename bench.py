@@ -0,0 +1,381 @@
+import argparse
+import gc
+import heapq
+import ipaddress
+import json
+import os
+import platform
+import random
+import selectors
+import socket
+import subprocess
+import threading
+import sys
+import time
+import tracemalloc
+from arp_stream import TARGET_IP_OFFSET
+
+# --- Параметры бенчмарка ---
+SCAN_PREFIXES = (28, 26, 24, 22, 20)          # размеры подсетей для свипа
+SCAN_PPS = 20000                              # темп свипа: выше реального, чтобы мерить накладные расходы
+PROBE_COUNTS = (100, 1000)                    # сколько пингов за прогон
+SERVICE_HOSTS = (100, 1000)                   # сколько узлов 127.0.0.0/8 сканирует сканер сервисов
+SERVICE_LISTENERS = 8                         # локальных слушающих портов (остальные порты закрыты)
+RENDER_NODES = (10, 100, 500, 1000, 5000)     # размеры карты для цикла отрисовки
+RENDER_FRAMES = 120                           # измеряемые кадры
+WARMUP_FRAMES = 60                            # кадры на доставку узлов и прогрев кэшей
+ALLOC_FRAMES = 30                             # кадры под tracemalloc после измеряемых (он замедляет кадр)
+OUTPUT_PATH = "bench_results.jsonl"
+BENCHES = ("scan", "probe", "services", "render")
+REGRESSION_THRESHOLD = 10.0                   # % ухудшения, с которого --compare помечает метрику
+
+
+# --- Имитация ARP-ответчиков ---
+class FakeLan:
+    """
+    Имитация сегмента сети: в подсети отвечают hosts адресов с задержкой
+    latency ± jitter и вероятностью потери loss. Подставляется в stream_arp_sweep через sock=.
+    """
+
+    def __init__(self, network, hosts, latency=0.002, jitter=0.0005, loss=0.0, seed=1):
+        rng = random.Random(seed)
+        addresses = [str(ip) for ip in ipaddress.ip_network(network).hosts()]
+        self.hosts = {ip: "02:00:%02x:%02x:%02x:%02x" % tuple(ipaddress.IPv4Address(ip).packed)
+                      for ip in rng.sample(addresses, min(hosts, len(addresses)))}
+        self.latency = latency
+        self.jitter = jitter
+        self.loss = loss
+        self.rng = rng
+
+    def socket(self):
+        return FakeArpSocket(self)
+
+
+class FakeArpSocket:
+    """L2-сокет с интерфейсом scapy (send / recv / select / close) поверх FakeLan."""
+
+    def __init__(self, lan):
+        self.lan = lan
+        self._replies = []  # куча (момент готовности, ip)
+
+    def send(self, frame):
+        # stream_arp_sweep отправляет готовые байты кадра: target IP — по смещению TARGET_IP_OFFSET
+        ip = socket.inet_ntoa(frame[TARGET_IP_OFFSET:TARGET_IP_OFFSET + 4])
+        lan = self.lan
+        if ip in lan.hosts and lan.rng.random() >= lan.loss:
+            delay = max(0.0, lan.latency + lan.rng.uniform(-lan.jitter, lan.jitter))
+            heapq.heappush(self._replies, (time.monotonic() + delay, ip))
+
+    def recv(self):
+        from scapy.layers.l2 import ARP, Ether
+        if not self._replies or self._replies[0][0] > time.monotonic():
+            return None
+        _, ip = heapq.heappop(self._replies)
+        mac = self.lan.hosts[ip]
+        return Ether(src=mac) / ARP(op=2, psrc=ip, hwsrc=mac)
+
+    @staticmethod
+    def select(sockets, timeout=None):
+        sock = sockets[0]
+        now = time.monotonic()
+        due = sock._replies[0][0] if sock._replies else now + (timeout or 0)
+        if timeout is not None: due = min(due, now + timeout)
+        if due > now: time.sleep(due - now)
+        return [sock] if sock._replies and sock._replies[0][0] <= time.monotonic() else []
+
+    def close(self):
+        pass
+
+
+# --- Бенчмарки ---
+def bench_scan(prefixes=SCAN_PREFIXES, density=0.3, latency=0.002, loss=0.0, pps=SCAN_PPS):
+    """Время свипа в зависимости от размера подсети."""
+    from arp_stream import stream_arp_sweep
+    results = []
+    for prefix in prefixes:
+        network = ipaddress.ip_network(f"10.0.0.0/{prefix}")
+        lan = FakeLan(network, int((network.num_addresses - 2) * density) or 1, latency=latency, loss=loss)
+        started = time.perf_counter()
+        found = sum(1 for _ in stream_arp_sweep(str(network), "fake0", pps=pps, sock=lan.socket()))
+        wall = time.perf_counter() - started
+        results.append({'bench': 'scan', 'size': network.num_addresses - 2, 'prefix': prefix,
+                        'hosts': len(lan.hosts), 'found': found, 'pps': pps, 'loss': loss,
+                        'wall_s': round(wall, 4)})
+        print(f"scan /{prefix}: {found}/{len(lan.hosts)} устройств за {wall:.3f} с")
+    return results
+
+
+def bench_probe(counts=PROBE_COUNTS):
+    """Пропускная способность ICMP-пробера по адресам 127.0.0.0/8 (отвечает само ядро)."""
+    from prober import IcmpProber
+    try:
+        prober = IcmpProber().start()
+    except OSError as e:
+        print(f"probe: пропущено ({e})")
+        return []
+    results = []
+    try:
+        for count in counts:
+            targets = [f"127.{i // 65536 % 256}.{i // 256 % 256}.{i % 256 or 1}" for i in range(1, count + 1)]
+            started = time.perf_counter()
+            for ip in targets: prober.ping(ip)
+            received, ok = 0, 0
+            while received < count and time.perf_counter() - started < prober.timeout + 5:
+                batch = prober.drain()
+                received += len(batch)
+                ok += sum(1 for _, status, _, _ in batch if status == "success")
+                if not batch: time.sleep(0.001)
+            wall = time.perf_counter() - started
+            results.append({'bench': 'probe', 'size': count, 'ok': ok, 'wall_s': round(wall, 4),
+                            'pings_per_s': round(received / wall, 1)})
+            print(f"probe {count}: {received / wall:.0f} пингов/с ({ok} ответов)")
+    finally:
+        prober.stop()
+    return results
+
+
+class LocalListeners:
+    """
+    Слушающие TCP-сокеты на 127.0.0.1 для сканера сервисов: каждый принятый клиент
+    получает баннер и отключается. Все сокеты обслуживает один поток на selectors.
+    """
+
+    def __init__(self, count, banner=b"SSH-2.0-bench\r\n"):
+        self.banner = banner
+        self._selector = selectors.DefaultSelector()
+        self.ports = []
+        for _ in range(count):
+            server = socket.socket()
+            server.bind(("127.0.0.1", 0))
+            server.listen(128)
+            server.setblocking(False)
+            self._selector.register(server, selectors.EVENT_READ)
+            self.ports.append(server.getsockname()[1])
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stop.is_set():
+            for key, _ in self._selector.select(timeout=0.1):
+                try:
+                    client, _ = key.fileobj.accept()
+                except OSError:
+                    continue
+                try:
+                    client.sendall(self.banner)
+                except OSError:
+                    pass
+                client.close()
+
+    def close(self):
+        self._stop.set()
+        self._thread.join(timeout=1)
+        for key in list(self._selector.get_map().values()):
+            key.fileobj.close()
+        self._selector.close()
+
+
+def bench_services(host_counts=SERVICE_HOSTS, listeners=SERVICE_LISTENERS):
+    """Пропускная способность сканера сервисов: открытые порты на 127.0.0.1, на остальных узлах — отказы."""
+    from services import ServiceScanner
+    lan = LocalListeners(listeners)
+    closed = [lan.ports[-1] + i for i in range(1, 9)]  # скорее всего свободные — RST от ядра
+    results = []
+    try:
+        for count in host_counts:
+            scanner = ServiceScanner(ports=lan.ports + closed, banner_timeout=0.2).start()
+            hosts = ["127.0.0.1"] + [f"127.1.{i // 250}.{i % 250 + 1}" for i in range(count - 1)]
+            started = time.perf_counter()
+            for ip in hosts: scanner.scan(ip)
+            done, found = 0, 0
+            while done < count and time.perf_counter() - started < 60:
+                batch = scanner.drain()
+                done += len(batch)
+                found += sum(len(services) for _, services, _ in batch)
+                if not batch: time.sleep(0.005)
+            wall = time.perf_counter() - started
+            scanner.stop()
+            probes = done * len(scanner.ports)
+            results.append({'bench': 'services', 'size': count, 'ports': len(scanner.ports), 'open': found,
+                            'wall_s': round(wall, 4), 'probes_per_s': round(probes / wall, 1)})
+            print(f"services {count}: {probes / wall:.0f} проверок/с, открыто {found}/{listeners}")
+    finally:
+        lan.close()
+    return results
+
+
+class _FrameClock:
+    """
+    Подмена pygame.time.Clock: не спит, а записывает время работы каждого кадра.
+    Время цикла при этом симулируемое: каждый tick(framerate) сдвигает его на 1/framerate,
+    как настоящий Clock, поэтому пульс, свечение и вспышки анимируются с реальной скоростью.
+    После измеряемых кадров еще alloc_frames кадров идут под tracemalloc: пик памяти кадра
+    над его началом учитывает и объекты, созданные и освобожденные внутри кадра.
+    """
+
+    def __init__(self, frames, warmup, on_done, alloc_frames=ALLOC_FRAMES, fps=60):
+        self.frames, self.warmup, self.on_done = frames, warmup, on_done
+        self.alloc_frames, self.fps = alloc_frames, fps
+        self.times, self.allocs, self.collections = [], [], []
+        self.now = self._start = time.time()  # симулируемое время цикла
+        self._last = None
+        self._count = 0
+        self._base = None
+
+    def time(self):
+        return self.now
+
+    def get_ticks(self):
+        return int((self.now - self._start) * 1000)
+
+    def tick(self, framerate=0):
+        now = time.perf_counter()
+        self.now += 1.0 / (framerate or self.fps)
+        self._count += 1
+        if self._base is not None:
+            current, peak = tracemalloc.get_traced_memory()
+            self.allocs.append(peak - self._base)
+            if len(self.allocs) == self.alloc_frames:
+                tracemalloc.stop()
+                self._base = None
+                self.on_done()
+                return 0
+            tracemalloc.reset_peak()
+            self._base = current
+        elif self._count > self.warmup and len(self.times) < self.frames:
+            self.times.append(now - self._last)
+            self.collections.append(gc.get_stats()[0]['collections'])
+            if len(self.times) == self.frames:
+                if not self.alloc_frames:
+                    self.on_done()
+                else:
+                    tracemalloc.start()
+                    self._base = tracemalloc.get_traced_memory()[0]
+        self._last = time.perf_counter()
+        return 0
+
+
+def bench_render(node_counts=RENDER_NODES, frames=RENDER_FRAMES, warmup=WARMUP_FRAMES, extra_args=()):
+    """Время кадра цикла sci_fi_monitor на офскрин-дисплее для карт разного размера."""
+    os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+    os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+    import pygame
+    import monitor_core
+    import sci_fi_monitor
+
+    saved = (monitor_core.get_lan_info, monitor_core.scan_network_with_mac, pygame.time.Clock,
+             pygame.time.get_ticks, sci_fi_monitor.time)
+    results = []
+    try:
+        monitor_core.get_lan_info = lambda: ("10.0.0.2", "10.0.0.1", "fake0")
+        for count in node_counts:
+            def fake_scan(targets, pps=0, expected=None, stop=None, count=count):
+                for i in range(3, count + 1):
+                    yield {'ip': f"10.0.{i // 250}.{i % 250 + 1}", 'mac': "02:00:00:00:%02x:%02x" % (i // 256 % 256, i % 256)}
+            monitor_core.scan_network_with_mac = fake_scan
+            clock = _FrameClock(frames, warmup, lambda: pygame.event.post(pygame.event.Event(pygame.QUIT)),
+                                fps=sci_fi_monitor.FPS)
+            pygame.time.Clock = lambda: clock
+            # Анимация цикла идет по симулируемому времени часов, а не по настенному
+            pygame.time.get_ticks = clock.get_ticks
+            sci_fi_monitor.time = clock
+            sci_fi_monitor.main(["--no-inventory", "--rescan", "3600", *extra_args])
+            times = sorted(clock.times)
+            result = {'bench': 'render', 'size': count, 'frames': len(times),
+                      'args': " ".join(extra_args),
+                      'frame_ms_p50': round(times[len(times) // 2] * 1000, 3),
+                      'frame_ms_p95': round(times[int(len(times) * 0.95)] * 1000, 3),
+                      'frame_ms_max': round(times[-1] * 1000, 3),
+                      'alloc_kb_per_frame': round(sorted(clock.allocs)[len(clock.allocs) // 2] / 1024, 1) if clock.allocs else None,
+                      'gc_gen0_per_frame': round((clock.collections[-1] - clock.collections[0]) / max(1, len(times) - 1), 3)}
+            results.append(result)
+            print(f"render {count}: p50 {result['frame_ms_p50']} мс, p95 {result['frame_ms_p95']} мс")
+    finally:
+        (monitor_core.get_lan_info, monitor_core.scan_network_with_mac, pygame.time.Clock,
+         pygame.time.get_ticks, sci_fi_monitor.time) = saved
+    return results
+
+
+# --- Запись и сравнение результатов ---
+def _metadata():
+    try:
+        commit = subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], text=True,
+                                         stderr=subprocess.DEVNULL).strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit, 'timestamp': time.time(), 'python': platform.python_version(),
+            'machine': platform.machine(), 'platform': sys.platform}
+
+def write_results(path, results):
+    meta = _metadata()
+    with open(path, "a") as f:
+        for result in results:
+            f.write(json.dumps(dict(meta, **result)) + "\n")
+    print(f"Результаты дописаны в {path}")
+
+def _latest(path):
+    """{(bench, size, args): запись} — последняя запись каждого бенчмарка в файле (коммит не учитывается)."""
+    runs = {}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            runs[(record['bench'], record['size'], record.get('args', ""))] = record
+    return runs
+
+# Метрики, где меньше — лучше, и где лучше больше
+LOWER_IS_BETTER = ('wall_s', 'frame_ms_p50', 'frame_ms_p95', 'alloc_kb_per_frame')
+HIGHER_IS_BETTER = ('pings_per_s', 'probes_per_s')
+
+def compare(old_path, results):
+    old = _latest(old_path)
+    for result in results:
+        base = old.get((result['bench'], result['size'], result.get('args', "")))
+        if not base: continue
+        for metric in LOWER_IS_BETTER + HIGHER_IS_BETTER:
+            if metric not in result or not base.get(metric): continue
+            change = 100.0 * (result[metric] - base[metric]) / abs(base[metric])
+            worse = change if metric in LOWER_IS_BETTER else -change
+            mark = "  <-- регрессия" if worse > REGRESSION_THRESHOLD else ""
+            print(f"{result['bench']} {result['size']} {metric}: {base[metric]} -> {result[metric]} ({change:+.1f}%){mark}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Бенчмарки сканера, пробера и отрисовки на имитации сети")
+    parser.add_argument("benches", nargs="*", metavar="BENCH", help="scan, probe, services и/или render (по умолчанию все)")
+    parser.add_argument("--nodes", type=int, nargs="+", default=list(RENDER_NODES), help="размеры карты для render")
+    parser.add_argument("--prefixes", type=int, nargs="+", default=list(SCAN_PREFIXES), help="размеры подсетей для scan")
+    parser.add_argument("--service-hosts", type=int, nargs="+", default=list(SERVICE_HOSTS),
+                        help="сколько узлов сканировать в бенчмарке services")
+    parser.add_argument("--latency", type=float, default=0.002, help="задержка имитируемых ответов, с")
+    parser.add_argument("--loss", type=float, default=0.0, help="доля потерянных ARP-ответов (0..1)")
+    parser.add_argument("--pps", type=int, default=SCAN_PPS, help="темп свипа")
+    parser.add_argument("--frames", type=int, default=RENDER_FRAMES, help="измеряемых кадров на размер карты")
+    parser.add_argument("--render-args", nargs=argparse.REMAINDER, default=[], metavar="ARGS",
+                        help="доп. ключи sci_fi_monitor до конца строки, например --render-args --dirty-rects "
+                             "(поэтому ключ ставится последним)")
+    parser.add_argument("--output", default=OUTPUT_PATH, help="файл результатов (JSON Lines, дописывается)")
+    parser.add_argument("--compare", metavar="FILE", help="сравнить с последними результатами из FILE")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    benches = args.benches or list(BENCHES)
+    unknown = set(benches) - set(BENCHES)
+    if unknown:
+        print(f"Неизвестные бенчмарки: {', '.join(sorted(unknown))} (доступны: {', '.join(BENCHES)})"); sys.exit(2)
+    results = []
+    if "scan" in benches:
+        results += bench_scan(args.prefixes, latency=args.latency, loss=args.loss, pps=args.pps)
+    if "probe" in benches:
+        results += bench_probe()
+    if "services" in benches:
+        results += bench_services(args.service_hosts)
+    if "render" in benches:
+        results += bench_render(args.nodes, frames=args.frames, extra_args=tuple(arg for value in args.render_args for arg in value.split()))
+    if args.compare and os.path.exists(args.compare):
+        compare(args.compare, results)
+    write_results(args.output, results)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+import math
+
+# --- Параметры камеры ---
+ZOOM_STEP = 1.25        # один щелчок колесика; масштаб всегда ZOOM_STEP ** level — размеры узлов конечны и кэшируются
+MIN_ZOOM_LEVEL = -20    # ~0.012: сеть в десятки тысяч узлов помещается на экран
+MAX_ZOOM_LEVEL = 3      # ~2x
+FIT_MARGIN = 60         # px: запас по краям при вписывании сети в экран
+
+# --- Уровни детализации ---
+DETAIL_FULL = "full"          # свечение и подписи
+DETAIL_SIMPLE = "simple"      # только тела узлов
+DETAIL_CLUSTERS = "clusters"  # узлы свернуты в кластеры по ячейкам сетки
+LABEL_ZOOM = 0.6        # мельче — без подписей и свечения
+CLUSTER_ZOOM = 0.25     # мельче — кластеры
+MAX_DETAILED_NODES = 300  # больше узлов в кадре — без подписей и свечения, при любом масштабе
+MAX_DRAWN_NODES = 800   # больше узлов в кадре — кластеры, при любом масштабе
+CLUSTER_PX = 48         # минимальный экранный размер ячейки кластера, px
+
+
+class Camera:
+    """
+    Отображение мировых координат раскладки на экран: точка мира center
+    стоит в центре экрана, масштаб — ZOOM_STEP ** level. Узлы хранят мировые
+    координаты; экранные считаются только для того, что попало в кадр.
+    """
+
+    def __init__(self, size, center=None, level=0):
+        self.size = size
+        self.center = center or (size[0] / 2, size[1] / 2)
+        self.level = level
+        self.zoom = ZOOM_STEP ** level
+
+    @property
+    def state(self):
+        """Меняется при любом сдвиге или масштабе — по нему видно, что кадр надо пересобрать."""
+        return self.center, self.level
+
+    def to_screen(self, pos):
+        return (int((pos[0] - self.center[0]) * self.zoom + self.size[0] / 2),
+                int((pos[1] - self.center[1]) * self.zoom + self.size[1] / 2))
+
+    def to_world(self, pos):
+        return ((pos[0] - self.size[0] / 2) / self.zoom + self.center[0],
+                (pos[1] - self.size[1] / 2) / self.zoom + self.center[1])
+
+    def transform(self):
+        """(масштаб, сдвиг x, сдвиг y): экран = мир * масштаб + сдвиг — для векторных преобразований."""
+        return (self.zoom, self.size[0] / 2 - self.center[0] * self.zoom,
+                self.size[1] / 2 - self.center[1] * self.zoom)
+
+    def view_rect(self, margin=0):
+        """Видимая область мира (x, y, w, h); margin — запас по краям в экранных px."""
+        return self.rect_to_world((-margin, -margin, self.size[0] + 2 * margin, self.size[1] + 2 * margin))
+
+    def rect_to_world(self, rect):
+        x, y = self.to_world(rect[:2])
+        return x, y, rect[2] / self.zoom, rect[3] / self.zoom
+
+    def zoom_at(self, screen_pos, steps):
+        """Меняет масштаб на steps щелчков; точка мира под screen_pos остается на месте."""
+        level = max(MIN_ZOOM_LEVEL, min(MAX_ZOOM_LEVEL, self.level + steps))
+        if level == self.level: return
+        anchor = self.to_world(screen_pos)
+        self.level, self.zoom = level, ZOOM_STEP ** level
+        self.center = (anchor[0] - (screen_pos[0] - self.size[0] / 2) / self.zoom,
+                       anchor[1] - (screen_pos[1] - self.size[1] / 2) / self.zoom)
+
+    def pan(self, dx, dy):
+        """Сдвиг картинки на (dx, dy) экранных px (перетаскивание мышью)."""
+        self.center = (self.center[0] - dx / self.zoom, self.center[1] - dy / self.zoom)
+
+    def fit(self, points, margin=FIT_MARGIN):
+        """Масштаб и центр, при которых все точки видны (крупнее исходного масштаба не приближает)."""
+        xs, ys = [p[0] for p in points], [p[1] for p in points]
+        if not xs: return
+        w, h = max(xs) - min(xs), max(ys) - min(ys)
+        scale = min((self.size[0] - 2 * margin) / max(w, 1), (self.size[1] - 2 * margin) / max(h, 1))
+        self.level = max(MIN_ZOOM_LEVEL, min(0, math.floor(math.log(scale, ZOOM_STEP))))
+        self.zoom = ZOOM_STEP ** self.level
+        self.center = ((max(xs) + min(xs)) / 2, (max(ys) + min(ys)) / 2)
+
+    def cluster_cell(self):
+        """Сторона ячейки кластера в мировых координатах при текущем масштабе."""
+        return CLUSTER_PX / self.zoom
+
+    def detail(self, visible):
+        """Уровень детализации по масштабу и оценке числа узлов в кадре."""
+        if self.zoom < CLUSTER_ZOOM or visible > MAX_DRAWN_NODES:
+            return DETAIL_CLUSTERS
+        # Время кадра растет с числом рисуемых узлов, а не с масштабом: свечение и подписи
+        # переполненного кадра стоят десятки мс даже при крупном масштабе
+        return DETAIL_FULL if self.zoom >= LABEL_ZOOM and visible <= MAX_DETAILED_NODES else DETAIL_SIMPLE
@@ -0,0 +1,128 @@
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from monitor_core import MonitorCore, add_scan_arguments, resolve_network
+from profiling import StartupProfile
+
+# --- Параметры коллектора ---
+LISTEN = "127.0.0.1:9108"  # адрес HTTP-эндпоинта по умолчанию
+POLL_INTERVAL = 0.2        # как часто ядро забирает события и результаты пингов, с
+PING_EVERY = 10            # период опроса узлов по умолчанию (без окна кнопки Ping нет)
+
+
+# --- Экспорт метрик ---
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def prometheus_text(state):
+    """Снимок MonitorCore.snapshot() в текстовом формате Prometheus."""
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for labels, value in samples:
+            if value is None: continue
+            label_text = ",".join(f'{k}="{_label(v)}"' for k, v in labels.items())
+            lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+    devices = state['devices']
+    scan = state['scan']
+    metric("netmon_devices", "gauge", "Devices currently known to discovery.",
+           [({}, len(devices))])
+    metric("netmon_device_info", "gauge", "Known device (always 1).",
+           [({'ip': d['ip'], 'mac': d['mac'] or "", 'vendor': d['vendor'] or "", 'role': d['role']}, 1) for d in devices])
+    metric("netmon_rtt_microseconds", "gauge", "ICMP round-trip time percentiles over the recent window.",
+           [({'ip': d['ip'], 'quantile': str(int(q[1:]) / 100)}, v) for d in devices if d['rtt_us'] for q, v in d['rtt_us'].items()])
+    metric("netmon_ping_loss_percent", "gauge", "ICMP loss over the recent window.",
+           [({'ip': d['ip']}, d['loss_percent']) for d in devices])
+    metric("netmon_service_open", "gauge", "Open TCP service found by the service scanner (always 1).",
+           [({'ip': d['ip'], 'port': service['port'], 'service': service['name']}, 1)
+            for d in devices if d['services'] for service in d['services']])
+    metric("netmon_pings_total", "counter", "ICMP probes by result.",
+           [({'result': status}, count) for status, count in state['pings'].items()])
+    metric("netmon_alerts_total", "counter", "Alerts sent by rule.",
+           [({'rule': rule}, count) for rule, count in state['alerts']['counts'].items()])
+    metric("netmon_alerts_suppressed_total", "counter", "Alerts suppressed by debounce.",
+           [({}, state['alerts']['suppressed'])])
+    metric("netmon_sweeps_total", "counter", "Completed discovery sweeps.",
+           [({}, scan['sweeps'])])
+    metric("netmon_sweep_duration_seconds", "gauge", "Wall time of the last completed sweep.",
+           [({}, scan['last_duration'])])
+    metric("netmon_last_sweep_timestamp_seconds", "gauge", "Unix time the last sweep finished.",
+           [({}, scan['last_finished'])])
+    metric("netmon_uptime_seconds", "gauge", "Seconds since the collector started.",
+           [({}, state['uptime'])])
+    return "\n".join(lines) + "\n"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    core = None  # MonitorCore, задается в serve()
+
+    def do_GET(self):
+        path = self.path.split("?", 1)[0]
+        if path == "/metrics":
+            body = prometheus_text(self.core.snapshot()).encode()
+            content_type = "text/plain; version=0.0.4; charset=utf-8"
+        elif path in ("/", "/state"):
+            body = json.dumps(self.core.snapshot(), ensure_ascii=False).encode()
+            content_type = "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass  # не засоряем лог коллектора каждым запросом дашборда
+
+
+def serve(core, listen=LISTEN):
+    """Запускает HTTP-эндпоинт в фоновом потоке и возвращает сервер."""
+    host, port = listen.rsplit(":", 1)
+    handler = type("Handler", (_Handler,), {'core': core})
+    server = ThreadingHTTPServer((host, int(port)), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    return server
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sci-Fi Network Monitor: безголовый коллектор")
+    add_scan_arguments(parser, ping_every=PING_EVERY)
+    parser.add_argument("--listen", default=LISTEN, metavar="HOST:PORT", help="адрес HTTP-эндпоинта (JSON и /metrics)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    startup = StartupProfile()
+    args = parse_args(argv)
+    startup.mark("args")
+    with startup.stage("network", args.startup_profile):
+        host_ip, gateway_ip, net_interface, targets = resolve_network(args)
+    core = MonitorCore(host_ip, gateway_ip, targets, pps=args.pps, rescan=args.rescan,
+                       inventory_path=None if args.no_inventory else args.inventory,
+                       ping_every=args.ping_every, services_every=args.services_every,
+                       alert_sinks=args.alert or ["stdout"]).start()
+    if args.publish: core.publish(args.publish)
+    startup.mark("core")
+    server = serve(core, args.listen)
+    startup.mark("http")
+    print(f"Коллектор запущен: http://{args.listen}/state (JSON), http://{args.listen}/metrics (Prometheus)")
+    if args.startup_profile: startup.report()
+    try:
+        while True:
+            core.poll()
+            time.sleep(POLL_INTERVAL)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.shutdown()
+        core.stop()
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1 @@
+# Модули проекта лежат в корне репозитория: этот файл добавляет корень в sys.path для тестов в tests/.
@@ -0,0 +1,87 @@
+import pygame
+
+# --- Параметры режима грязных прямоугольников ---
+MAX_UPDATE_RECTS = 96  # при большем числе прямоугольников дешевле обновить весь экран
+
+
+class DirtyRenderer:
+    """
+    Отрисовка по грязным прямоугольникам поверх закэшированного статического слоя.
+
+    Кадр: add() динамических областей -> expand() узлов, задетых этими областями ->
+    restore() фона под ними -> рисование -> present(). Области прошлого кадра
+    автоматически стираются в следующем, поэтому движущиеся объекты не оставляют следов.
+    """
+
+    def __init__(self, screen, draw_static, max_rects=MAX_UPDATE_RECTS):
+        self.screen = screen
+        self.draw_static = draw_static  # (surface) -> None: фон, ребра, тела узлов
+        self.max_rects = max_rects
+        self.background = pygame.Surface(screen.get_size()).convert()
+        self._stale_background = True
+        self._full = True
+        self._prev = []   # динамические области прошлого кадра (стираются в этом)
+        self._rects = []  # динамические области текущего кадра
+        self._extra = []  # области, перерисованные только в этом кадре
+
+    @property
+    def full(self):
+        return self._full
+
+    def invalidate(self):
+        """Статический слой устарел (узлы добавлены/удалены/сдвинуты)."""
+        self._stale_background = True
+        self._full = True
+
+    def repaint_all(self):
+        """Перерисовать весь кадр без пересборки статического слоя."""
+        self._full = True
+
+    def add(self, rect):
+        self._rects.append(pygame.Rect(rect))
+
+    def expand(self, regions, candidates=None):
+        """
+        По словарю {ключ: Rect} возвращает ключи объектов, которые нужно перерисовать:
+        задетые грязными областями, а также задетые уже перерисовываемыми (цепочкой).
+        Порядок ключей сохраняется. candidates(rect) — необязательный пространственный
+        запрос, сужающий перебор до ключей рядом с прямоугольником.
+        """
+        if self._full:
+            return list(regions)
+        hit = set()
+        frontier = self._prev + self._rects
+        while frontier:
+            rect = frontier.pop()
+            for key in (candidates(rect) if candidates else regions):
+                region = regions.get(key)
+                if region is not None and key not in hit and region.colliderect(rect):
+                    hit.add(key)
+                    self._extra.append(region)
+                    frontier.append(region)
+        return [key for key in regions if key in hit]
+
+    def restore(self):
+        """Возвращает статический фон под всеми грязными областями."""
+        if self._stale_background:
+            self.draw_static(self.background)
+            self._stale_background = False
+        if self._full:
+            self.screen.blit(self.background, (0, 0))
+            return
+        for rect in self._dirty():
+            self.screen.blit(self.background, rect, rect)
+
+    def present(self):
+        """Выводит кадр: только грязные области или, если их слишком много, весь экран."""
+        dirty = self._dirty()
+        if self._full or len(dirty) > self.max_rects:
+            pygame.display.flip()
+        elif dirty:
+            pygame.display.update(dirty)
+        self._prev, self._rects, self._extra = self._rects, [], []
+        self._full = False
+
+    def _dirty(self):
+        """Грязные области без повторов: неподвижный узел попадает и в прошлый кадр, и в текущий."""
+        return list({tuple(rect): rect for rect in self._prev + self._rects + self._extra}.values())
@@ -0,0 +1,106 @@
+import queue
+import threading
+import time
+from profiling import record
+
+# --- Типы событий обнаружения ---
+EVENT_JOIN = "join"
+EVENT_LEAVE = "leave"
+EVENT_MAC_CHANGE = "mac_change"
+
+
+class DiscoveryEngine(threading.Thread):
+    """
+    Фоновый поток обнаружения устройств.
+    Периодически пересканирует подсеть и складывает события
+    (join / leave / mac_change) в очередь, которую разбирает цикл отрисовки.
+    """
+
+    def __init__(self, scan_func, interval=30.0, leave_after=2, on_sweep=None, stop_event=None):
+        super().__init__(name="discovery", daemon=True)
+        self.scan_func = scan_func      # () -> итерируемое {'ip': ..., 'mac': ...} (список или генератор)
+        self.interval = interval        # пауза между свипами, с
+        self.leave_after = leave_after  # сколько свипов подряд устройство может не отвечать
+        self.on_sweep = on_sweep        # (seen {ip: mac}, gone [ip]) -> None, вызывается в потоке обнаружения
+        self.events = queue.SimpleQueue()
+        self.sweeps = 0
+        self.last_duration = None  # длительность последнего успешного свипа, с
+        self.last_finished = None  # время его окончания (time.time())
+        self._known = {}   # {ip: mac}
+        self._missed = {}  # {ip: число пропущенных свипов}
+        # Общее с scan_func событие остановки: так свип прерывается посреди ожидания ответов
+        self._stop_event = stop_event or threading.Event()
+
+    def run(self):
+        while not self._stop_event.is_set():
+            started = time.time()
+            seen = {}
+            try:
+                # Ответы обрабатываются по мере поступления: при потоковом
+                # сканировании join-события уходят в очередь еще до конца свипа.
+                for dev in self.scan_func():
+                    if self._stop_event.is_set(): break
+                    self._observe(dev['ip'], dev['mac'], seen)
+            except Exception as e:
+                print(f"Ошибка фонового сканирования: {e}")
+            else:
+                if self._stop_event.is_set(): break  # свип прерван остановкой: неполный результат не учитываем
+                gone = self._expire(seen)
+                self.sweeps += 1
+                self.last_finished = time.time()
+                self.last_duration = self.last_finished - started
+                record("scan.sweep", self.last_duration)
+                if self.on_sweep:
+                    try:
+                        self.on_sweep(seen, gone)
+                    except Exception as e:
+                        print(f"Ошибка обработки результатов свипа: {e}")
+            self._stop_event.wait(max(0.0, self.interval - (time.time() - started)))
+
+    def _observe(self, ip, mac, seen):
+        """Учитывает один ответ свипа и сразу публикует join / mac_change."""
+        if ip in seen:
+            return
+        seen[ip] = mac
+        self._missed.pop(ip, None)
+        old_mac = self._known.get(ip)
+        if old_mac is None:
+            self._known[ip] = mac
+            self.events.put((EVENT_JOIN, ip, mac))
+        elif old_mac != mac:
+            self._known[ip] = mac
+            self.events.put((EVENT_MAC_CHANGE, ip, mac))
+
+    def _expire(self, seen):
+        """По окончании свипа помечает неответившие устройства и публикует leave."""
+        gone = []
+        for ip in list(self._known):
+            if ip in seen:
+                continue
+            missed = self._missed.get(ip, 0) + 1
+            if missed >= self.leave_after:
+                del self._known[ip]
+                self._missed.pop(ip, None)
+                self.events.put((EVENT_LEAVE, ip, None))
+                gone.append(ip)
+            else:
+                self._missed[ip] = missed
+        return gone
+
+    def seed(self, devices):
+        """Теплый старт: считает устройства уже известными (до запуска потока)."""
+        for dev in devices:
+            self._known[dev['ip']] = dev['mac']
+
+    def drain(self, limit=256):
+        """Неблокирующе забирает до limit накопившихся событий."""
+        drained = []
+        while len(drained) < limit:
+            try:
+                drained.append(self.events.get_nowait())
+            except queue.Empty:
+                break
+        return drained
+
+    def stop(self):
+        self._stop_event.set()
@@ -0,0 +1,160 @@
+import sqlite3
+import threading
+import time
+from oui import lookup
+
+# --- Параметры хранилища ---
+INVENTORY_PATH = "inventory.db"
+LAST_SEEN_RESOLUTION = 300  # как часто (с) обновлять last_seen у устройств, которые не менялись
+SCHEMA_VERSION = 1          # PRAGMA user_version: 1 — колонка vendor заполнена по справочнику OUI
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS devices (
+    ip         TEXT PRIMARY KEY,
+    mac        TEXT NOT NULL,
+    vendor     TEXT,
+    first_seen REAL NOT NULL,
+    last_seen  REAL NOT NULL,
+    online     INTEGER NOT NULL DEFAULT 1
+);
+CREATE INDEX IF NOT EXISTS idx_devices_mac ON devices(mac);
+CREATE INDEX IF NOT EXISTS idx_devices_last_seen ON devices(last_seen);
+
+CREATE TABLE IF NOT EXISTS device_events (
+    id   INTEGER PRIMARY KEY,
+    ts   REAL NOT NULL,
+    kind TEXT NOT NULL,
+    ip   TEXT NOT NULL,
+    mac  TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_events_ip ON device_events(ip);
+CREATE INDEX IF NOT EXISTS idx_events_mac ON device_events(mac);
+CREATE INDEX IF NOT EXISTS idx_events_ts ON device_events(ts);
+"""
+
+
+class Inventory:
+    """
+    Персистентная инвентаризация устройств в SQLite.
+    Держит в памяти копию таблицы online-устройств и после каждого свипа
+    записывает только разницу (new / returned / gone / changed) одной транзакцией.
+    """
+
+    def __init__(self, path=INVENTORY_PATH):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(_SCHEMA)
+            self._migrate()
+        self._online = {}  # {ip: {'mac': ..., 'last_seen': ...}}
+        self._offline = set()  # адреса, которые уже есть в таблице, но помечены offline
+        for row in self._conn.execute("SELECT ip, mac, last_seen, online FROM devices"):
+            if row['online']:
+                self._online[row['ip']] = {'mac': row['mac'], 'last_seen': row['last_seen']}
+            else:
+                self._offline.add(row['ip'])
+
+    def _migrate(self):
+        """
+        Базы до появления колонки vendor: добавляет ее и один раз заполняет по справочнику OUI.
+        Версия схемы хранится в PRAGMA user_version, поэтому MAC без известного
+        производителя не ищутся заново при каждом запуске.
+        """
+        if self._conn.execute("PRAGMA user_version").fetchone()[0] >= SCHEMA_VERSION:
+            return
+        columns = {row['name'] for row in self._conn.execute("PRAGMA table_info(devices)")}
+        if "vendor" not in columns:
+            self._conn.execute("ALTER TABLE devices ADD COLUMN vendor TEXT")
+        rows = self._conn.execute("SELECT ip, mac FROM devices WHERE vendor IS NULL").fetchall()
+        self._conn.executemany("UPDATE devices SET vendor = ? WHERE ip = ?",
+                               [(lookup(row['mac']), row['ip']) for row in rows])
+        self._conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+
+    def snapshot(self):
+        """Последнее известное состояние сети — для теплого старта до первого пакета."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ip, mac, vendor, first_seen, last_seen FROM devices WHERE online = 1 ORDER BY last_seen DESC")
+            return [dict(row) for row in rows]
+
+    def record_sweep(self, seen, gone=(), ts=None):
+        """
+        Фиксирует результат свипа. seen — {ip: mac} ответивших устройств,
+        gone — адреса, признанные пропавшими (после дебаунса в DiscoveryEngine).
+        """
+        ts = ts or time.time()
+        inserts, mac_updates, touches, events = [], [], [], []
+
+        for ip, mac in seen.items():
+            known = self._online.get(ip)
+            if known is None:
+                inserts.append((ip, mac, lookup(mac), ts, ts))
+                # Адрес уже был в сети и пропадал — это возвращение, а не первое появление
+                events.append((ts, "returned" if ip in self._offline else "new", ip, mac))
+                self._offline.discard(ip)
+                self._online[ip] = {'mac': mac, 'last_seen': ts}
+            elif known['mac'] != mac:
+                mac_updates.append((mac, lookup(mac), ts, ip))
+                events.append((ts, "changed", ip, mac))
+                known.update(mac=mac, last_seen=ts)
+            elif ts - known['last_seen'] >= LAST_SEEN_RESOLUTION:
+                touches.append((ts, ip))
+                known['last_seen'] = ts
+
+        offline = []
+        for ip in gone:
+            known = self._online.pop(ip, None)
+            if known is not None:
+                offline.append((ip,))
+                self._offline.add(ip)
+                events.append((ts, "gone", ip, known['mac']))
+
+        if not (inserts or mac_updates or touches or offline):
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO devices (ip, mac, vendor, first_seen, last_seen, online) VALUES (?, ?, ?, ?, ?, 1) "
+                "ON CONFLICT(ip) DO UPDATE SET mac = excluded.mac, vendor = excluded.vendor, last_seen = excluded.last_seen, online = 1",
+                inserts)
+            self._conn.executemany("UPDATE devices SET mac = ?, vendor = ?, last_seen = ? WHERE ip = ?", mac_updates)
+            self._conn.executemany("UPDATE devices SET last_seen = ? WHERE ip = ?", touches)
+            self._conn.executemany("UPDATE devices SET online = 0 WHERE ip = ?", offline)
+            self._conn.executemany("INSERT INTO device_events (ts, kind, ip, mac) VALUES (?, ?, ?, ?)", events)
+
+    def history(self, ip=None, mac=None, since=None, limit=100):
+        """История событий (new / returned / changed / gone) по IP и/или MAC без пересканирования."""
+        query, params = "SELECT ts, kind, ip, mac FROM device_events WHERE 1 = 1", []
+        if ip:
+            query += " AND ip = ?"
+            params.append(ip)
+        if mac:
+            query += " AND mac = ?"
+            params.append(mac)
+        if since:
+            query += " AND ts >= ?"
+            params.append(since)
+        query += " ORDER BY ts DESC LIMIT ?"
+        params.append(limit)
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(query, params)]
+
+    def seen_since(self, ts):
+        """Все устройства (включая offline), замеченные не раньше ts."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ip, mac, vendor, first_seen, last_seen, online FROM devices WHERE last_seen >= ? ORDER BY last_seen DESC",
+                (ts,))
+            return [dict(row) for row in rows]
+
+    def known_macs(self):
+        """Все MAC, которые сеть когда-либо видела, включая offline-устройства и прежние MAC адресов."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT mac FROM devices UNION SELECT mac FROM device_events WHERE mac IS NOT NULL")
+            return {row['mac'] for row in rows}
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
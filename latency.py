@@ -0,0 +1,58 @@
+from array import array
+
+# --- Параметры истории задержек ---
+SAMPLES_PER_NODE = 120  # размер кольцевого буфера на узел
+
+
+class LatencyRing:
+    """
+    Кольцевой буфер RTT-сэмплов фиксированного размера на базе array.
+    Добавление — O(1) без выделения памяти; потерянный пакет хранится флагом.
+    """
+
+    __slots__ = ("capacity", "_rtt", "_lost", "_head", "_count")
+
+    def __init__(self, capacity=SAMPLES_PER_NODE):
+        self.capacity = capacity
+        self._rtt = array('d', bytes(8 * capacity))  # RTT в микросекундах
+        self._lost = bytearray(capacity)              # 1 — ответа не было
+        self._head = 0
+        self._count = 0
+
+    def __len__(self):
+        return self._count
+
+    def append(self, rtt_us):
+        """Добавляет сэмпл; rtt_us=None означает потерю."""
+        if rtt_us is None:
+            self._lost[self._head] = 1
+            self._rtt[self._head] = 0.0
+        else:
+            self._lost[self._head] = 0
+            self._rtt[self._head] = rtt_us
+        self._head = (self._head + 1) % self.capacity
+        if self._count < self.capacity:
+            self._count += 1
+
+    def samples(self):
+        """Сэмплы от старых к новым: RTT в мкс или None для потерь."""
+        start = (self._head - self._count) % self.capacity
+        out = []
+        for i in range(self._count):
+            j = (start + i) % self.capacity
+            out.append(None if self._lost[j] else self._rtt[j])
+        return out
+
+    def loss_percent(self):
+        if not self._count:
+            return 0.0
+        # незаполненные ячейки всегда нулевые, поэтому можно суммировать весь буфер
+        return 100.0 * sum(self._lost) / self._count
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        """Перцентили RTT (мкс) по методу ближайшего ранга; None, если ответов не было."""
+        values = sorted(v for v in self.samples() if v is not None)
+        if not values:
+            return None
+        n = len(values)
+        return {q: values[min(n - 1, max(0, -(-q * n // 100) - 1))] for q in quantiles}
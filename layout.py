@@ -0,0 +1,348 @@
+import ipaddress
+import math
+from profiling import timed_import
+
+# --- Параметры раскладки ---
+NODE_SPACING = 80        # желаемое расстояние между центрами узлов, px
+RING_GAP = 90            # расстояние между концентрическими кольцами, px
+INFLUENCE_RADIUS = 3     # в шагах NODE_SPACING: какие соседи сдвигаются при вставке
+EXACT_LIMIT = 200        # до стольки узлов отталкивание считается точно (все пары)
+BH_THETA = 0.7           # критерий открытия Барнса–Хата: ячейка — одна масса, если ее сторона < theta * расстояние
+BH_LEAF = 8              # в ячейке квадродерева до стольки узлов — она не делится, силы от узлов точные
+BH_DEPTH = 16            # предельная глубина квадродерева (совпадающие позиции дальше не делятся)
+MAX_ACTIVE_PER_STEP = 256  # сколько узлов двигается за один шаг (бюджет кадра)
+MAX_STEPS = 300          # предел итераций силовой раскладки после изменения
+SETTLE_EPS = 0.3         # px: максимальный сдвиг, при котором раскладка считается устоявшейся
+
+
+def ring_positions(keys, center, radius):
+    """Равномерно расставляет ключи по окружности: {ключ: (x, y)}."""
+    keys = list(keys)
+    angle_step = 2 * math.pi / len(keys) if keys else 0
+    return {key: (center[0] + int(radius * math.cos(i * angle_step)),
+                  center[1] + int(radius * math.sin(i * angle_step))) for i, key in enumerate(keys)}
+
+
+def subnet_key(ip, data):
+    return str(ipaddress.ip_network(f"{ip}/24", strict=False))
+
+
+def vendor_key(ip, data):
+    return data.get('vendor') or "Unknown"
+
+
+GROUP_KEYS = {"subnet": subnet_key, "vendor": vendor_key}
+
+
+class Layout:
+    """
+    Базовая раскладка. place() расставляет все узлы, update() — реакция на
+    добавление/удаление, step() — один шаг анимации (для силовых раскладок).
+    Позиции пишутся прямо в nodes[ip]['pos'].
+    """
+
+    animated = False
+
+    def __init__(self, center, size):
+        self.center = center
+        self.size = size
+
+    def place(self, nodes, gateway_ip):
+        raise NotImplementedError
+
+    def update(self, nodes, gateway_ip, added=(), removed=()):
+        self.place(nodes, gateway_ip)
+
+    def step(self, nodes):
+        """Возвращает True, если позиции изменились."""
+        return False
+
+
+class RingLayout(Layout):
+    """Исходная раскладка: роутер в центре, клиенты на одном круге."""
+
+    def place(self, nodes, gateway_ip):
+        if gateway_ip in nodes:
+            nodes[gateway_ip]['pos'] = self.center
+        radius = min(self.size) / 3
+        for ip, pos in ring_positions([ip for ip in nodes if ip != gateway_ip], self.center, radius).items():
+            nodes[ip]['pos'] = pos
+
+
+class GroupedRingLayout(Layout):
+    """
+    Концентрические кольца: каждая группа (подсеть или производитель) получает
+    свой сектор, пропорциональный размеру, и заполняет его от внутреннего кольца наружу.
+    """
+
+    def __init__(self, center, size, group_by="subnet", spacing=NODE_SPACING, ring_gap=RING_GAP):
+        super().__init__(center, size)
+        self.group_key = GROUP_KEYS[group_by]
+        self.spacing = spacing
+        self.ring_gap = ring_gap
+
+    def place(self, nodes, gateway_ip):
+        if gateway_ip in nodes:
+            nodes[gateway_ip]['pos'] = self.center
+        groups = {}
+        for ip, data in nodes.items():
+            if ip != gateway_ip:
+                groups.setdefault(self.group_key(ip, data), []).append(ip)
+        total = sum(len(members) for members in groups.values())
+        if not total:
+            return
+
+        start = 0.0
+        for key in sorted(groups):
+            members = sorted(groups[key], key=ipaddress.ip_address)
+            span = 2 * math.pi * len(members) / total
+            ring, placed = 0, 0
+            while placed < len(members):
+                radius = self.ring_gap * (ring + 1.5)
+                capacity = max(1, int(span * radius / self.spacing))
+                chunk = members[placed:placed + capacity]
+                step = span / len(chunk)
+                for i, ip in enumerate(chunk):
+                    angle = start + (i + 0.5) * step
+                    nodes[ip]['pos'] = (self.center[0] + int(radius * math.cos(angle)),
+                                        self.center[1] + int(radius * math.sin(angle)))
+                placed += len(chunk)
+                ring += 1
+            start += span
+
+
+class ForceLayout(Layout):
+    """
+    Силовая раскладка (Фрухтерман–Рейнгольд) на векторизованном NumPy.
+    Отталкивание для больших графов приближается по Барнсу–Хату на квадродереве:
+    достаточно далекая ячейка — через ее центр масс, близкая делится дальше.
+    После вставки двигаются только узлы рядом с новым, остальные закреплены.
+    """
+
+    animated = True
+
+    def __init__(self, center, size, spacing=NODE_SPACING):
+        np = timed_import("numpy")  # numpy загружается только силовой раскладкой: кольцевым он не нужен
+        super().__init__(center, size)
+        self.spacing = spacing
+        self.keys = []
+        self.pos = np.zeros((0, 2))
+        self.active = np.zeros(0, dtype=bool)
+        self.gateway_ip = None
+        self.temperature = 0.0
+        self.steps_left = 0
+        self._cursor = 0
+        self._swept = self._sweep_move = 0.0
+
+    def place(self, nodes, gateway_ip):
+        np = timed_import("numpy")
+        self.gateway_ip = gateway_ip
+        self.keys = list(nodes)
+        # Начальное приближение — спираль подсолнуха: узлы сразу не перекрываются
+        self.pos = np.empty((len(self.keys), 2))
+        golden = math.pi * (3 - math.sqrt(5))
+        for i, ip in enumerate(self.keys):
+            r = self.spacing * 0.6 * math.sqrt(i + 1)
+            self.pos[i] = (self.center[0] + r * math.cos(i * golden), self.center[1] + r * math.sin(i * golden))
+        self.active = np.ones(len(self.keys), dtype=bool)
+        self._pin_gateway()
+        self._restart(self.spacing)
+        self._write(nodes, np.arange(len(self.keys)))
+
+    def update(self, nodes, gateway_ip, added=(), removed=()):
+        np = timed_import("numpy")
+        if gateway_ip != self.gateway_ip or not self.keys:
+            self.place(nodes, gateway_ip)
+            return
+        touched = []
+        removed = set(removed)
+        if removed:
+            keep = np.array([ip not in removed for ip in self.keys], dtype=bool)
+            touched.extend(self.pos[~keep])
+            self.keys = [ip for ip in self.keys if ip not in removed]
+            self.pos, self.active = self.pos[keep], self.active[keep]
+
+        gateway = self.pos[self.keys.index(gateway_ip)] if gateway_ip in self.keys else np.array(self.center, float)
+        new_keys = [ip for ip in added if ip in nodes and ip not in self.keys]
+        if new_keys:
+            rng = np.random.default_rng()
+            angles = rng.uniform(0, 2 * math.pi, len(new_keys))
+            radius = max(self.spacing * 2, float(np.median(np.hypot(*(self.pos - gateway).T))) if len(self.pos) else 0)
+            new_pos = gateway + np.stack([np.cos(angles), np.sin(angles)], 1) * radius
+            self.keys.extend(new_keys)
+            self.pos = np.vstack([self.pos, new_pos])
+            self.active = np.concatenate([self.active, np.ones(len(new_keys), dtype=bool)])
+            touched.extend(new_pos)
+
+        if touched:
+            # Сдвигаем только окрестность изменений
+            touched = np.asarray(touched)
+            dist = np.hypot(*(self.pos[:, None, :] - touched[None, :, :]).transpose(2, 0, 1)).min(1)
+            self.active |= dist < self.spacing * INFLUENCE_RADIUS
+            self._pin_gateway()
+            self._restart(self.spacing * 0.5)
+        self._write(nodes, np.arange(len(self.keys)))
+
+    def step(self, nodes):
+        np = timed_import("numpy")
+        idx = np.nonzero(self.active)[0]
+        if self.steps_left <= 0 or not len(idx):
+            return False
+        # За кадр двигаем не больше MAX_ACTIVE_PER_STEP узлов (по кругу), чтобы шаг
+        # укладывался в несколько миллисекунд и на тысячах узлов
+        fraction = 1.0
+        if len(idx) > MAX_ACTIVE_PER_STEP:
+            start = self._cursor % len(idx)
+            idx = np.roll(idx, -start)[:MAX_ACTIVE_PER_STEP]
+            self._cursor = start + MAX_ACTIVE_PER_STEP
+            fraction = MAX_ACTIVE_PER_STEP / np.count_nonzero(self.active)
+        k = self.spacing
+        k2 = k * k
+        force = _repulsion(self.pos, idx, k2)
+
+        # Притяжение по ребрам звезды (клиент — роутер) и слабая гравитация к центру
+        if self.gateway_ip in self.keys:
+            anchor = self.pos[self.keys.index(self.gateway_ip)]
+        else:
+            anchor = np.array(self.center, float)
+        delta = anchor - self.pos[idx]
+        dist = np.hypot(delta[:, 0], delta[:, 1])[:, None] + 1e-6
+        force += delta * dist / k * 0.1
+        force += (np.array(self.center, float) - self.pos[idx]) * 0.01
+
+        length = np.hypot(force[:, 0], force[:, 1])[:, None] + 1e-6
+        move = force / length * np.minimum(length, self.temperature)
+        self.pos[idx] += move
+        self._write(nodes, idx)
+
+        # Температура и критерий остановки считаются по полным проходам
+        self.temperature *= 0.95 ** fraction
+        self.steps_left -= fraction
+        self._sweep_move = max(self._sweep_move, float(np.abs(move).max()))
+        self._swept += fraction
+        if self._swept >= 1.0:
+            if self._sweep_move < SETTLE_EPS:
+                self.active[:] = False
+                self.steps_left = 0
+            self._swept = self._sweep_move = 0.0
+        return True
+
+    def _pin_gateway(self):
+        if self.gateway_ip in self.keys:
+            i = self.keys.index(self.gateway_ip)
+            self.pos[i] = self.center
+            self.active[i] = False
+
+    def _restart(self, temperature):
+        self.temperature = temperature
+        self.steps_left = MAX_STEPS
+        self._cursor = 0
+        self._swept = self._sweep_move = 0.0
+
+    def _write(self, nodes, idx):
+        for i in idx:
+            ip = self.keys[i]
+            if ip in nodes:
+                nodes[ip]['pos'] = (int(self.pos[i, 0]), int(self.pos[i, 1]))
+
+
+def _pairwise(tx, ty, sx, sy, k2, valid=None):
+    """Отталкивание целей (tx, ty) от источников (sx, sy): сумма k^2 / d по направлению от источника."""
+    np = timed_import("numpy")
+    dx = tx[:, None] - sx
+    dy = ty[:, None] - sy
+    d2 = dx * dx + dy * dy
+    mask = d2 > 1e-9
+    if valid is not None:
+        mask &= valid
+    weight = np.divide(k2, d2, out=np.zeros_like(d2), where=mask)
+    return np.stack([(dx * weight).sum(1), (dy * weight).sum(1)], 1)
+
+
+def _repulsion(pos, idx, k2, theta=BH_THETA, leaf_size=BH_LEAF, depth=BH_DEPTH):
+    """
+    Силы отталкивания для узлов idx от всех узлов pos.
+    Для больших графов — Барнс–Хат: квадродерево над pos обходится сразу для всех целей
+    по уровням. Пара (цель, ячейка) либо принимается целиком (сторона ячейки < theta *
+    расстояние до ее центра масс), либо, для листа (не больше leaf_size узлов), считается
+    точно по узлам, либо заменяется парами с дочерними ячейками следующего уровня.
+    """
+    np = timed_import("numpy")
+    tx, ty = pos[idx, 0], pos[idx, 1]
+    if len(pos) <= EXACT_LIMIT:
+        return _pairwise(tx, ty, pos[None, :, 0], pos[None, :, 1], k2)
+
+    lo = pos.min(0)
+    size = max(float((pos.max(0) - lo).max()), 1e-6)
+    # Целочисленные координаты на самом глубоком уровне: ячейка уровня L — старшие L бит
+    q = np.minimum(((pos - lo) * ((1 << depth) / size)).astype(np.int64), (1 << depth) - 1)
+    levels = {}
+
+    def level(L):
+        """Занятые ячейки уровня L: (ключи, порядок узлов по ячейкам, начало, число, центр масс x, y)."""
+        if L not in levels:
+            key = ((q[:, 0] >> (depth - L)) << L) | (q[:, 1] >> (depth - L))
+            order = np.argsort(key, kind="stable")
+            keys, start, count = np.unique(key[order], return_index=True, return_counts=True)
+            mx = np.add.reduceat(pos[order, 0], start) / count
+            my = np.add.reduceat(pos[order, 1], start) / count
+            levels[L] = keys, order, start, count, mx, my
+        return levels[L]
+
+    def expand(pairs, count):
+        """Повторяет каждую пару count раз; вторая колонка — номер повтора внутри пары."""
+        total = int(count.sum())
+        return np.repeat(pairs, count), np.arange(total) - np.repeat(np.cumsum(count) - count, count)
+
+    fx = np.zeros(len(idx))
+    fy = np.zeros(len(idx))
+    target = np.arange(len(idx))          # пары (цель, ячейка) текущего уровня
+    cell = np.zeros(len(idx), dtype=np.int64)
+    for L in range(depth + 1):
+        keys, order, start, count, mx, my = level(L)
+        dx = tx[target] - mx[cell]
+        dy = ty[target] - my[cell]
+        d2 = dx * dx + dy * dy
+        side = size / (1 << L)
+        far = side * side < theta * theta * d2
+        if far.any():
+            weight = count[cell[far]] * k2 / d2[far]
+            fx += np.bincount(target[far], weights=dx[far] * weight, minlength=len(idx))
+            fy += np.bincount(target[far], weights=dy[far] * weight, minlength=len(idx))
+
+        leaf = ~far & ((count[cell] <= leaf_size) | (L == depth))
+        if leaf.any():
+            # Лист: точно по каждому узлу ячейки (себя цель не отталкивает — d2 = 0)
+            pair, nth = expand(np.nonzero(leaf)[0], count[cell[leaf]])
+            t = target[pair]
+            source = order[start[cell[pair]] + nth]
+            dx = tx[t] - pos[source, 0]
+            dy = ty[t] - pos[source, 1]
+            d2 = dx * dx + dy * dy
+            weight = np.divide(k2, d2, out=np.zeros_like(d2), where=d2 > 1e-9)
+            fx += np.bincount(t, weights=dx * weight, minlength=len(idx))
+            fy += np.bincount(t, weights=dy * weight, minlength=len(idx))
+
+        open_ = ~far & ~leaf
+        if not open_.any():
+            break
+        # Дочерние ячейки уровня L + 1, сгруппированные по родителю
+        child_keys = level(L + 1)[0]
+        cx, cy = child_keys >> (L + 1), child_keys & ((1 << (L + 1)) - 1)
+        parent = ((cx >> 1) << L) | (cy >> 1)
+        by_parent = np.argsort(parent, kind="stable")
+        first = np.searchsorted(parent[by_parent], keys)
+        children = np.diff(np.append(first, len(parent)))
+        pair, nth = expand(np.nonzero(open_)[0], children[cell[open_]])
+        target = target[pair]
+        cell = by_parent[first[cell[pair]] + nth]
+    return np.stack([fx, fy], 1)
+
+
+LAYOUTS = {"ring": RingLayout, "rings": GroupedRingLayout, "force": ForceLayout}
+
+
+def make_layout(name, center, size, group_by="subnet"):
+    if LAYOUTS[name] is GroupedRingLayout:
+        return GroupedRingLayout(center, size, group_by=group_by)
+    return LAYOUTS[name](center, size)
@@ -1,10 +1,10 @@
-import pygame
-import math
+import argparse
 import ipaddress
-import subprocess
 import sys
-import re
-from scapy.all import ARP, Ether, srp
+from arp_stream import stream_arp_sweep
+from netinfo import get_lan_info
+from layout import ring_positions
+from profiling import StartupProfile
 
 # --- Параметры визуализации ---
 SCREEN_WIDTH, SCREEN_HEIGHT = 800, 600
@@ -17,56 +17,36 @@ NODE_RADIUS = 30
 FONT_SIZE = 16
 
 # --- Функции сканирования (из net_scanner.py) ---
-def get_lan_info_macos():
-    """
-    Находит параметры физической локальной сети (Wi-Fi/Ethernet),
-    целенаправленно игнорируя VPN-интерфейсы.
-    """
-    try:
-        netstat_output = subprocess.check_output(["netstat", "-nr", "-f", "inet"], text=True)
-        lan_gateway_match = re.search(r"^default\s+([\d\.]+)\s+.*? (en\d+)", netstat_output, re.MULTILINE)
-        
-        if not lan_gateway_match:
-            return None, None, None
-            
-        gateway_ip = lan_gateway_match.group(1)
-        net_interface = lan_gateway_match.group(2)
-
-        ifconfig_output = subprocess.check_output(["ifconfig", net_interface], text=True)
-        host_ip_match = re.search(r"inet ([\d\.]+) netmask", ifconfig_output)
-        
-        if not host_ip_match:
-            return None, None, None
-            
-        host_ip = host_ip_match.group(1)
-        return host_ip, gateway_ip, net_interface
-
-    except Exception:
-        return None, None, None
-
 def scan_network(ip_range, interface):
     """Сканирует сеть с помощью ARP-запросов."""
     print(f"Используется интерфейс: {interface}")
-    arp_request = ARP(pdst=ip_range)
-    broadcast = Ether(dst="ff:ff:ff:ff:ff:ff")
-    arp_request_broadcast = broadcast / arp_request
-    answered_list = srp(arp_request_broadcast, timeout=3, iface=interface, verbose=False)[0]
-    devices = [received.psrc for _, received in answered_list]
+    devices = [reply['ip'] for reply in stream_arp_sweep(ip_range, interface)]
     return devices
 
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Сетевой Визуализатор: сканирование и карта сети")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="вывести разбивку времени запуска по этапам и отложенным импортам")
+    return parser.parse_args(argv)
+
 # --- Основная функция ---
-def main():
+def main(argv=None):
+    startup = StartupProfile()
+    args = parse_args(argv)
+    startup.mark("args")
+
     # --- Этап 1: Сканирование сети ---
     print("Запуск сканирования сети...")
-    if sys.platform == "darwin" and not __import__('os').geteuid() == 0:
-        print("Ошибка: для сканирования сети скрипт необходимо запустить с правами sudo.")
-        sys.exit(1)
+    with startup.stage("network", args.startup_profile):
+        if sys.platform == "darwin" and not __import__('os').geteuid() == 0:
+            print("Ошибка: для сканирования сети скрипт необходимо запустить с правами sudo.")
+            sys.exit(1)
 
-    host_ip, gateway_ip, net_interface = get_lan_info_macos()
+        host_ip, gateway_ip, net_interface = get_lan_info()
 
-    if not all((host_ip, gateway_ip, net_interface)):
-        print("Не удалось определить параметры локальной сети. Завершение работы.")
-        sys.exit(1)
+        if not all((host_ip, gateway_ip, net_interface)):
+            print("Не удалось определить параметры локальной сети. Завершение работы.")
+            sys.exit(1)
     
     print(f"Хост: {host_ip}, Шлюз: {gateway_ip}, Интерфейс: {net_interface}")
     
@@ -90,13 +70,17 @@ def main():
         # В случае ошибки используем данные по умолчанию для демонстрации
         ip_addresses = [host_ip, gateway_ip]
         print(f"Используются данные по умолчанию: {ip_addresses}")
+    startup.mark("scan")
 
     # --- Этап 2: Визуализация ---
     print("Запуск визуализации...")
+    import pygame  # только теперь: проверка прав и сканирование обходятся без загрузки pygame
+    startup.mark("import pygame")
     pygame.init()
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Сетевой Визуализатор")
     font = pygame.font.SysFont(None, FONT_SIZE)
+    startup.mark("display")
 
     nodes = {}
     center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
@@ -104,16 +88,10 @@ def main():
     
     nodes[gateway_ip] = (center_x, center_y)
     
-    num_clients = len(client_ips)
     radius = min(SCREEN_WIDTH, SCREEN_HEIGHT) / 3
-    angle_step = 2 * math.pi / num_clients if num_clients > 0 else 0
-
-    for i, ip in enumerate(client_ips):
-        angle = i * math.pi / (num_clients / 2) if num_clients > 1 else 0
-        x = center_x + int(radius * math.cos(angle))
-        y = center_y + int(radius * math.sin(angle))
-        nodes[ip] = (x, y)
+    nodes.update(ring_positions(client_ips, (center_x, center_y), radius))
 
+    first_frame = True
     running = True
     while running:
         for event in pygame.event.get():
@@ -136,6 +114,10 @@ def main():
             screen.blit(text_surface, text_rect)
 
         pygame.display.flip()
+        if first_frame:
+            first_frame = False
+            startup.mark("first frame")
+            if args.startup_profile: startup.report()
 
     pygame.quit()
     print("Визуализатор закрыт.")
@@ -0,0 +1,257 @@
+import ipaddress
+import os
+import sys
+import threading
+import time
+from netinfo import get_lan_info, interfaces
+from scan_planner import parse_target, sharded_sweep
+from inventory import Inventory, INVENTORY_PATH
+from prober import IcmpProber
+from services import ServiceScanner
+from alerts import AlertEngine, make_sink
+from profiling import record
+from oui import lookup
+from latency import LatencyRing
+from discovery import DiscoveryEngine, EVENT_JOIN, EVENT_LEAVE, EVENT_MAC_CHANGE
+from state_stream import StatePublisher
+
+# --- Параметры обнаружения ---
+RESCAN_INTERVAL = 30  # секунд между фоновыми свипами
+ARP_PPS = 2000        # общий потолок ARP-запросов в секунду
+MIN_AUTO_PREFIX = 20  # сеть интерфейса крупнее этой маски по умолчанию сужается до /24 вокруг адреса хоста
+STOP_TIMEOUT = 5      # с: сколько при остановке ждать завершения потока обнаружения
+
+
+# --- Функции сканирования ---
+def scan_network_with_mac(targets, pps=ARP_PPS, expected=None, stop=None):
+    """Потоковое сканирование набора подсетей: отдает устройства по мере прихода ARP-ответов."""
+    print("Сканирование " + ", ".join(f"{net} через {iface}" for net, iface in targets) + "...")
+    for reply in sharded_sweep(targets, pps=pps, expected=expected, stop=stop):
+        record("scan.arp_rtt", reply['rtt'])
+        yield {'ip': reply['ip'], 'mac': reply['mac']}
+
+# --- Общие параметры командной строки ---
+def add_scan_arguments(parser, ping_every=0):
+    """Ключи сканирования, общие для окна мониторинга и безголового коллектора."""
+    parser.add_argument("--cidr", action="append", default=[], metavar="CIDR[@IFACE]",
+                        help="подсеть для сканирования (можно указать несколько раз); по умолчанию — сеть интерфейса "
+                             f"шлюза, а если она крупнее /{MIN_AUTO_PREFIX} — /24 вокруг адреса хоста")
+    parser.add_argument("--all-interfaces", action="store_true",
+                        help="сканировать сети всех подходящих интерфейсов, а не только интерфейса шлюза")
+    parser.add_argument("--pps", type=int, default=ARP_PPS, help="общий потолок ARP-запросов в секунду")
+    parser.add_argument("--inventory", default=INVENTORY_PATH, metavar="PATH",
+                        help="файл инвентаризации SQLite (теплый старт и история устройств)")
+    parser.add_argument("--no-inventory", action="store_true", help="не читать и не сохранять инвентаризацию")
+    parser.add_argument("--ping-every", type=float, default=ping_every, metavar="SEC",
+                        help="пинговать все узлы каждые SEC секунд (0 — только по запросу)")
+    parser.add_argument("--services-every", type=float, default=0, metavar="SEC",
+                        help="в фоне сканировать TCP-сервисы всех узлов каждые SEC секунд (0 — только по запросу)")
+    parser.add_argument("--alert", action="append", default=[], metavar="SINK",
+                        help="куда отправлять оповещения: stdout, файл (file:PATH) или webhook (http://...); можно несколько раз")
+    parser.add_argument("--rescan", type=float, default=RESCAN_INTERVAL, help="интервал фоновых свипов, с")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="вывести разбивку времени запуска по этапам и отложенным импортам")
+    parser.add_argument("--publish", metavar="HOST:PORT|unix:PATH",
+                        help="раздавать состояние сети клиентам (окнам с --connect) по TCP или Unix-сокету; "
+                             "без HOST — только на 127.0.0.1")
+
+def resolve_network(args):
+    """Проверяет права и определяет (host_ip, gateway_ip, net_interface, targets); при ошибке завершает процесс."""
+    if sys.platform == "darwin" and not os.geteuid() == 0:
+        print(f"Ошибка: Требуются права sudo. Запустите: sudo python3 {os.path.basename(sys.argv[0])}")
+        sys.exit(1)
+
+    host_ip, gateway_ip, net_interface = get_lan_info()
+    if not all((host_ip, gateway_ip, net_interface)):
+        print("Не удалось определить параметры локальной сети."); sys.exit(1)
+
+    if args.cidr:
+        targets = [parse_target(spec, net_interface) for spec in args.cidr]
+    else:
+        targets = []
+        for info in interfaces():
+            if not info['candidate'] or not (args.all_interfaces or info['name'] == net_interface): continue
+            network = info['network']
+            # Слишком крупную сеть без явного --cidr не сканируем целиком
+            if network.prefixlen < MIN_AUTO_PREFIX:
+                network = ipaddress.ip_network(f"{info['ip']}/24", strict=False)
+            targets.append((network, info['name']))
+    return host_ip, gateway_ip, net_interface, targets
+
+
+class MonitorCore:
+    """
+    Ядро мониторинга без зависимости от pygame: фоновое обнаружение,
+    инвентаризация, ICMP-пробер и история RTT по узлам.
+    Владелец (окно или коллектор) периодически вызывает poll(); snapshot()
+    безопасно читать из других потоков (например, из HTTP-обработчика).
+    """
+
+    def __init__(self, host_ip, gateway_ip, targets, pps=ARP_PPS, rescan=RESCAN_INTERVAL,
+                 inventory_path=INVENTORY_PATH, ping_every=0, services_every=0, alert_sinks=()):
+        self.host_ip = host_ip
+        self.gateway_ip = gateway_ip
+        self.targets = targets
+        self.pps = pps
+        self.ping_every = ping_every
+        self.services_every = services_every
+        self.started = time.time()
+        self.devices = {}   # {ip: mac} — устройства, известные обнаружению
+        self.latency = {}   # {ip: LatencyRing} — история RTT/потерь
+        self.open_services = {}  # {ip: [(port, name, banner)]} — последний результат сканирования сервисов
+        self.pings = {"success": 0, "fail": 0}
+        self._lock = threading.Lock()
+
+        # Теплый старт: последнее сохраненное состояние сети известно
+        # до отправки первого пакета, дальше его уточняет фоновый свип.
+        self.inventory = Inventory(inventory_path) if inventory_path else None
+        self.known_devices = self.inventory.snapshot() if self.inventory else []
+        if self.known_devices: print(f"Загружено {len(self.known_devices)} устройств из {inventory_path}.")
+        for dev in self.known_devices:
+            self.devices[dev['ip']] = dev['mac']
+            lookup(dev['mac'])  # кэш производителей прогревается до первого кадра
+
+        self.alerts = AlertEngine([make_sink(spec) for spec in alert_sinks])
+        self.alerts.seed(self.known_devices, self.inventory.known_macs() if self.inventory else ())
+
+        self._stopping = threading.Event()
+        self.discovery = DiscoveryEngine(self._sweep, interval=rescan, stop_event=self._stopping,
+                                         on_sweep=self.inventory.record_sweep if self.inventory else None)
+        self.discovery.seed(self.known_devices)
+        self.prober = None
+        self.services = None
+        self.publisher = None
+
+    def _sweep(self):
+        # Известные адреса не передаются как expected: свип, закончившийся на последнем известном
+        # ответе, не дождался бы нового устройства в хвосте диапазона
+        for dev in scan_network_with_mac(self.targets, pps=self.pps, stop=self._stopping):
+            # Производитель ищется здесь, в потоке обнаружения: окно потом берет его из кэша lookup()
+            lookup(dev['mac'])
+            yield dev
+
+    def _ping_targets(self):
+        return [self.gateway_ip, self.host_ip] + [ip for ip in self.devices if ip not in (self.gateway_ip, self.host_ip)]
+
+    def start(self):
+        self.discovery.start()
+        self.services = ServiceScanner().start()
+        self.services.set_targets(self._ping_targets())
+        if self.services_every > 0: self.services.scan_every(self.services_every)
+        try:
+            self.prober = IcmpProber().start()
+        except OSError as e:
+            print(f"ICMP-пробер недоступен: {e}")
+            return self
+        self.prober.set_targets(self._ping_targets())
+        if self.ping_every > 0: self.prober.ping_every(self.ping_every)
+        return self
+
+    def publish(self, address):
+        """Начинает раздавать изменения состояния подписчикам (см. state_stream)."""
+        self.publisher = StatePublisher(address, self.host_ip, self.gateway_ip, self._device_snapshot, on_ping=self.ping)
+        self.publisher.start()
+        print(f"Состояние сети раздается на {address}")
+        return self
+
+    def _device_snapshot(self):
+        with self._lock:
+            return dict(self.devices)
+
+    def ping(self, ip):
+        if self.prober: self.prober.ping(ip)
+
+    def scan_services(self, ip, force=False):
+        """force — сканировать заново, не отдавая результат из кэша (явный запрос пользователя)."""
+        if self.services: self.services.scan(ip, force)
+
+    def poll(self):
+        """
+        Забирает накопившиеся события обнаружения и результаты пингов, обновляя состояние ядра.
+        Возвращает (события, результаты) — чтобы окно могло применить их к своей картинке.
+        """
+        # Холодный старт: пока не разобраны все события первого свипа, сеть запоминается без оповещений
+        if self.alerts.learning and self.discovery.sweeps and self.discovery.events.empty():
+            self.alerts.learning = False
+        events = self.discovery.drain()
+        results = self.prober.drain() if self.prober else []
+        found = self.services.drain() if self.services else []
+        if not events and not results and not found:
+            return events, results
+        with self._lock:
+            for ip, services, ts in found:
+                if ip in self.devices or ip in (self.gateway_ip, self.host_ip): self.open_services[ip] = services
+            changed = False
+            for kind, ip, mac in events:
+                if kind == EVENT_JOIN or kind == EVENT_MAC_CHANGE:
+                    changed = changed or ip not in self.devices
+                    self.devices[ip] = mac
+                elif kind == EVENT_LEAVE and ip in self.devices:
+                    del self.devices[ip]
+                    self.latency.pop(ip, None)
+                    self.open_services.pop(ip, None)
+                    changed = True
+            for ip, status, rtt_us, ts in results:
+                self.pings[status] += 1
+                if ip in self.devices or ip in (self.gateway_ip, self.host_ip):
+                    if ip not in self.latency: self.latency[ip] = LatencyRing()
+                    self.latency[ip].append(rtt_us)
+            self.alerts.evaluate(events, results)
+        if changed:
+            if self.prober: self.prober.set_targets(self._ping_targets())
+            if self.services: self.services.set_targets(self._ping_targets())
+        if self.publisher: self.publisher.publish(events, results)
+        return events, results
+
+    def snapshot(self):
+        """Состояние для экспорта: устройства с RTT-статистикой и тайминги сканирования."""
+        discovery = self.discovery
+        with self._lock:
+            devices = []
+            for ip in self._ping_targets():
+                ring = self.latency.get(ip)
+                percentiles = ring.percentiles() if ring else None
+                mac = self.devices.get(ip)
+                devices.append({
+                    'ip': ip,
+                    'mac': mac,
+                    'vendor': lookup(mac) if mac else None,
+                    'role': 'router' if ip == self.gateway_ip else 'host' if ip == self.host_ip else 'device',
+                    'rtt_us': {f"p{q}": v for q, v in percentiles.items()} if percentiles else None,
+                    'loss_percent': ring.loss_percent() if ring else None,
+                    'samples': len(ring) if ring else 0,
+                    'services': [{'port': port, 'name': name, 'banner': banner}
+                                 for port, name, banner in self.open_services[ip]] if ip in self.open_services else None,
+                })
+            pings = dict(self.pings)
+            alerts = {'counts': dict(self.alerts.counts), 'suppressed': self.alerts.suppressed,
+                      'recent': list(self.alerts.recent)}
+        return {
+            'host_ip': self.host_ip,
+            'gateway_ip': self.gateway_ip,
+            'targets': [f"{net}@{iface}" for net, iface in self.targets],
+            'uptime': time.time() - self.started,
+            'devices': devices,
+            'pings': pings,
+            'alerts': alerts,
+            'scan': {
+                'sweeps': discovery.sweeps,
+                'last_duration': discovery.last_duration,
+                'last_finished': discovery.last_finished,
+                'interval': discovery.interval,
+            },
+        }
+
+    def stop(self):
+        if self.publisher: self.publisher.stop()
+        self.discovery.stop()
+        if self.prober: self.prober.stop()
+        if self.services: self.services.stop()
+        # Поток обнаружения пишет свип в инвентарь — даем ему дописать; остановка прерывает
+        # и текущий свип, поэтому поток завершается в пределах одного дедлайна ожидания ответов
+        if self.discovery.ident is not None:
+            self.discovery.join(timeout=STOP_TIMEOUT)
+            if self.discovery.is_alive():
+                print("Фоновое сканирование не завершилось вовремя")
+        if self.inventory: self.inventory.close()
+        self.alerts.close()
@@ -1,72 +1,40 @@
+import argparse
 import ipaddress
-import subprocess
 import sys
-import re
-from scapy.all import ARP, Ether, srp
-
-def get_lan_info_macos():
-    """
-    Находит параметры физической локальной сети (Wi-Fi/Ethernet),
-    целенаправленно игнорируя VPN-интерфейсы.
-    """
-    try:
-        # 1. Получаем полную таблицу маршрутизации для IPv4
-        netstat_output = subprocess.check_output(["netstat", "-nr", "-f", "inet"], text=True)
-        
-        # 2. Ищем строку, которая определяет шлюз для физического интерфейса (enX)
-        #    Это строка вида "default <gateway_ip> ... <interface>"
-        lan_gateway_match = re.search(r"^default\s+([\d\.]+)\s+.*? (en\d+)", netstat_output, re.MULTILINE)
-        
-        if not lan_gateway_match:
-            print("Не удалось найти шлюз для физического интерфейса (enX) в таблице маршрутизации.")
-            return None, None, None
-            
-        gateway_ip = lan_gateway_match.group(1)
-        net_interface = lan_gateway_match.group(2)
-
-        # 3. Получаем IP-адрес хоста для этого конкретного интерфейса
-        ifconfig_output = subprocess.check_output(["ifconfig", net_interface], text=True)
-        host_ip_match = re.search(r"inet ([\d\.]+) netmask", ifconfig_output)
-        
-        if not host_ip_match:
-            print(f"Не удалось найти IPv4-адрес для интерфейса {net_interface}.")
-            return None, None, None
-            
-        host_ip = host_ip_match.group(1)
-        
-        return host_ip, gateway_ip, net_interface
-
-    except subprocess.CalledProcessError as e:
-        print(f"Ошибка выполнения системной команды: {e}")
-        return None, None, None
-    except Exception as e:
-        print(f"Непредвиденная ошибка при определении сети: {e}")
-        return None, None, None
+from arp_stream import stream_arp_sweep
+from netinfo import get_lan_info
+from profiling import StartupProfile
 
 def scan_network(ip_range, interface):
     """Сканирует сеть с помощью ARP-запросов."""
-    print(f"Используетс\u044f интерфейс: {interface}")
-    arp_request = ARP(pdst=ip_range)
-    broadcast = Ether(dst="ff:ff:ff:ff:ff:ff")
-    arp_request_broadcast = broadcast / arp_request
-    answered_list = srp(arp_request_broadcast, timeout=3, iface=interface, verbose=False)[0]
-
+    print(f"Используется интерфейс: {interface}")
     devices = []
-    for sent, received in answered_list:
-        devices.append(received.psrc)
+    for reply in stream_arp_sweep(ip_range, interface):
+        devices.append(reply['ip'])
     return devices
 
-if __name__ == "__main__":
-    if sys.platform == "darwin" and not __import__('os').geteuid() == 0:
-        print("Ошибка: для корректной работы на macOS скрипт необходимо запустить с правами sudo.")
-        sys.exit(1)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Сканер локальной сети: список IP-адресов")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="вывести разбивку времени запуска по этапам и отложенным импортам")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    startup = StartupProfile()
+    args = parse_args(argv)
+    startup.mark("args")
+
+    with startup.stage("network", args.startup_profile):
+        if sys.platform == "darwin" and not __import__('os').geteuid() == 0:
+            print("Ошибка: для корректной работы на macOS скрипт необходимо запустить с правами sudo.")
+            sys.exit(1)
 
-    host_ip, gateway_ip, net_interface = get_lan_info_macos()
+        host_ip, gateway_ip, net_interface = get_lan_info()
 
-    if not all((host_ip, gateway_ip, net_interface)):
-        print("Не удалось определить параметры локальной сети.")
-        print("Пожалуйста, убедитесь, что вы подключены к Wi-Fi/Ethernet.")
-        sys.exit(1)
+        if not all((host_ip, gateway_ip, net_interface)):
+            print("Не удалось определить параметры локальной сети.")
+            print("Пожалуйста, убедитесь, что вы подключены к Wi-Fi/Ethernet.")
+            sys.exit(1)
 
     print(f"IP-адрес хоста: {host_ip}")
     print(f"IP-адрес шлюза: {gateway_ip}")
@@ -96,6 +64,8 @@ if __name__ == "__main__":
 
     except Exception as e:
         print(f"\nПроизошла непредвиденная ошибка при сканировании: {e}")
+    startup.mark("scan")
+    if args.startup_profile: startup.report()
 
-
-
+if __name__ == "__main__":
+    main()
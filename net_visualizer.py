@@ -1,5 +1,9 @@
-import pygame
-import math
+import argparse
+import sys
+from layout import ring_positions
+from discovery import EVENT_JOIN, EVENT_LEAVE
+from state_stream import StateSubscriber
+from profiling import StartupProfile
 
 # --- Параметры ---
 SCREEN_WIDTH, SCREEN_HEIGHT = 800, 600
@@ -15,36 +19,69 @@ FONT_SIZE = 16
 IP_ADDRESSES = ["192.168.1.1", "192.168.1.102"]
 GATEWAY_IP = "192.168.1.1"
 
-def main():
-    pygame.init()
-    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
-    pygame.display.set_caption("Сетевой Визуализатор")
-    font = pygame.font.SysFont(None, FONT_SIZE)
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Сетевой Визуализатор")
+    parser.add_argument("--connect", metavar="HOST:PORT|unix:PATH",
+                        help="показывать узлы процесса, запущенного с --publish, вместо демонстрационных")
+    parser.add_argument("--startup-profile", action="store_true",
+                        help="вывести разбивку времени запуска по этапам и отложенным импортам")
+    return parser.parse_args(argv)
 
-    # --- Расчет позиций узлов ---
+def layout_nodes(ip_addresses, gateway_ip):
     nodes = {}
     center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
     
     # Разделяем роутер и остальные устройства
-    client_ips = [ip for ip in IP_ADDRESSES if ip != GATEWAY_IP]
+    client_ips = [ip for ip in ip_addresses if ip != gateway_ip]
     
     # Позиция роутера
-    nodes[GATEWAY_IP] = (center_x, center_y)
+    nodes[gateway_ip] = (center_x, center_y)
     
-    # Позиции остальных ��стройств по кругу
-    num_clients = len(client_ips)
+    # Позиции остальных устройств по кругу
     radius = min(SCREEN_WIDTH, SCREEN_HEIGHT) / 3
-    angle_step = 2 * math.pi / num_clients if num_clients > 0 else 0
+    nodes.update(ring_positions(client_ips, (center_x, center_y), radius))
+    return nodes
 
-    for i, ip in enumerate(client_ips):
-        angle = i * angle_step
-        x = center_x + int(radius * math.cos(angle))
-        y = center_y + int(radius * math.sin(angle))
-        nodes[ip] = (x, y)
+def main(argv=None):
+    startup = StartupProfile()
+    args = parse_args(argv)
+    startup.mark("args")
+    ip_addresses, gateway_ip = list(IP_ADDRESSES), GATEWAY_IP
+    subscriber = None
+    if args.connect:
+        try:
+            with startup.stage("connect", args.startup_profile):
+                subscriber = StateSubscriber(args.connect).start()
+        except OSError as e:
+            print(f"Не удалось подключиться к {args.connect}: {e}")
+            startup.mark("connect (ошибка)")
+            if args.startup_profile: startup.report()
+            return 1
+        ip_addresses, gateway_ip = [subscriber.gateway_ip, subscriber.host_ip], subscriber.gateway_ip
+
+    import pygame  # после подключения к издателю: ошибка подключения сообщается без загрузки pygame
+    startup.mark("import pygame")
+    pygame.init()
+    screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
+    pygame.display.set_caption("Сетевой Визуализатор")
+    font = pygame.font.SysFont(None, FONT_SIZE)
+    startup.mark("display")
+
+    # --- Расчет позиций узлов ---
+    nodes = layout_nodes(ip_addresses, gateway_ip)
 
     # --- Главный цикл ---
+    first_frame = True
     running = True
     while running:
+        # В клиентском режиме узлы приходят дельтами от издателя
+        if subscriber:
+            events, _ = subscriber.poll()
+            for kind, ip, _ in events:
+                if kind == EVENT_JOIN and ip not in ip_addresses: ip_addresses.append(ip)
+                elif kind == EVENT_LEAVE and ip in ip_addresses[2:]: ip_addresses.remove(ip)
+            if events: nodes = layout_nodes(ip_addresses, gateway_ip)
+
         for event in pygame.event.get():
             if event.type == pygame.QUIT:
                 running = False
@@ -53,15 +90,15 @@ def main():
         screen.fill(BACKGROUND_COLOR)
 
         # 1. Отрисовка линий
-        router_pos = nodes.get(GATEWAY_IP)
+        router_pos = nodes.get(gateway_ip)
         if router_pos:
             for ip, pos in nodes.items():
-                if ip != GATEWAY_IP:
+                if ip != gateway_ip:
                     pygame.draw.line(screen, LINE_COLOR, router_pos, pos, 2)
 
         # 2. Отрисовка узлов и текста
         for ip, pos in nodes.items():
-            color = ROUTER_COLOR if ip == GATEWAY_IP else NODE_COLOR
+            color = ROUTER_COLOR if ip == gateway_ip else NODE_COLOR
             pygame.draw.circle(screen, color, pos, NODE_RADIUS)
             
             # Подпись IP-адреса
@@ -70,8 +107,13 @@ def main():
             screen.blit(text_surface, text_rect)
 
         pygame.display.flip()
+        if first_frame:
+            first_frame = False
+            startup.mark("first frame")
+            if args.startup_profile: startup.report()
 
+    if subscriber: subscriber.stop()
     pygame.quit()
 
 if __name__ == '__main__':
-    main()
+    sys.exit(main())
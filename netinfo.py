@@ -0,0 +1,192 @@
+import fcntl
+import ipaddress
+import os
+import re
+import socket
+import struct
+import subprocess
+import sys
+import time
+
+# --- Параметры определения сети ---
+CACHE_TTL = 30.0         # без сокета уведомлений кэш перечитывается не чаще, чем раз в CACHE_TTL, с
+PROC_ROUTE = "/proc/net/route"
+SYS_NET = "/sys/class/net"
+
+# Флаги интерфейсов и маршрутов (одинаковы в Linux и BSD для нужных нам битов)
+IFF_UP = 0x1
+IFF_LOOPBACK = 0x8
+IFF_POINTOPOINT = 0x10
+RTF_UP = 0x1
+RTF_GATEWAY = 0x2
+
+# ioctl Linux для адреса и маски интерфейса
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891B
+
+# Группы netlink: изменения линков, IPv4-адресов и IPv4-маршрутов
+RTMGRP_LINK = 0x1
+RTMGRP_IPV4_IFADDR = 0x10
+RTMGRP_IPV4_ROUTE = 0x40
+
+
+# --- Linux: /proc/net/route, /sys/class/net, ioctl ---
+def _hex_ip(value):
+    """Адрес из /proc/net/route: ядро печатает 32-битное значение в порядке байт хоста (на x86 — little-endian)."""
+    return socket.inet_ntoa(struct.pack("=I", int(value, 16)))
+
+def _read(path):
+    try:
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def _ioctl_ipv4(sock, name, request):
+    try:
+        packed = fcntl.ioctl(sock.fileno(), request, struct.pack("256s", name.encode()[:15]))
+    except OSError:
+        return None
+    return socket.inet_ntoa(packed[20:24])
+
+def _linux_routes():
+    """[(iface, dest, mask, gateway, flags, metric)] из /proc/net/route."""
+    routes = []
+    with open(PROC_ROUTE) as f:
+        next(f, None)  # заголовок
+        for line in f:
+            fields = line.split()
+            if len(fields) < 8: continue
+            routes.append((fields[0], _hex_ip(fields[1]), _hex_ip(fields[7]), _hex_ip(fields[2]),
+                           int(fields[3], 16), int(fields[6])))
+    return routes
+
+def _linux_interfaces():
+    routes = _linux_routes()
+    defaults = sorted((metric, iface, gateway) for iface, dest, mask, gateway, flags, metric in routes
+                      if dest == "0.0.0.0" and mask == "0.0.0.0" and flags & RTF_UP and flags & RTF_GATEWAY)
+    gateways = {}
+    for metric, iface, gateway in defaults:
+        gateways.setdefault(iface, (gateway, metric))
+    best_default = defaults[0][1] if defaults else None
+
+    result = []
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    try:
+        for name in sorted(os.listdir(SYS_NET)):
+            flags = int(_read(f"{SYS_NET}/{name}/flags") or "0", 16)
+            ip = _ioctl_ipv4(sock, name, SIOCGIFADDR)
+            netmask = _ioctl_ipv4(sock, name, SIOCGIFNETMASK)
+            if not ip or not netmask: continue
+            mac = _read(f"{SYS_NET}/{name}/address")
+            gateway = gateways.get(name)
+            result.append(_make_interface(name, ip, netmask, mac, flags,
+                                          gateway[0] if gateway else None, name == best_default))
+    finally:
+        sock.close()
+    return result
+
+
+# --- macOS/BSD: разбор netstat и ifconfig (запасной вариант) ---
+def _bsd_interfaces():
+    netstat_output = subprocess.check_output(["netstat", "-nr", "-f", "inet"], text=True)
+    ifconfig_output = subprocess.check_output(["ifconfig", "-a"], text=True)
+    gateways, best_default, netif = {}, None, None
+    for line in netstat_output.splitlines():
+        fields = line.split()
+        if fields[:1] == ["Destination"] and "Netif" in fields:
+            netif = fields.index("Netif")  # набор колонок зависит от версии macOS
+        elif netif and fields[0:1] == ["default"] and len(fields) > netif and re.match(r"[\d\.]+$", fields[1]):
+            gateways.setdefault(fields[netif], fields[1])
+            if best_default is None: best_default = fields[netif]
+
+    result = []
+    for block in re.split(r"\n(?=\S)", ifconfig_output):
+        header = re.match(r"^(\S+?): flags=([0-9a-f]+)", block)
+        inet = re.search(r"inet ([\d\.]+) netmask (0x[0-9a-f]+)", block)
+        if not header or not inet: continue
+        name, flags = header.group(1), int(header.group(2), 16)
+        netmask = socket.inet_ntoa(struct.pack("!I", int(inet.group(2), 16)))
+        ether = re.search(r"ether ([0-9a-f:]{17})", block)
+        result.append(_make_interface(name, inet.group(1), netmask, ether.group(1) if ether else None, flags,
+                                      gateways.get(name), name == best_default))
+    return result
+
+
+def _make_interface(name, ip, netmask, mac, flags, gateway, default):
+    network = ipaddress.ip_network(f"{ip}/{netmask}", strict=False)
+    # Кандидат для ARP-сканирования: поднятый широковещательный интерфейс с MAC-адресом
+    # (loopback, VPN и прочие point-to-point туннели отсеиваются)
+    candidate = bool(flags & IFF_UP) and not flags & (IFF_LOOPBACK | IFF_POINTOPOINT) \
+        and bool(mac) and mac != "00:00:00:00:00:00" and network.prefixlen < 31
+    return {'name': name, 'ip': ip, 'network': network, 'mac': mac, 'gateway': gateway,
+            'default': default, 'candidate': candidate}
+
+
+# --- Уведомления об изменении маршрутов ---
+class _RouteWatcher:
+    """
+    Неблокирующий сокет уведомлений ядра (netlink в Linux, PF_ROUTE в BSD/macOS).
+    Любое сообщение в нем — повод перечитать интерфейсы; без сокета работает TTL.
+    """
+
+    def __init__(self):
+        self._sock = None
+        try:
+            if sys.platform.startswith("linux"):
+                self._sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, 0)  # NETLINK_ROUTE
+                self._sock.bind((0, RTMGRP_LINK | RTMGRP_IPV4_IFADDR | RTMGRP_IPV4_ROUTE))
+            elif hasattr(socket, "AF_ROUTE"):
+                self._sock = socket.socket(socket.AF_ROUTE, socket.SOCK_RAW, 0)
+            if self._sock: self._sock.setblocking(False)
+        except OSError:
+            self._sock = None
+        self._loaded_at = 0.0
+
+    def changed(self):
+        """True, если с прошлой загрузки маршруты/адреса менялись (или истек TTL без сокета)."""
+        if self._sock is None:
+            return time.time() - self._loaded_at > CACHE_TTL
+        dirty = False
+        while True:
+            try:
+                if not self._sock.recv(65536): break
+                dirty = True
+            except (BlockingIOError, InterruptedError):
+                break
+            except OSError:
+                return True
+        return dirty
+
+    def loaded(self):
+        self._loaded_at = time.time()
+
+
+_cache = None
+_watcher = None
+
+def interfaces(refresh=False):
+    """
+    Все интерфейсы с IPv4-адресом: [{'name', 'ip', 'network', 'mac', 'gateway', 'default', 'candidate'}].
+    Результат кэшируется и перечитывается только после изменения маршрутов или адресов.
+    """
+    global _cache, _watcher
+    if _watcher is None: _watcher = _RouteWatcher()
+    if _cache is None or refresh or _watcher.changed():
+        _cache = _linux_interfaces() if os.path.exists(PROC_ROUTE) else _bsd_interfaces()
+        _watcher.loaded()
+    return _cache
+
+def get_lan_info():
+    """
+    (host_ip, gateway_ip, interface) физической локальной сети с маршрутом по умолчанию.
+    VPN-туннели пропускаются; если определить не удалось — (None, None, None).
+    """
+    try:
+        found = [i for i in interfaces() if i['candidate'] and i['gateway']]
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"Не удалось получить параметры сетевых интерфейсов: {e}")
+        return None, None, None
+    if not found: return None, None, None
+    best = next((i for i in found if i['default']), found[0])
+    return best['ip'], best['gateway'], best['name']
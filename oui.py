@@ -0,0 +1,194 @@
+import argparse
+import bisect
+import csv
+import functools
+import mmap
+import os
+import re
+import struct
+import sys
+import threading
+from array import array
+
+# --- Параметры справочника производителей ---
+OUI_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "oui.bin")
+MEMO_SIZE = 16384                 # сколько MAC помнит lookup() (на порядок больше типичной сети)
+LOCAL_VENDOR = "Private (random)"  # локально администрируемый MAC: рандомизация телефонов, ВМ
+PREFIX_BITS = (36, 28, 24)        # MA-S, MA-M, MA-L: сначала ищется самый длинный префикс
+
+# Формат oui.bin (little-endian): заголовок, отсортированные ключи каждой таблицы,
+# смещения имен (uint32 на запись, в порядке таблиц) и блок имен, разделенных нулевым байтом.
+_MAGIC = b"OUI1"
+_HEADER = struct.Struct("<4sIIII4x")  # magic, записей /24, /28, /36, длина блока имен
+_KEY_TYPES = {24: 'I', 28: 'I', 36: 'Q'}
+_IEEE_REGISTRIES = {"MA-L": 24, "MA-M": 28, "MA-S": 36}
+
+
+def _mac_value(mac):
+    """MAC в виде 48-битного числа (None, если это не MAC)."""
+    try:
+        digits = mac.replace(":", "").replace("-", "").replace(".", "")
+        return int(digits, 16) if len(digits) == 12 else None
+    except (AttributeError, ValueError):
+        return None
+
+
+class OuiIndex:
+    """
+    Индекс префиксов OUI поверх отображенного в память oui.bin: три отсортированных
+    массива ключей (/36, /28, /24) и общий блок имен. В память процесса ничего не
+    копируется — поиск это bisect по memoryview и чтение одного имени из блока.
+    """
+
+    def __init__(self, path=OUI_PATH):
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n24, n28, n36, names_len = _HEADER.unpack_from(self._map)
+        if magic != _MAGIC:
+            raise ValueError(f"{path}: неизвестный формат справочника OUI")
+        counts = {24: n24, 28: n28, 36: n36}
+        view = memoryview(self._map)
+        offset = _HEADER.size
+        self._tables = []
+        base = 0
+        for bits in (24, 28, 36):
+            typecode = _KEY_TYPES[bits]
+            size = array(typecode).itemsize
+            offset += -offset % size
+            keys = self._typed(view[offset:offset + counts[bits] * size], typecode)
+            self._tables.append((bits, keys, base))
+            offset += counts[bits] * size
+            base += counts[bits]
+        self._tables.sort(key=lambda table: PREFIX_BITS.index(table[0]))
+        self._offsets = self._typed(view[offset:offset + base * 4], 'I')
+        self._names_start = offset + base * 4
+        self._names_end = self._names_start + names_len
+
+    @staticmethod
+    def _typed(view, typecode):
+        if sys.byteorder == "little":
+            return view.cast(typecode)
+        keys = array(typecode, view.tobytes())  # на big-endian машине — копия с переворотом байт
+        keys.byteswap()
+        return keys
+
+    def __len__(self):
+        return len(self._offsets)
+
+    def find(self, value):
+        """Производитель для 48-битного MAC (самый длинный совпавший префикс) или None."""
+        for bits, keys, base in self._tables:
+            key = value >> (48 - bits)
+            i = bisect.bisect_left(keys, key)
+            if i < len(keys) and keys[i] == key:
+                start = self._names_start + self._offsets[base + i]
+                return self._map[start:self._map.find(b"\0", start, self._names_end)].decode("utf-8", "replace")
+        return None
+
+
+_index = None
+_index_lock = threading.Lock()
+
+def _load():
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = OuiIndex()
+                except (OSError, ValueError) as e:
+                    print(f"Справочник производителей недоступен: {e}")
+                    _index = False
+    return _index
+
+@functools.lru_cache(maxsize=MEMO_SIZE)
+def lookup(mac):
+    """
+    Производитель устройства по MAC-адресу (None, если неизвестен).
+    Результат запоминается на каждый MAC: повторный вызов — обращение к словарю,
+    поэтому первый вызов стоит делать в фоновом потоке, а не в кадре.
+    """
+    value = _mac_value(mac)
+    if value is None:
+        return None
+    if value >> 40 & 0x02:
+        return LOCAL_VENDOR
+    index = _load()
+    return index.find(value) if index else None
+
+
+# --- Сборка oui.bin ---
+def _read_ieee_csv(f):
+    """Выгрузка реестра IEEE (oui.csv, mam.csv, oui36.csv): Registry, Assignment, Organization Name."""
+    for row in csv.DictReader(f):
+        bits = _IEEE_REGISTRIES.get(row.get("Registry"))
+        name = (row.get("Organization Name") or "").strip()
+        if bits and name:
+            yield bits, int(row["Assignment"], 16), name
+
+def _read_manuf(f):
+    """Файл manuf в формате Wireshark: 'XX:XX:XX[:XX:XX][/bits] <tab> short <tab> long'."""
+    for line in f:
+        if not line.strip() or line.startswith("#"): continue
+        fields = [field.strip() for field in line.rstrip("\n").split("\t")]
+        match = re.match(r"^([0-9A-Fa-f:\-]+)(?:/(\d+))?$", fields[0])
+        if not match or len(fields) < 2: continue
+        digits = match.group(1).replace(":", "").replace("-", "")
+        bits = int(match.group(2)) if match.group(2) else len(digits) * 4
+        if bits not in _KEY_TYPES: continue
+        yield bits, int(digits, 16) >> (len(digits) * 4 - bits), fields[2] if len(fields) > 2 and fields[2] else fields[1]
+
+def build(sources, path=OUI_PATH):
+    """Компилирует выгрузки IEEE (CSV) или manuf Wireshark в oui.bin. Возвращает число записей."""
+    entries = {24: {}, 28: {}, 36: {}}
+    for source in sources:
+        with open(source, encoding="utf-8", errors="replace") as f:
+            reader = _read_ieee_csv if f.readline().startswith("Registry,") else _read_manuf
+            f.seek(0)
+            for bits, key, name in reader(f):
+                entries[bits][key] = name
+
+    names, name_offsets, blob_len = [], {}, 0
+    tables, offsets = {}, array('I')
+    for bits in (24, 28, 36):
+        keys = array(_KEY_TYPES[bits], sorted(entries[bits]))
+        tables[bits] = keys
+        for key in keys:
+            name = entries[bits][key].encode("utf-8")
+            if name not in name_offsets:
+                name_offsets[name] = blob_len
+                names.append(name + b"\0")
+                blob_len += len(name) + 1
+            offsets.append(name_offsets[name])
+    if sys.byteorder != "little":
+        for keys in (*tables.values(), offsets): keys.byteswap()
+
+    with open(path + ".tmp", "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(tables[24]), len(tables[28]), len(tables[36]), blob_len))
+        for bits in (24, 28, 36):
+            f.write(bytes(-f.tell() % tables[bits].itemsize))
+            f.write(tables[bits].tobytes())
+        f.write(offsets.tobytes())
+        f.write(b"".join(names))
+    os.replace(path + ".tmp", path)
+    return len(offsets)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Офлайн-справочник производителей сетевых карт (IEEE OUI)")
+    parser.add_argument("macs", nargs="*", metavar="MAC", help="MAC-адреса для поиска")
+    parser.add_argument("--build", nargs="+", metavar="FILE",
+                        help="собрать индекс из oui.csv / mam.csv / oui36.csv IEEE или manuf Wireshark")
+    parser.add_argument("--output", default=OUI_PATH, help="куда записать индекс (по умолчанию: %(default)s)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.build:
+        count = build(args.build, args.output)
+        print(f"Записано {count} префиксов в {args.output} ({os.path.getsize(args.output)} байт)")
+    for mac in args.macs:
+        print(f"{mac}\t{lookup(mac) or 'Unknown'}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,118 @@
+import pygame
+from profiling import timed_import
+
+# --- Параметры системы частиц ---
+INITIAL_CAPACITY = 1024
+PACKET_SPEED = 0.02      # доля пути за кадр
+PACKET_SIZE = 3
+PACKET_COLOR = (255, 255, 0)
+
+
+class ParticleSystem:
+    """
+    Анимация пакетов на предвыделенных массивах NumPy.
+    Живые частицы занимают плотный префикс [0, count), свободные слоты — хвост массивов.
+    step() сдвигает все частицы одним векторным шагом и уплотняет префикс
+    булевой маской вместо list.remove; draw() рисует всё одним вызовом blits.
+    Массивы выделяются при первом spawn(): пока пакетов нет, numpy не загружается.
+    """
+
+    def __init__(self, capacity=INITIAL_CAPACITY, size=PACKET_SIZE):
+        self.size = size
+        self.count = 0
+        self._palette = []     # [цвет] — индекс хранится в массиве color
+        self._sprites = []     # [Surface] — отрисованная точка каждого цвета
+        self._capacity = capacity
+        self.progress = None   # массивы появляются в _allocate()
+
+    def _allocate(self, capacity):
+        np = timed_import("numpy")
+        self.start = np.zeros((capacity, 2), dtype=np.float32)
+        self.delta = np.zeros((capacity, 2), dtype=np.float32)  # end - start
+        self.progress = np.zeros(capacity, dtype=np.float32)
+        self.speed = np.zeros(capacity, dtype=np.float32)
+        self.color = np.zeros(capacity, dtype=np.uint8)
+
+    def _grow(self):
+        old = (self.start, self.delta, self.progress, self.speed, self.color)
+        self._allocate(len(self.progress) * 2)
+        for new, prev in zip((self.start, self.delta, self.progress, self.speed, self.color), old):
+            new[:self.count] = prev[:self.count]
+
+    def __len__(self):
+        return self.count
+
+    def _color_index(self, color):
+        if color not in self._palette:
+            self._palette.append(color)
+            sprite = pygame.Surface((self.size * 2 + 1, self.size * 2 + 1), pygame.SRCALPHA)
+            pygame.draw.circle(sprite, color, (self.size, self.size), self.size)
+            if pygame.display.get_surface() is not None: sprite = sprite.convert_alpha()
+            self._sprites.append(sprite)
+        return self._palette.index(color)
+
+    def spawn(self, start_pos, end_pos, speed=PACKET_SPEED, color=PACKET_COLOR):
+        if self.progress is None:
+            self._allocate(self._capacity)
+        elif self.count == len(self.progress):
+            self._grow()
+        i = self.count
+        self.start[i] = start_pos
+        self.delta[i] = (end_pos[0] - start_pos[0], end_pos[1] - start_pos[1])
+        self.progress[i] = 0.0
+        self.speed[i] = speed
+        self.color[i] = self._color_index(color)
+        self.count += 1
+
+    def step(self):
+        """Продвигает все частицы и уплотняет массивы, выкидывая долетевшие."""
+        n = self.count
+        if not n:
+            return
+        progress = self.progress[:n]
+        progress += self.speed[:n]
+        alive = progress <= 1.0
+        if alive.all():
+            return
+        k = int(timed_import("numpy").count_nonzero(alive))
+        for array in (self.start, self.delta, self.progress, self.speed, self.color):
+            array[:k] = array[:n][alive]
+        self.count = k
+
+    def positions(self, transform=None):
+        """Позиции частиц; transform = (масштаб, сдвиг x, сдвиг y) переводит их в экранные координаты."""
+        np = timed_import("numpy")
+        n = self.count
+        if self.progress is None:
+            return np.zeros((0, 2), dtype=np.int32)
+        pos = self.start[:n] + self.delta[:n] * self.progress[:n, None]
+        if transform:
+            scale, dx, dy = transform
+            pos = pos * scale + np.array((dx, dy), dtype=np.float32)
+        return pos.astype(np.int32)
+
+    def visible(self, bounds, transform=None):
+        """(левые верхние углы, индексы цветов) частиц, чьи спрайты задевают bounds = (w, h)."""
+        if not self.count:
+            return self.positions(), []
+        corners = self.positions(transform) - self.size
+        side = self.size * 2 + 1
+        inside = ((corners[:, 0] > -side) & (corners[:, 0] < bounds[0]) &
+                  (corners[:, 1] > -side) & (corners[:, 1] < bounds[1]))
+        return corners[inside], self.color[:self.count][inside]
+
+    def rects(self, bounds, transform=None):
+        """Прямоугольники видимых частиц (для режима грязных прямоугольников)."""
+        if not self.count:
+            return []
+        side = self.size * 2 + 1
+        corners, _ = self.visible(bounds, transform)
+        return [pygame.Rect(x, y, side, side) for x, y in corners.tolist()]
+
+    def draw(self, screen, transform=None):
+        """Рисует частицы, попавшие на экран; остальные отсекаются маской до blits."""
+        if not self.count:
+            return
+        corners, colors = self.visible(screen.get_size(), transform)
+        sprites = self._sprites
+        screen.blits([(sprites[c], xy) for c, xy in zip(colors.tolist(), corners.tolist())], doreturn=False)
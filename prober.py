@@ -0,0 +1,155 @@
+import asyncio
+import itertools
+import os
+import queue
+import socket
+import struct
+import threading
+import time
+from profiling import record
+
+# --- Параметры ICMP-пробера ---
+PING_TIMEOUT = 1.0      # ожидание ответа, с
+MAX_IN_FLIGHT = 256     # сколько эхо-запросов может быть в полете одновременно
+PAYLOAD = b"sci-fi-monitor.."
+
+ICMP_ECHO_REQUEST = 8
+ICMP_ECHO_REPLY = 0
+
+
+def _checksum(data):
+    if len(data) % 2:
+        data += b"\0"
+    total = sum(struct.unpack(f"!{len(data) // 2}H", data))
+    total = (total >> 16) + (total & 0xFFFF)
+    total += total >> 16
+    return ~total & 0xFFFF
+
+
+def _open_icmp_socket():
+    """Непривилегированный ICMP-сокет (Linux/macOS), при отказе — raw (нужен root)."""
+    try:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM, socket.IPPROTO_ICMP)
+        raw = False
+    except PermissionError:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_RAW, socket.IPPROTO_ICMP)
+        raw = True
+    sock.setblocking(False)
+    return sock, raw
+
+
+class IcmpProber:
+    """
+    ICMP-пробер на одном asyncio-цикле в отдельном потоке.
+    Запросы сопоставляются с ответами по id/sequence, RTT измеряется в микросекундах,
+    результаты отдаются в UI через потокобезопасную очередь results:
+    (ip, "success"/"fail", rtt_us или None, time.time()).
+    """
+
+    def __init__(self, timeout=PING_TIMEOUT, max_in_flight=MAX_IN_FLIGHT):
+        self.timeout = timeout
+        self.max_in_flight = max_in_flight
+        self.results = queue.SimpleQueue()
+        self._ident = os.getpid() & 0xFFFF
+        self._seq = itertools.count()
+        self._pending = {}   # {seq: (ip, future, t_send_ns)}
+        self._targets = ()   # адреса для периодического опроса
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="icmp-prober", daemon=True)
+        self._sock = None
+        self._raw = False
+
+    # --- Публичный API (вызывается из любого потока) ---
+    def start(self):
+        self._sock, self._raw = _open_icmp_socket()
+        self._thread.start()
+        return self
+
+    def ping(self, ip):
+        """Ставит одиночный пинг в очередь цикла; результат придет в results."""
+        asyncio.run_coroutine_threadsafe(self._probe(ip), self._loop)
+
+    def set_targets(self, ips):
+        """Заменяет список адресов для периодического опроса."""
+        self._targets = tuple(ips)
+
+    def ping_every(self, interval):
+        """Пингует все адреса из set_targets каждые interval секунд."""
+        asyncio.run_coroutine_threadsafe(self._periodic(interval), self._loop)
+
+    def drain(self, limit=1024):
+        drained = []
+        while len(drained) < limit:
+            try:
+                drained.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        return drained
+
+    def stop(self):
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=2)
+
+    # --- Внутренняя часть (поток цикла) ---
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.max_in_flight)
+        self._loop.add_reader(self._sock.fileno(), self._on_readable)
+        try:
+            self._loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.remove_reader(self._sock.fileno())
+            self._sock.close()
+            self._loop.close()
+
+    async def _periodic(self, interval):
+        while True:
+            started = time.monotonic()
+            await asyncio.gather(*(self._probe(ip) for ip in self._targets))
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    async def _probe(self, ip):
+        started = time.perf_counter()
+        async with self._semaphore:
+            seq = next(self._seq) & 0xFFFF
+            header = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, 0, self._ident, seq)
+            packet = struct.pack("!BBHHH", ICMP_ECHO_REQUEST, 0, _checksum(header + PAYLOAD),
+                                 self._ident, seq) + PAYLOAD
+            future = self._loop.create_future()
+            self._pending[seq] = (ip, future, time.perf_counter_ns())
+            try:
+                self._sock.sendto(packet, (ip, 0))
+                rtt_us = await asyncio.wait_for(future, self.timeout)
+                status = "success"
+            except (OSError, asyncio.TimeoutError):
+                rtt_us, status = None, "fail"
+            finally:
+                self._pending.pop(seq, None)
+            self.results.put((ip, status, rtt_us, time.time()))
+            record("probe.ping", time.perf_counter() - started)  # с ожиданием очереди и таймаутами
+
+    def _on_readable(self):
+        while True:
+            try:
+                data, (src, _) = self._sock.recvfrom(2048)
+            except (BlockingIOError, InterruptedError):
+                return
+            received_ns = time.perf_counter_ns()
+            # raw-сокеты (и DGRAM на macOS) отдают пакет вместе с IP-заголовком
+            if data and data[0] >> 4 == 4:
+                data = data[(data[0] & 0x0F) * 4:]
+            if len(data) < 8:
+                continue
+            icmp_type, _, _, ident, seq = struct.unpack("!BBHHH", data[:8])
+            # В DGRAM-режиме Linux сам подменяет id на номер сокета — проверяем только для raw
+            if icmp_type != ICMP_ECHO_REPLY or (self._raw and ident != self._ident):
+                continue
+            entry = self._pending.get(seq)
+            if entry is None or entry[0] != src or entry[1].done():
+                continue
+            entry[1].set_result((received_ns - entry[2]) // 1000)
@@ -0,0 +1,170 @@
+import contextlib
+import importlib
+import math
+import sys
+import threading
+import time
+from array import array
+
+# --- Параметры профилирования ---
+BUCKETS_PER_OCTAVE = 4   # точность гистограммы: ~19% на корзину
+OCTAVES = 24             # диапазон от 1 мкс до ~16 с
+PROFILE_WINDOW = 2.0     # за какой период показываются перцентили на оверлее, с
+FRAME_PHASES = ("events", "scene", "spawn", "packets", "edges", "nodes", "panel", "flip")
+
+
+class Histogram:
+    """
+    Гистограмма длительностей с логарифмическими корзинами фиксированного размера.
+    record() — O(1) без выделения памяти; перцентиль — верхняя граница корзины.
+    """
+
+    __slots__ = ("_counts", "count", "total")
+
+    def __init__(self):
+        self._counts = array('L', bytes(array('L').itemsize * BUCKETS_PER_OCTAVE * OCTAVES))
+        self.count = 0
+        self.total = 0.0
+
+    def record(self, seconds):
+        us = seconds * 1e6
+        index = int(math.log2(us) * BUCKETS_PER_OCTAVE) if us > 1.0 else 0
+        self._counts[min(index, len(self._counts) - 1)] += 1
+        self.count += 1
+        self.total += seconds
+
+    def percentile(self, q):
+        """Перцентиль в секундах (None, если записей нет)."""
+        if not self.count:
+            return None
+        rank = max(1, math.ceil(q * self.count / 100))
+        seen = 0
+        for index, n in enumerate(self._counts):
+            seen += n
+            if seen >= rank:
+                return 2 ** ((index + 1) / BUCKETS_PER_OCTAVE) / 1e6
+        return None
+
+    def mean(self):
+        return self.total / self.count if self.count else None
+
+    def summary(self, quantiles=(50, 95, 99)):
+        return {'count': self.count, 'mean': self.mean(), 'total': self.total,
+                **{f"p{q}": self.percentile(q) for q in quantiles}}
+
+    def reset(self):
+        for i in range(len(self._counts)):
+            self._counts[i] = 0
+        self.count = 0
+        self.total = 0.0
+
+
+# --- Фоновые операции (сканирование, пинги) ---
+_histograms = {}
+_lock = threading.Lock()
+
+def record(name, seconds):
+    """Записывает длительность операции name; безопасно вызывать из любого потока."""
+    histogram = _histograms.get(name)
+    if histogram is None:
+        with _lock:
+            histogram = _histograms.setdefault(name, Histogram())
+    histogram.record(seconds)
+
+def operations():
+    """{имя: сводка} по всем операциям, записанным через record()."""
+    with _lock:  # фоновые потоки добавляют новые имена прямо во время чтения оверлеем
+        items = sorted(_histograms.items())
+    return {name: histogram.summary() for name, histogram in items}
+
+def timed_import(name):
+    """Импортирует модуль по требованию; первая загрузка записывается как операция import.<name>."""
+    module = sys.modules.get(name)
+    if module is None:
+        started = time.perf_counter()
+        module = importlib.import_module(name)
+        record(f"import.{name}", time.perf_counter() - started)
+    return module
+
+
+class StartupProfile:
+    """
+    Разбивка запуска на этапы для --startup-profile: mark(этап) относит к этапу время
+    с прошлой отметки. Все, что было до main() (интерпретатор и импорты верхнего уровня),
+    оценивается процессорным временем процесса на момент создания профиля.
+    """
+
+    def __init__(self):
+        self.before_main = time.process_time()
+        self._start = self._last = time.perf_counter()
+        self.phases = []
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self.phases.append((phase, now - self._last))
+        self._last = now
+
+    @contextlib.contextmanager
+    def stage(self, phase, report=False):
+        """Этап, который может завершить процесс через sys.exit: с report профиль печатается и тогда."""
+        try:
+            yield
+        except SystemExit:
+            self.mark(f"{phase} (выход)")
+            if report: self.report()
+            raise
+        self.mark(phase)
+
+    def report(self):
+        lines = [f"  до main() (интерпретатор и импорты, CPU): {self.before_main * 1000:.0f} мс"]
+        lines += [f"  {phase}: {seconds * 1000:.0f} мс" for phase, seconds in self.phases]
+        lines.append(f"  итого с начала main(): {(self._last - self._start) * 1000:.0f} мс")
+        for name, summary in operations().items():
+            if name.startswith("import."):
+                lines.append(f"  {name} (по требованию, в фоне): {summary['total'] * 1000:.0f} мс")
+        print("Профиль запуска:\n" + "\n".join(lines))
+
+
+class FrameProfiler:
+    """
+    Разметка кадра на фазы: mark(фаза) относит время с прошлой отметки к фазе,
+    end_frame() складывает накопленное за кадр в гистограммы.
+    Раз в window секунд гистограммы сворачиваются в сводку для оверлея и обнуляются.
+    """
+
+    def __init__(self, phases=FRAME_PHASES, window=PROFILE_WINDOW):
+        self.phases = tuple(phases)
+        self.window = window
+        self._index = {phase: i for i, phase in enumerate(self.phases)}
+        self._acc = [0.0] * len(self.phases)
+        self._histograms = [Histogram() for _ in self.phases]
+        self._frame = Histogram()
+        self._window_start = time.perf_counter()
+        self._start = self._last = self._window_start
+        self.summary = None  # {'frame': сводка, 'phases': {фаза: сводка}, 'fps': ...}
+
+    def start_frame(self):
+        self._start = self._last = time.perf_counter()
+
+    def mark(self, phase):
+        now = time.perf_counter()
+        self._acc[self._index[phase]] += now - self._last
+        self._last = now
+
+    def end_frame(self):
+        now = time.perf_counter()
+        acc = self._acc
+        for i, histogram in enumerate(self._histograms):
+            histogram.record(acc[i])
+            acc[i] = 0.0
+        self._frame.record(now - self._start)
+        if now - self._window_start >= self.window:
+            self.summary = {
+                'frame': self._frame.summary(),
+                'phases': {phase: h.summary() for phase, h in zip(self.phases, self._histograms)},
+                'fps': self._frame.count / (now - self._window_start),
+            }
+            self._frame.reset()
+            for histogram in self._histograms:
+                histogram.reset()
+            self._window_start = now
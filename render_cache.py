@@ -0,0 +1,80 @@
+from collections import OrderedDict
+import pygame
+
+# --- Параметры кэша ---
+MAX_LABELS = 4096       # сколько отрисованных подписей держать (LRU)
+FLASH_ALPHA_STEPS = 16  # квантование прозрачности вспышки пинга
+
+
+class SurfaceCache:
+    """
+    Кэш заранее отрисованных поверхностей для цикла отрисовки:
+    свечение узлов (по типу и радиусу пульса), вспышки пинга (по статусу и
+    квантованной прозрачности), подписи (по шрифту, тексту и цвету), подложки панелей.
+    Запись меняется только при смене ключа, поэтому кадр сводится к blit-ам.
+    """
+
+    def __init__(self, glow_colors, flash_colors, node_radius, max_labels=MAX_LABELS):
+        self.glow_colors = glow_colors
+        self.flash_colors = flash_colors
+        self.node_radius = node_radius
+        self.max_labels = max_labels
+        self._glows = {}
+        self._flashes = {}
+        self._panels = {}
+        self._labels = OrderedDict()
+
+    def prewarm(self, radii):
+        """Отрисовывает свечение всех типов узлов для радиусов, которые реально встречаются."""
+        for node_type in self.glow_colors:
+            for radius in radii:
+                self.glow(node_type, radius)
+
+    def glow(self, node_type, radius):
+        key = (node_type, radius)
+        surface = self._glows.get(key)
+        if surface is None:
+            surface = pygame.Surface((radius * 2, radius * 2), pygame.SRCALPHA)
+            pygame.draw.circle(surface, self.glow_colors[node_type] + (80,), (radius, radius), radius)
+            self._glows[key] = surface = surface.convert_alpha()
+        return surface
+
+    def flash(self, status, alpha, node_radius=None):
+        """Вспышка вокруг узла радиуса node_radius (по умолчанию — исходного размера, без масштаба)."""
+        node_radius = node_radius or self.node_radius
+        step = round(alpha * (FLASH_ALPHA_STEPS - 1) / 255)
+        key = (status, step, node_radius)
+        surface = self._flashes.get(key)
+        if surface is None:
+            size = node_radius * 4
+            surface = pygame.Surface((size, size), pygame.SRCALPHA)
+            color = self.flash_colors[status] + (step * 255 // (FLASH_ALPHA_STEPS - 1),)
+            pygame.draw.circle(surface, color, (size // 2, size // 2), size // 2)
+            self._flashes[key] = surface = surface.convert_alpha()
+        return surface
+
+    def label(self, font, text, color):
+        key = (id(font), text, color)
+        surface = self._labels.get(key)
+        if surface is None:
+            surface = font.render(text, True, color)
+            self._labels[key] = surface
+            if len(self._labels) > self.max_labels:
+                self._labels.popitem(last=False)
+        else:
+            self._labels.move_to_end(key)
+        return surface
+
+    def forget_label(self, text):
+        """Сбрасывает подписи с данным текстом (например, узел пропал из сети)."""
+        for key in [key for key in self._labels if key[1] == text]:
+            del self._labels[key]
+
+    def panel(self, size, color):
+        key = (size, color)
+        surface = self._panels.get(key)
+        if surface is None:
+            surface = pygame.Surface(size, pygame.SRCALPHA)
+            surface.fill(color)
+            self._panels[key] = surface = surface.convert_alpha()
+        return surface
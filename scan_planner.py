@@ -0,0 +1,139 @@
+import ipaddress
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from arp_stream import stream_arp_sweep
+
+# --- Параметры планировщика ---
+SHARD_PREFIX = 24     # размер шарда: /24 = 256 адресов
+GLOBAL_PPS = 2000     # общий потолок ARP-запросов в секунду на все интерфейсы
+MAX_WORKERS = 4       # сколько шардов одновременно отправляют запросы
+MAX_WAITING = 16      # сколько шардов сверх того могут только ждать ответов (тихий шард ждет до MAX_WAIT)
+
+_SHARD_SENT = object()
+_SHARD_DONE = object()
+
+
+class RateLimiter:
+    """
+    Общий для всех потоков ограничитель темпа (виртуальное расписание).
+    reserve() выдает момент, не раньше которого можно отправить следующий пакет.
+    """
+
+    def __init__(self, pps):
+        self.interval = 1.0 / pps if pps else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self):
+        with self._lock:
+            slot = max(time.monotonic(), self._next)
+            self._next = slot + self.interval
+            return slot
+
+
+def parse_target(spec, default_interface):
+    """Разбирает цель вида 'CIDR' или 'CIDR@iface'."""
+    cidr, _, interface = spec.partition("@")
+    return ipaddress.ip_network(cidr.strip(), strict=False), interface or default_interface
+
+
+def iter_shards(targets, shard_prefix=SHARD_PREFIX):
+    """
+    Лениво режет цели [(network, iface), ...] на шарды (shard, iface, network), чередуя цели,
+    чтобы разные интерфейсы/VLAN сканировались параллельно. network — исходная цель:
+    по ней свип шарда понимает, какие адреса служебные (см. arp_stream.sweep_targets).
+    """
+    def shards_of(network, interface):
+        if network.prefixlen >= shard_prefix:
+            yield network, interface, network
+        else:
+            for subnet in network.subnets(new_prefix=shard_prefix):
+                yield subnet, interface, network
+
+    iterators = [shards_of(network, interface) for network, interface in targets]
+    while iterators:
+        alive = []
+        for it in iterators:
+            shard = next(it, None)
+            if shard is not None:
+                yield shard
+                alive.append(it)
+        iterators = alive
+
+
+def _shard_key(ip, shard_prefix):
+    return int(ipaddress.ip_address(ip)) >> (32 - shard_prefix)
+
+
+def sharded_sweep(targets, pps=GLOBAL_PPS, workers=MAX_WORKERS,
+                  shard_prefix=SHARD_PREFIX, expected=None, stop=None):
+    """
+    Сканирует набор подсетей шардами с общим потолком pps и отдает
+    устройства {'ip', 'mac', 'rtt', 'iface'} по мере ответа, без дубликатов.
+
+    Запросы одновременно отправляют не больше workers шардов; шард, который
+    все отправил и только ждет ответов, освобождает место следующему (таких
+    не больше MAX_WAITING), поэтому тихие шарды разреженной /16 не тормозят свип
+    своим дедлайном ожидания. Память ограничена размером шарда, а не размером
+    адресного пространства.
+    stop — threading.Event: после него новые шарды не запускаются, а текущие прерываются.
+    """
+    limiter = RateLimiter(pps)
+    results = queue.SimpleQueue()
+    shards = iter_shards(targets, shard_prefix)
+
+    expected_by_shard = {}
+    for ip in expected or ():
+        expected_by_shard.setdefault(_shard_key(ip, shard_prefix), set()).add(ip)
+
+    def work(network, interface, scope):
+        sent = False
+
+        def on_sent():
+            nonlocal sent
+            sent = True
+            results.put(_SHARD_SENT)
+
+        try:
+            key = int(network.network_address) >> (32 - shard_prefix)
+            for reply in stream_arp_sweep(str(network), interface, limiter=limiter, scope=scope,
+                                          expected=expected_by_shard.get(key), stop=stop, on_sent=on_sent):
+                reply['iface'] = interface
+                results.put(reply)
+        except Exception as e:
+            print(f"Ошибка сканирования шарда {network} ({interface}): {e}")
+        finally:
+            if not sent: results.put(_SHARD_SENT)
+            results.put(_SHARD_DONE)
+
+    seen = set()
+    with ThreadPoolExecutor(max_workers=workers + MAX_WAITING, thread_name_prefix="arp-shard") as pool:
+        sending = running = 0
+
+        def fill():
+            nonlocal sending, running
+            while sending < workers and running < workers + MAX_WAITING and not (stop is not None and stop.is_set()):
+                shard = next(shards, None)
+                if shard is None:
+                    return
+                pool.submit(work, *shard)
+                sending += 1
+                running += 1
+
+        fill()
+        while running:
+            item = results.get()
+            if item is _SHARD_SENT:
+                sending -= 1
+                fill()
+                continue
+            if item is _SHARD_DONE:
+                running -= 1
+                fill()
+                continue
+            if item['ip'] in seen:
+                continue
+            seen.add(item['ip'])
+            yield item
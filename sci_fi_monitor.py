@@ -1,14 +1,26 @@
-import pygame
 import math
-import ipaddress
-import subprocess
-import sys
-import re
 import random
-import threading
+import sys
 import time
-from scapy.all import ARP, Ether, srp
 import os
+import argparse
+import cProfile
+import pstats
+import zlib
+from monitor_core import MonitorCore, add_scan_arguments, resolve_network
+from state_stream import StateSubscriber
+from spatial_index import GridIndex, GridPyramid
+from camera import Camera, DETAIL_FULL, DETAIL_CLUSTERS
+from profiling import FrameProfiler, StartupProfile, operations
+from traffic import TrafficMonitor, DEFAULT_BPF
+from layout import LAYOUTS, GROUP_KEYS, make_layout
+from oui import lookup
+from alerts import format_alert
+from discovery import EVENT_JOIN, EVENT_LEAVE, EVENT_MAC_CHANGE
+
+# pygame (и зависящие от него модули отрисовки) загружается в main(), когда дело дошло до окна:
+# --help, нехватка прав или ненайденная сеть сообщаются без его импорта
+pygame = None
 
 # --- Параметры визуализации ---
 SCREEN_WIDTH, SCREEN_HEIGHT = 1280, 800
@@ -22,97 +34,405 @@ BUTTON_HOVER_COLOR = (100, 200, 255)
 
 NODE_COLORS = {"router": (255, 0, 100), "host": (0, 255, 255), "device": (0, 150, 255)}
 GLOW_COLORS = {"router": (100, 0, 50), "host": (0, 100, 100), "device": (0, 50, 100)}
+# Цвета устройств в режиме --color-by vendor: производитель всегда получает один и тот же цвет
+VENDOR_COLORS = [(0, 150, 255), (255, 160, 0), (170, 90, 255), (0, 230, 120), (255, 80, 200),
+                 (240, 240, 60), (90, 255, 255), (255, 110, 90), (120, 180, 60), (200, 200, 255)]
+VENDOR_MAX_CHARS = 26  # длиннее имя производителя в панели обрезается
+SERVICE_LINE_CHARS = 30  # длина строки сервиса (порт, имя, баннер) в панели
+MAX_SERVICE_LINES = 6    # остальные открытые порты сворачиваются в "+N more"
 PING_FLASH_COLORS = {"success": (0, 255, 0), "fail": (255, 0, 0)}
+SPARKLINE_COLOR = (0, 255, 180)
+SPARKLINE_BG_COLOR = (0, 20, 35)
+SPARKLINE_HEIGHT = 40
+PROFILE_KEY = "f3"  # показать/скрыть оверлей профилирования (имя клавиши pygame)
+ALERT_KEY = "f2"    # показать/скрыть журнал оповещений
+HOME_KEY = "home"   # вписать всю сеть в экран
+ALERT_COLORS = {"critical": (255, 40, 40), "warning": (255, 170, 0), "info": (0, 255, 120)}
+ALERT_HIGHLIGHT = 60.0     # сколько узел подсвечивается после оповещения, с
+ALERT_LOG_LINES = 6
+PROFILE_TEXT_COLOR = (180, 255, 180)
+PROFILE_OUT = "monitor.prof"
+PING_FLASH_DURATION = 0.5  # с
+FPS = 60
+IDLE_FPS = 10  # режим --dirty-rects, когда ничего не анимируется
+INPUT_HOLD = 0.5  # с после последнего ввода (мышь, колесико, клавиши), пока кадры идут с полной частотой
 
 NODE_RADIUS = 30
+NODE_REACH = NODE_RADIUS * 2 + 20  # насколько далеко от центра может рисовать узел (вспышка, подпись)
+MIN_NODE_RADIUS = 2      # px: мельче узел не становится при любом отдалении
+HIT_RADIUS = 8           # px: минимальный радиус попадания курсором по узлу
+CLUSTER_COLOR = (0, 70, 130)
+CLUSTER_MIN_RADIUS = 4
+CLUSTER_MAX_RADIUS = 28
+CLUSTER_ZOOM_STEPS = 4   # клик по кластеру приближает на столько щелчков колесика
 FONT_NAME = "Orbitron-Regular.ttf"
 FONT_SIZE = 14
 INFO_FONT_SIZE = 16
 TITLE_FONT_SIZE = 24
 
-# --- Глобальные переменные состояния ---
-ping_results = {}  # {ip: {"status": "success/fail", "timestamp": time.time()}}
-
-# --- Функции сканирования ---
-def get_lan_info_macos():
-    try:
-        netstat_output = subprocess.check_output(["netstat", "-nr", "-f", "inet"], text=True)
-        lan_gateway_match = re.search(r"^default\s+([\d\.]+)\s+.*? (en\d+)", netstat_output, re.MULTILINE)
-        if not lan_gateway_match: return None, None, None
-        gateway_ip, net_interface = lan_gateway_match.groups()
-        ifconfig_output = subprocess.check_output(["ifconfig", net_interface], text=True)
-        host_ip_match = re.search(r"inet ([\d\.]+) netmask", ifconfig_output)
-        if not host_ip_match: return None, None, None
-        host_ip = host_ip_match.group(1)
-        return host_ip, gateway_ip, net_interface
-    except Exception: return None, None, None
-
-def scan_network_with_mac(ip_range, interface):
-    print(f"Сканирование {ip_range} через {interface}...")
-    arp_request = ARP(pdst=ip_range)
-    broadcast = Ether(dst="ff:ff:ff:ff:ff:ff")
-    arp_request_broadcast = broadcast / arp_request
-    answered_list = srp(arp_request_broadcast, timeout=4, iface=interface, verbose=False)[0]
-    return [{'ip': r.psrc, 'mac': r.hwsrc} for _, r in answered_list]
-
-def run_ping(ip):
-    """Запускает ping в отдельном потоке."""
-    try:
-        # -c 1: 1 пакет, -W 1000: таймаут 1000 мс
-        command = ["ping", "-c", "1", "-W", "1000", ip]
-        result = subprocess.run(command, capture_output=True, text=True, timeout=2)
-        status = "success" if result.returncode == 0 else "fail"
-    except subprocess.TimeoutExpired:
-        status = "fail"
-    ping_results[ip] = {"status": status, "timestamp": time.time()}
-
-# --- Классы для анимации ---
-class Packet:
-    def __init__(self, start_pos, end_pos):
-        self.start_pos = start_pos
-        self.end_pos = end_pos
-        self.progress = 0.0
-        self.speed = 0.02
-        self.color = (255, 255, 0)
-        self.size = 3
-
-    def move(self):
-        self.progress += self.speed
-        if self.progress > 1.0:
-            return False
-        return True
-
-    def draw(self, screen):
-        x = self.start_pos[0] + (self.end_pos[0] - self.start_pos[0]) * self.progress
-        y = self.start_pos[1] + (self.end_pos[1] - self.start_pos[1]) * self.progress
-        pygame.draw.circle(screen, self.color, (int(x), int(y)), self.size)
+# --- Параметры трафика ---
+EDGE_BYTES_UNIT = 1024       # байт/с, с которых ребро начинает утолщаться
+EDGE_MAX_WIDTH = 8
+MAX_PARTICLES_PER_FLOW = 20  # частиц/с на один поток, сколько бы пакетов он ни нес
+
+# --- Обновление узлов ---
+def tag_vendor(data, mac, color_by_vendor=False):
+    """
+    Производитель узла по MAC. Поиск уже сделан в потоке обнаружения (или приема),
+    здесь lookup() отдает готовое значение из кэша и кадр не тормозит.
+    """
+    data['vendor'] = lookup(mac)
+    if color_by_vendor and data['type'] == 'device':
+        vendor = data['vendor'] or "Unknown"
+        data['color'] = VENDOR_COLORS[zlib.crc32(vendor.encode()) % len(VENDOR_COLORS)]
+
+def apply_discovery_events(nodes, events, host_ip, gateway_ip, color_by_vendor=False):
+    """Точечно добавляет/удаляет узлы по событиям обнаружения. Возвращает (добавленные, удаленные)."""
+    added, removed = [], []
+    for kind, ip, mac in events:
+        if kind == EVENT_JOIN:
+            if ip in nodes:
+                # У шлюза и хоста до первого ответа стоит заглушка — настоящий MAC нужен инвентарю и оповещениям
+                nodes[ip]['mac'] = mac
+                tag_vendor(nodes[ip], mac, color_by_vendor)
+                continue
+            nodes[ip] = {'pos': (0, 0), 'type': 'device', 'mac': mac}
+            tag_vendor(nodes[ip], mac, color_by_vendor)
+            added.append(ip)
+        elif kind == EVENT_MAC_CHANGE and ip in nodes:
+            print(f"MAC-адрес {ip} изменился: {nodes[ip]['mac']} -> {mac}")
+            nodes[ip]['mac'] = mac
+            tag_vendor(nodes[ip], mac, color_by_vendor)
+        elif kind == EVENT_LEAVE and ip in nodes and ip not in (host_ip, gateway_ip):
+            del nodes[ip]
+            removed.append(ip)
+    return added, removed
+
+def draw_sparkline(screen, rect, samples):
+    """Спарклайн RTT: линия по успешным сэмплам, красные риски — потери."""
+    pygame.draw.rect(screen, SPARKLINE_BG_COLOR, rect)
+    if not samples: return
+    peak = max((v for v in samples if v is not None), default=0) or 1
+    step = rect.width / max(1, len(samples) - 1)
+    points = []
+    for i, value in enumerate(samples):
+        x = rect.x + int(i * step)
+        if value is None:
+            pygame.draw.line(screen, PING_FLASH_COLORS["fail"], (x, rect.y), (x, rect.bottom - 1))
+            continue
+        points.append((x, rect.bottom - 1 - int((rect.height - 2) * value / peak)))
+    if len(points) > 1:
+        pygame.draw.lines(screen, SPARKLINE_COLOR, False, points)
+    elif points:
+        pygame.draw.circle(screen, SPARKLINE_COLOR, points[0], 2)
+
+# --- Камера и уровни детализации ---
+def node_radius(camera):
+    return max(MIN_NODE_RADIUS, round(NODE_RADIUS * camera.zoom))
+
+def cluster_radius(count):
+    return min(CLUSTER_MAX_RADIUS, CLUSTER_MIN_RADIUS + int(2 * math.log2(count)))
+
+def bundle_width(count):
+    return min(EDGE_MAX_WIDTH, 1 + int(math.log2(count)))
+
+def build_scene(camera, nodes, index, pyramid, gateway_ip, host_ip):
+    """
+    Что попадает в кадр при текущей камере, в экранных координатах: узлы или
+    (при отдалении и в переполненном кадре) кластеры, плюс пучки ребер к узлам за
+    краем экрана — по одному на крупную ячейку. Пересобирается только при сдвиге
+    камеры или раскладки; стоимость — по видимым объектам и занятым ячейкам.
+    """
+    view = camera.view_rect(NODE_REACH)
+    clusters = pyramid.level(camera.cluster_cell()).clusters(view)
+    detail = camera.detail(sum(count for count, _ in clusters))
+    if detail == DETAIL_CLUSTERS:
+        # Шлюз и сам хост видны всегда, остальное — кластерами
+        x, y, w, h = view
+        shown = [ip for ip in (gateway_ip, host_ip) if ip in nodes and
+                 x <= nodes[ip]['pos'][0] <= x + w and y <= nodes[ip]['pos'][1] <= y + h]
+        inside = clusters
+    else:
+        shown = index.query_rect(view)
+        inside = [(1, nodes[ip]['pos']) for ip in shown if ip != gateway_ip]
+        clusters = []
+    return {
+        'state': camera.state,
+        'detail': detail,
+        'radius': node_radius(camera),
+        'gateway': camera.to_screen(nodes[gateway_ip]['pos']) if gateway_ip in nodes else None,
+        'nodes': {ip: camera.to_screen(nodes[ip]['pos']) for ip in shown},
+        'clusters': [(count, camera.to_screen(pos)) for count, pos in clusters],
+        'bundles': [(count, camera.to_screen(pos)) for count, pos in pyramid.coarse.outside(inside)],
+    }
+
+def pick(scene, camera, index, mouse_pos):
+    """Что под курсором: (IP узла, None), (None, (число, позиция) кластера) или (None, None)."""
+    reach = max(scene['radius'], HIT_RADIUS)
+    if scene['detail'] != DETAIL_CLUSTERS:
+        return index.nearest(camera.to_world(mouse_pos), reach / camera.zoom), None
+    for ip, pos in scene['nodes'].items():
+        if math.hypot(mouse_pos[0] - pos[0], mouse_pos[1] - pos[1]) <= reach: return ip, None
+    best, best_dist = None, None
+    for count, pos in scene['clusters']:
+        dist = math.hypot(mouse_pos[0] - pos[0], mouse_pos[1] - pos[1])
+        if dist <= max(cluster_radius(count), HIT_RADIUS) and (best is None or dist < best_dist):
+            best, best_dist = (count, pos), dist
+    return None, best
+
+def draw_edges(surface, scene, gateway_ip, widths=None):
+    """Ребра от шлюза к видимым узлам, кластерам и пучкам; рисуется только часть, попавшая на экран."""
+    origin = scene['gateway']
+    if origin is None: return
+    clip = surface.get_rect()
+    for ip, pos in scene['nodes'].items():
+        segment = clip.clipline(origin, pos) if ip != gateway_ip else None
+        if segment: pygame.draw.line(surface, LINE_COLOR, *segment, widths.get(ip, 1) if widths else 1)
+    for count, pos in scene['clusters'] + scene['bundles']:
+        segment = clip.clipline(origin, pos)
+        if segment: pygame.draw.line(surface, LINE_COLOR, *segment, bundle_width(count))
+
+def draw_cluster(screen, cache, font, count, pos):
+    """Кластер узлов одним значком: размер растет с логарифмом числа узлов."""
+    radius = cluster_radius(count)
+    pygame.draw.circle(screen, CLUSTER_COLOR, pos, radius)
+    pygame.draw.circle(screen, NODE_COLORS['device'], pos, radius, 1)
+    if count > 1:
+        label = cache.label(font, str(count), TEXT_COLOR)
+        screen.blit(label, label.get_rect(center=pos))
+
+# --- Реальный трафик ---
+def flow_endpoints(src, dst, nodes, gateway_ip):
+    """Узлы, между которыми рисуется поток: адреса вне карты идут через шлюз."""
+    a = src if src in nodes else gateway_ip
+    b = dst if dst in nodes else gateway_ip
+    if a == b or a not in nodes or b not in nodes: return None
+    return a, b
+
+def edge_widths(rates, nodes, gateway_ip):
+    """Толщина ребра узел–шлюз по суммарной полосе узла (логарифмическая шкала)."""
+    load = {}
+    for (src, dst), (bps, _) in rates.items():
+        for ip in (src, dst):
+            if ip in nodes and ip != gateway_ip: load[ip] = load.get(ip, 0) + bps
+    return {ip: min(EDGE_MAX_WIDTH, 1 + int(math.log2(1 + bps / EDGE_BYTES_UNIT))) for ip, bps in load.items()}
+
+def spawn_traffic(packets, rates, nodes, gateway_ip, credit, dt):
+    """
+    Выпускает частицы пропорционально пакетам/с каждого потока.
+    credit — дробные остатки с прошлого кадра; возвращается новый словарь только
+    с активными потоками, так что он не растет вместе с историей трафика.
+    """
+    new_credit = {}
+    for (src, dst), (_, pps) in rates.items():
+        ends = flow_endpoints(src, dst, nodes, gateway_ip)
+        if not ends: continue
+        total = new_credit.get(ends, credit.get(ends, 0.0)) + min(pps, MAX_PARTICLES_PER_FLOW) * dt
+        count = int(total)
+        new_credit[ends] = total - count
+        for _ in range(count): packets.spawn(nodes[ends[0]]['pos'], nodes[ends[1]]['pos'])
+    return new_credit
+
+def label_rect(cache, font, ip, pos, radius=NODE_RADIUS):
+    return cache.label(font, ip, TEXT_COLOR).get_rect(center=(pos[0], pos[1] + radius + 15))
+
+def node_region(ip, pos, radius, labels, cache, font):
+    """Область, которую может задеть отрисовка узла: вспышка, свечение, кольца, подпись."""
+    reach = max(radius * 2, radius + 16)
+    region = pygame.Rect(pos[0] - reach, pos[1] - reach, reach * 2, reach * 2)
+    return region.union(label_rect(cache, font, ip, pos, radius)) if labels else region
+
+def draw_node(screen, cache, font, ip, data, pos, radius, glow_radius, selected, ping_result, now, alert=None):
+    """Узел в экранной позиции pos; glow_radius=None — упрощенный узел без свечения и подписи."""
+    node_type = data['type']
+
+    # Кольцо оповещения (цвет — по серьезности)
+    if alert:
+        pygame.draw.circle(screen, ALERT_COLORS[alert['severity']], pos, radius + 14, 3)
+
+    # Вспышка от пинга
+    if ping_result and now - ping_result["timestamp"] < PING_FLASH_DURATION:
+        flash_alpha = 255 * (1 - (now - ping_result["timestamp"]) / PING_FLASH_DURATION)
+        screen.blit(cache.flash(ping_result["status"], flash_alpha, radius), (pos[0] - radius*2, pos[1] - radius*2))
+
+    # Выделение выбранного узла
+    if selected:
+        pygame.draw.circle(screen, (255, 255, 0), pos, radius + 8, 2)
+
+    if glow_radius: screen.blit(cache.glow(node_type, glow_radius), (pos[0] - glow_radius, pos[1] - glow_radius))
+    pygame.draw.circle(screen, data.get('color') or NODE_COLORS[node_type], pos, radius)
+    if glow_radius: screen.blit(cache.label(font, ip, TEXT_COLOR), label_rect(cache, font, ip, pos, radius))
+
+def tooltip_rect(cache, font, text, mouse_pos):
+    size = cache.label(font, text, TEXT_COLOR).get_size()
+    return pygame.Rect(mouse_pos[0] + 14, mouse_pos[1] + 10, size[0] + 12, size[1] + 8)
+
+def draw_tooltip(screen, cache, font, text, rect):
+    screen.blit(cache.panel(rect.size, INFO_BG_COLOR), rect.topleft)
+    pygame.draw.rect(screen, LINE_COLOR, rect, 1)
+    screen.blit(cache.label(font, text, TEXT_COLOR), (rect.x + 6, rect.y + 4))
+
+def build_info_panel(selected_ip, data, ring, services=None, scanning=False, can_scan=False):
+    """Содержимое и размеры панели выбранного узла (без отрисовки)."""
+    info_text = [f"IP: {selected_ip}", f"MAC: {data['mac']}", f"Type: {data['type'].capitalize()}"]
+    vendor = data.get('vendor')
+    if vendor:
+        info_text.insert(2, "Vendor: " + (vendor if len(vendor) <= VENDOR_MAX_CHARS else vendor[:VENDOR_MAX_CHARS - 3] + "..."))
+    stats = ring.percentiles() if ring else None
+    if stats:
+        info_text.append("RTT p50/95/99: " + "/".join(f"{stats[q] / 1000:.1f}" for q in (50, 95, 99)) + " ms")
+    if ring:
+        info_text.append(f"Loss: {ring.loss_percent():.1f}% of {len(ring)}")
+    if scanning:
+        info_text.append("Services: scanning...")
+    elif services is not None:
+        info_text.append(f"Services: {len(services) or 'none'} open")
+        for port, name, banner in services[:MAX_SERVICE_LINES]:
+            info_text.append(f"  {port}/{name} {banner}"[:SERVICE_LINE_CHARS])
+        if len(services) > MAX_SERVICE_LINES:
+            info_text.append(f"  +{len(services) - MAX_SERVICE_LINES} more")
+    panel_w = 300
+    text_h = 50 + len(info_text) * 22
+    panel_h = text_h + (SPARKLINE_HEIGHT + 10 if ring else 0) + 45
+    rect = pygame.Rect(SCREEN_WIDTH - panel_w - 20, 20, panel_w, panel_h)
+    return {'rect': rect, 'lines': info_text, 'text_h': text_h, 'ring': ring, 'can_scan': can_scan}
+
+def draw_button(screen, cache, font, rect, text, mouse_pos):
+    pygame.draw.rect(screen, BUTTON_HOVER_COLOR if rect.collidepoint(mouse_pos) else BUTTON_COLOR, rect, border_radius=5)
+    text_surf = cache.label(font, text, (0,0,0))
+    screen.blit(text_surf, text_surf.get_rect(center=rect.center))
+
+def draw_info_panel(screen, cache, title_font, info_font, panel, mouse_pos):
+    """Рисует панель информации; возвращает прямоугольники кнопок Ping и Scan Ports (None, если сканера нет)."""
+    info_panel_rect, ring = panel['rect'], panel['ring']
+    panel_w = info_panel_rect.width
+    screen.blit(cache.panel(info_panel_rect.size, INFO_BG_COLOR), info_panel_rect.topleft)
+
+    title_surf = cache.label(title_font, "DEVICE INFO", TEXT_COLOR)
+    screen.blit(title_surf, (info_panel_rect.x + 20, info_panel_rect.y + 15))
+
+    for i, line in enumerate(panel['lines']):
+        info_surface = cache.label(info_font, line, INFO_TEXT_COLOR)
+        screen.blit(info_surface, (info_panel_rect.x + 20, info_panel_rect.y + 50 + i * 22))
+
+    if ring:
+        spark_rect = pygame.Rect(info_panel_rect.x + 20, info_panel_rect.y + panel['text_h'] + 5, panel_w - 40, SPARKLINE_HEIGHT)
+        draw_sparkline(screen, spark_rect, ring.samples())
+
+    ping_button_rect = pygame.Rect(info_panel_rect.x + 20, info_panel_rect.bottom - 35, panel_w - 40, 25)
+    scan_button_rect = None
+    if panel['can_scan']:
+        ping_button_rect.width = (panel_w - 50) // 2
+        scan_button_rect = ping_button_rect.move(ping_button_rect.width + 10, 0)
+        draw_button(screen, cache, info_font, scan_button_rect, "Scan Ports", mouse_pos)
+    draw_button(screen, cache, info_font, ping_button_rect, "Ping" if scan_button_rect else "Ping Device", mouse_pos)
+    return ping_button_rect, scan_button_rect
+
+def build_alert_log(alerts):
+    """Последние оповещения для журнала в левом нижнем углу: (текст, цвет) и прямоугольник."""
+    lines = [(format_alert(alert), ALERT_COLORS[alert['severity']]) for alert in list(alerts.recent)[-ALERT_LOG_LINES:]]
+    rect = pygame.Rect(20, SCREEN_HEIGHT - 40 - len(lines) * 18 - 20, 560, 40 + len(lines) * 18)
+    return {'rect': rect, 'lines': lines}
+
+def draw_alert_log(screen, cache, font, log):
+    rect = log['rect']
+    screen.blit(cache.panel(rect.size, INFO_BG_COLOR), rect.topleft)
+    pygame.draw.rect(screen, LINE_COLOR, rect, 1)
+    screen.blit(cache.label(font, "ALERTS (F2)", TEXT_COLOR), (rect.x + 10, rect.y + 8))
+    for i, (line, color) in enumerate(log['lines']):
+        screen.blit(cache.label(font, line, color), (rect.x + 10, rect.y + 32 + i * 18))
+
+def build_profile_overlay(profiler):
+    """Строки оверлея профилирования: перцентили кадра, доля фаз, фоновые операции."""
+    summary = profiler.summary
+    if not summary:
+        lines = ["collecting..."]
+    else:
+        frame = summary['frame']
+        lines = [f"FPS {summary['fps']:.1f}  frame p50/95/99: "
+                 + "/".join(f"{frame[q] * 1000:.1f}" for q in ('p50', 'p95', 'p99')) + " ms"]
+        for phase, stats in summary['phases'].items():
+            share = 100 * stats['mean'] / frame['mean'] if frame['mean'] else 0
+            lines.append(f"{phase}: {stats['p50'] * 1000:.2f} / {stats['p95'] * 1000:.2f} ms  {share:.0f}%")
+    for name, stats in operations().items():
+        lines.append(f"{name}: {stats['p50'] * 1000:.1f} / {stats['p95'] * 1000:.1f} ms  n={stats['count']}")
+    rect = pygame.Rect(20, 20, 330, 40 + len(lines) * 18)
+    return {'rect': rect, 'lines': lines}
+
+def draw_profile_overlay(screen, cache, font, overlay):
+    rect = overlay['rect']
+    screen.blit(cache.panel(rect.size, INFO_BG_COLOR), rect.topleft)
+    screen.blit(cache.label(font, "PROFILE (F3)", TEXT_COLOR), (rect.x + 10, rect.y + 10))
+    for i, line in enumerate(overlay['lines']):
+        screen.blit(cache.label(font, line, PROFILE_TEXT_COLOR), (rect.x + 10, rect.y + 32 + i * 18))
 
 # --- Основная функция ---
-def main():
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Sci-Fi Network Monitor")
+    add_scan_arguments(parser)
+    parser.add_argument("--connect", metavar="HOST:PORT|unix:PATH",
+                        help="не сканировать самому, а показывать состояние процесса, запущенного с --publish")
+    parser.add_argument("--dirty-rects", action="store_true",
+                        help="перерисовывать только изменившиеся области и снижать FPS в простое (для киосков 24/7); "
+                             "без --sniff/--pcap декоративные пакеты не показываются")
+    parser.add_argument("--layout", choices=sorted(LAYOUTS), default="ring",
+                        help="раскладка: ring — один круг, rings — кольца по группам (--group-by), force — силовая")
+    parser.add_argument("--group-by", choices=sorted(GROUP_KEYS), default="subnet",
+                        help="как группировать узлы в раскладке rings: по подсети или производителю")
+    parser.add_argument("--color-by", choices=("type", "vendor"), default="type",
+                        help="цвет устройств: по типу узла или по производителю сетевой карты")
+    parser.add_argument("--sniff", action="store_true", help="показывать реальный трафик (пассивный захват на интерфейсе)")
+    parser.add_argument("--pcap", metavar="FILE", help="проигрывать трафик из pcap-файла вместо захвата")
+    parser.add_argument("--bpf", default=DEFAULT_BPF, help="BPF-фильтр захвата (по умолчанию: %(default)s)")
+    parser.add_argument("--profile-frames", type=int, default=0, metavar="N",
+                        help="снять cProfile первых N кадров цикла отрисовки (фоновые потоки не входят)")
+    parser.add_argument("--profile-out", default=PROFILE_OUT, metavar="FILE", help="куда сохранить профиль (pstats)")
+    return parser.parse_args(argv)
+
+def main(argv=None):
+    global pygame
+    startup = StartupProfile()
+    args = parse_args(argv)
+    startup.mark("args")
+
     # --- Этап 1: Сканирование ---
     print("Запуск ск��нирования сети...")
-    if sys.platform == "darwin" and not __import__('os').geteuid() == 0:
-        print("Ошибка: Требуются права sudo. Запустите: sudo python3 sci_fi_monitor.py")
-        sys.exit(1)
-
-    host_ip, gateway_ip, net_interface = get_lan_info_macos()
-    if not all((host_ip, gateway_ip, net_interface)):
-        print("Не удалось определить параметры локальной сети."); sys.exit(1)
-
-    try:
-        network = ipaddress.ip_network(f"{gateway_ip}/24", strict=False)
-        devices_found = scan_network_with_mac(str(network), net_interface)
-        found_ips = [dev['ip'] for dev in devices_found]
-        if host_ip not in found_ips: devices_found.append({'ip': host_ip, 'mac': 'N/A (Host)'})
-        if gateway_ip not in found_ips: devices_found.append({'ip': gateway_ip, 'mac': 'N/A (Gateway)'})
-    except Exception as e:
-        print(f"Ошибка сканирования: {e}. Используются данные по умолчанию.")
-        devices_found = [{'ip': host_ip, 'mac': 'N/A (Host)'}, {'ip': gateway_ip, 'mac': 'N/A (Gateway)'}]
-    
-    print(f"Обнаружено {len(devices_found)} устройств.")
+    if args.connect:
+        # Клиентский режим: сеть сканирует один процесс-издатель, окно только рисует его изменения
+        with startup.stage("connect", args.startup_profile):
+            try:
+                core = StateSubscriber(args.connect).start()
+            except (OSError, ConnectionError) as e:
+                print(f"Не удалось подключиться к {args.connect}: {e}"); sys.exit(1)
+        host_ip, gateway_ip, net_interface = core.host_ip, core.gateway_ip, None
+    else:
+        with startup.stage("network", args.startup_profile):
+            host_ip, gateway_ip, net_interface, targets = resolve_network(args)
+
+        # Сканирование и пинги идут в фоне: первый кадр появляется сразу,
+        # а карта обновляется по мере прихода событий обнаружения.
+        core = MonitorCore(host_ip, gateway_ip, targets, pps=args.pps, rescan=args.rescan,
+                           inventory_path=None if args.no_inventory else args.inventory,
+                           ping_every=args.ping_every, services_every=args.services_every,
+                           alert_sinks=args.alert).start()
+        if args.publish: core.publish(args.publish)
+    startup.mark("core")
+
+    # Без --sniff/--pcap трафик на карте демонстрационный (случайные пакеты)
+    traffic = None
+    if args.sniff or args.pcap:
+        traffic = TrafficMonitor(interface=net_interface, pcap=args.pcap, bpf=args.bpf)
+        traffic.start()
 
     # --- Этап 2: Визуализация ---
+    import pygame
+    from render_cache import SurfaceCache
+    from dirty_rects import DirtyRenderer
+    from particles import ParticleSystem
+    startup.mark("import pygame")
     pygame.init()
+    profile_key, alert_key = pygame.key.key_code(PROFILE_KEY), pygame.key.key_code(ALERT_KEY)
+    home_key = pygame.key.key_code(HOME_KEY)
     screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
     pygame.display.set_caption("Sci-Fi Network Monitor v2.0")
     
@@ -122,124 +442,287 @@ def main():
     title_font = pygame.font.Font(font_path, TITLE_FONT_SIZE)
     if not os.path.exists(FONT_NAME): print(f"Шрифт '{FONT_NAME}' не найден.")
 
+    # Свечение, вспышки и подписи рисуются один раз и дальше только blit-ятся
+    cache = SurfaceCache(GLOW_COLORS, PING_FLASH_COLORS, NODE_RADIUS)
+    cache.prewarm(range(int(NODE_RADIUS * 1.5), int(NODE_RADIUS * 1.5 + 5) + 1))
+    startup.mark("display")
+
     nodes = {}
-    center_x, center_y = SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2
-    client_devices = [dev for dev in devices_found if dev['ip'] != gateway_ip]
-    
-    nodes[gateway_ip] = {'pos': (center_x, center_y), 'type': 'router', 'mac': 'N/A'}
-    
-    num_clients = len(client_devices)
-    radius = min(SCREEN_WIDTH, SCREEN_HEIGHT) / 3
-    angle_step = 2 * math.pi / num_clients if num_clients > 0 else 0
-
-    for i, device in enumerate(client_devices):
-        angle = i * angle_step
-        x = center_x + int(radius * math.cos(angle))
-        y = center_y + int(radius * math.sin(angle))
-        node_type = 'host' if device['ip'] == host_ip else 'device'
-        nodes[device['ip']] = {'pos': (x, y), 'type': node_type, 'mac': device['mac']}
-
-    packets = []
+    center = (SCREEN_WIDTH // 2, SCREEN_HEIGHT // 2)
+    nodes[gateway_ip] = {'pos': center, 'type': 'router', 'mac': 'N/A (Gateway)'}
+    nodes[host_ip] = {'pos': center, 'type': 'host', 'mac': 'N/A (Host)'}
+    color_by_vendor = args.color_by == "vendor"
+    for dev in core.known_devices:
+        if dev['ip'] not in nodes:
+            nodes[dev['ip']] = {'pos': center, 'type': 'device', 'mac': dev['mac']}
+        else:
+            nodes[dev['ip']]['mac'] = dev['mac']  # шлюз и хост: MAC из инвентаря вместо заглушки
+        tag_vendor(nodes[dev['ip']], dev['mac'], color_by_vendor)
+    layout = make_layout(args.layout, center, (SCREEN_WIDTH, SCREEN_HEIGHT), group_by=args.group_by)
+    layout.place(nodes, gateway_ip)
+    index = GridIndex()
+    index.sync(nodes)
+    # Агрегаты для кластеров и пучков ребер; шлюз — центр ребер, в них не входит
+    pyramid = GridPyramid()
+    pyramid.sync(nodes, skip=(gateway_ip,))
+    camera = Camera((SCREEN_WIDTH, SCREEN_HEIGHT), center)
+    scene = build_scene(camera, nodes, index, pyramid, gateway_ip, host_ip)
+    dragging = False
+
+    ping_results = {}  # {ip: {"status": "success/fail", "timestamp": ...}} — принадлежит потоку отрисовки
+    latency = core.latency  # {ip: LatencyRing} — история RTT/потерь для панели
+    scanner = core.services  # сканер TCP-сервисов (нет в клиентском режиме)
+    alerts = core.alerts     # движок оповещений (нет в клиентском режиме)
+    show_alerts = True
+    info_panel_rect = None
+    packets = ParticleSystem()
     selected_ip = None
+
+    def draw_static(surface):
+        surface.fill(BACKGROUND_COLOR)
+        draw_edges(surface, scene, gateway_ip, widths)
+        for count, pos in scene['clusters']:
+            draw_cluster(surface, cache, font, count, pos)
+        for ip, pos in scene['nodes'].items():
+            pygame.draw.circle(surface, nodes[ip].get('color') or NODE_COLORS[nodes[ip]['type']], pos, scene['radius'])
+            if scene['detail'] == DETAIL_FULL:
+                surface.blit(cache.label(font, ip, TEXT_COLOR), label_rect(cache, font, ip, pos, scene['radius']))
+
+    renderer = DirtyRenderer(screen, draw_static) if args.dirty_rects else None
+    screen_rect = screen.get_rect()
+    regions = {}  # {ip: Rect} — области видимых узлов для режима грязных прямоугольников
+    layout_changed = scene_changed = True
+    last_glow_radius = last_selected = None
+    last_packet_count = 0
+    last_highlighted = set()
+    rates, widths, credit = {}, {}, {}
+    last_frame = time.time()
+    profiler = FrameProfiler()
+    show_profile = False
+    frame_count = 0
+    cprofile = cProfile.Profile() if args.profile_frames > 0 else None
+    if cprofile: cprofile.enable()
     clock = pygame.time.Clock()
+    input_events = (pygame.MOUSEMOTION, pygame.MOUSEWHEEL, pygame.MOUSEBUTTONDOWN, pygame.MOUSEBUTTONUP,
+                    pygame.KEYDOWN, pygame.KEYUP)
+    last_input = float("-inf")
     running = True
     while running:
+        profiler.start_frame()
         mouse_pos = pygame.mouse.get_pos()
+
+        events, results = core.poll()
+        added, removed = apply_discovery_events(nodes, events, host_ip, gateway_ip, color_by_vendor) if events else ((), ())
+        if added or removed:
+            layout.update(nodes, gateway_ip, added, removed)
+            index.sync(nodes)
+            pyramid.sync(nodes, skip=(gateway_ip,))
+            layout_changed = True
+            if selected_ip not in nodes: selected_ip = None
+            for ip in removed: cache.forget_label(ip)
+
+        # Силовая раскладка доводится по шагу за кадр
+        if layout.animated and layout.step(nodes):
+            index.sync(nodes)
+            pyramid.sync(nodes, skip=(gateway_ip,))
+            layout_changed = True
+
+        for ip, status, rtt_us, ts in results:
+            ping_results[ip] = {"status": status, "timestamp": ts, "rtt_us": rtt_us}
         
         for event in pygame.event.get():
             if event.type == pygame.QUIT: running = False
+            if event.type in input_events: last_input = time.time()
+            if event.type == pygame.KEYDOWN and event.key == profile_key:
+                show_profile = not show_profile
+                if renderer: renderer.repaint_all()
+            if event.type == pygame.KEYDOWN and event.key == alert_key:
+                show_alerts = not show_alerts
+                if renderer: renderer.repaint_all()
+            if event.type == pygame.KEYDOWN and event.key == home_key:
+                camera.fit([data['pos'] for data in nodes.values()])
+            if event.type == pygame.MOUSEWHEEL:
+                camera.zoom_at(mouse_pos, event.y)
+            if event.type == pygame.MOUSEMOTION and dragging:
+                camera.pan(*event.rel)
+            if event.type == pygame.MOUSEBUTTONUP:
+                dragging = False
             if event.type == pygame.MOUSEBUTTONDOWN:
+                if event.button in (2, 3):  # средняя/правая кнопка тащат карту откуда угодно
+                    dragging = True
                 if event.button == 1: # ЛКМ
-                    clicked_on_node = False
-                    for ip, data in nodes.items():
-                        if math.hypot(mouse_pos[0] - data['pos'][0], mouse_pos[1] - data['pos'][1]) < NODE_RADIUS:
-                            selected_ip = ip
-                            clicked_on_node = True
-                            break
-                    if not clicked_on_node:
+                    clicked_ip, clicked_cluster = pick(scene, camera, index, mouse_pos)
+                    if clicked_ip:
+                        selected_ip = clicked_ip
+                    elif clicked_cluster:
+                        camera.zoom_at(clicked_cluster[1], CLUSTER_ZOOM_STEPS)
+                    else:
                         # Проверяем клик по кнопке Ping
                         if selected_ip and info_panel_rect and ping_button_rect.collidepoint(mouse_pos):
                             print(f"Запрос ping для {selected_ip}...")
-                            threading.Thread(target=run_ping, args=(selected_ip,)).start()
+                            core.ping(selected_ip)
+                        elif selected_ip and info_panel_rect and scan_button_rect and scan_button_rect.collidepoint(mouse_pos):
+                            print(f"Сканирование сервисов {selected_ip}...")
+                            core.scan_services(selected_ip, force=True)  # кнопка — всегда свежий результат
                         else:
                             selected_ip = None # Сброс выделения
+                            dragging = True    # перетаскивание пустого места двигает карту
 
-        screen.fill(BACKGROUND_COLOR)
-        
-        if random.randint(0, 20) == 0 and len(nodes) > 1:
+        profiler.mark("events")
+
+        # Кадр пересобирается только когда сдвинулась камера или раскладка
+        if layout_changed or camera.state != scene['state']:
+            scene = build_scene(camera, nodes, index, pyramid, gateway_ip, host_ip)
+            scene_changed = True
+        transform = camera.transform()
+        # В кластерах пакеты сливаются в пятно: они летят, но не рисуются
+        show_packets = scene['detail'] != DETAIL_CLUSTERS
+        profiler.mark("scene")
+
+        now = time.time()
+        for ip in [ip for ip, result in ping_results.items() if now - result["timestamp"] >= PING_FLASH_DURATION]:
+            del ping_results[ip]
+
+        if traffic:
+            if traffic.rates() is not rates:
+                # Новое окно агрегации: перестраиваем толщину ребер
+                rates = traffic.rates()
+                new_widths = edge_widths(rates, nodes, gateway_ip)
+                if new_widths != widths:
+                    widths = new_widths
+                    if renderer: renderer.invalidate()
+            credit = spawn_traffic(packets, rates, nodes, gateway_ip, credit, now - last_frame)
+        elif not renderer and random.randint(0, 20) == 0 and len(nodes) > 1:
+            # Декоративные пакеты без захвата трафика — не в экономичном режиме: они не дали бы снизить FPS
             sender_ip = random.choice(list(nodes.keys()))
-            receiver_ip = gateway_ip if sender_ip != gateway_ip else random.choice(client_devices)['ip']
+            receiver_ip = gateway_ip if sender_ip != gateway_ip else random.choice([ip for ip in nodes if ip != gateway_ip])
             if receiver_ip in nodes:
-                packets.append(Packet(nodes[sender_ip]['pos'], nodes[receiver_ip]['pos']))
+                packets.spawn(nodes[sender_ip]['pos'], nodes[receiver_ip]['pos'])
 
-        for p in packets[:]:
-            if not p.move(): packets.remove(p)
-            else: p.draw(screen)
+        profiler.mark("spawn")
+        packets.step()
+        profiler.mark("packets")
 
         pulse = (math.sin(pygame.time.get_ticks() * 0.002) + 1) / 2
-        
-        router_node = nodes.get(gateway_ip)
-        if router_node:
-            for ip, data in nodes.items():
-                if ip != gateway_ip: pygame.draw.line(screen, LINE_COLOR, router_node['pos'], data['pos'], 1)
-
-        for ip, data in nodes.items():
-            pos, node_type = data['pos'], data['type']
-            
-            # Вспышка от пинга
-            if ip in ping_results:
-                result = ping_results[ip]
-                if time.time() - result["timestamp"] < 0.5: # Длительность вспышки
-                    flash_alpha = 255 * (1 - (time.time() - result["timestamp"]) / 0.5)
-                    flash_color = PING_FLASH_COLORS[result["status"]] + (int(flash_alpha),)
-                    s = pygame.Surface((NODE_RADIUS*4, NODE_RADIUS*4), pygame.SRCALPHA)
-                    pygame.draw.circle(s, flash_color, (NODE_RADIUS*2, NODE_RADIUS*2), NODE_RADIUS*2)
-                    screen.blit(s, (pos[0] - NODE_RADIUS*2, pos[1] - NODE_RADIUS*2))
-                else:
-                    del ping_results[ip]
-
-            # Выделение выбранного узла
-            if ip == selected_ip:
-                pygame.draw.circle(screen, (255, 255, 0), pos, NODE_RADIUS + 8, 2)
-
-            glow_radius = int(NODE_RADIUS * 1.5 + pulse * 5)
-            glow_surface = pygame.Surface((glow_radius * 2, glow_radius * 2), pygame.SRCALPHA)
-            pygame.draw.circle(glow_surface, GLOW_COLORS[node_type] + (80,), (glow_radius, glow_radius), glow_radius)
-            screen.blit(glow_surface, (pos[0] - glow_radius, pos[1] - glow_radius))
-
-            pygame.draw.circle(screen, NODE_COLORS[node_type], pos, NODE_RADIUS)
-            
-            text_surface = font.render(ip, True, TEXT_COLOR)
-            text_rect = text_surface.get_rect(center=(pos[0], pos[1] + NODE_RADIUS + 15))
-            screen.blit(text_surface, text_rect)
-
-        info_panel_rect = None
-        if selected_ip:
-            data = nodes[selected_ip]
-            info_text = [f"IP: {selected_ip}", f"MAC: {data['mac']}", f"Type: {data['type'].capitalize()}"]
-            panel_w, panel_h = 300, 140
-            info_panel_rect = pygame.Rect(SCREEN_WIDTH - panel_w - 20, 20, panel_w, panel_h)
-            
-            s = pygame.Surface((panel_w, panel_h), pygame.SRCALPHA)
-            s.fill(INFO_BG_COLOR)
-            screen.blit(s, info_panel_rect.topleft)
-            
-            title_surf = title_font.render("DEVICE INFO", True, TEXT_COLOR)
-            screen.blit(title_surf, (info_panel_rect.x + 20, info_panel_rect.y + 15))
-
-            for i, line in enumerate(info_text):
-                info_surface = info_font.render(line, True, INFO_TEXT_COLOR)
-                screen.blit(info_surface, (info_panel_rect.x + 20, info_panel_rect.y + 50 + i * 22))
-            
-            ping_button_rect = pygame.Rect(info_panel_rect.x + 20, info_panel_rect.y + 105, panel_w - 40, 25)
-            button_c = BUTTON_HOVER_COLOR if ping_button_rect.collidepoint(mouse_pos) else BUTTON_COLOR
-            pygame.draw.rect(screen, button_c, ping_button_rect, border_radius=5)
-            ping_text_surf = info_font.render("Ping Device", True, (0,0,0))
-            screen.blit(ping_text_surf, ping_text_surf.get_rect(center=ping_button_rect.center))
-
-        pygame.display.flip()
-        clock.tick(60)
+        # Свечение и подписи — только при крупном масштабе
+        glow_radius = int((NODE_RADIUS * 1.5 + pulse * 5) * camera.zoom) if scene['detail'] == DETAIL_FULL else None
+
+        panel = build_info_panel(selected_ip, nodes[selected_ip], latency.get(selected_ip),
+                                 core.open_services.get(selected_ip), scanner is not None and selected_ip in scanner.scanning,
+                                 scanner is not None) if selected_ip else None
+        info_panel_rect = panel['rect'] if panel else None
+
+        # Подсказка с IP (или размером кластера) при наведении; для выбранного узла есть панель
+        hovered_ip, hovered_cluster = pick(scene, camera, index, mouse_pos) if not dragging else (None, None)
+        tooltip_text = hovered_ip if hovered_ip != selected_ip else None
+        if hovered_cluster: tooltip_text = f"{hovered_cluster[0]} devices"
+        tooltip = tooltip_rect(cache, font, tooltip_text, mouse_pos) if tooltip_text else None
+        overlay = build_profile_overlay(profiler) if show_profile else None
+        highlighted = alerts.highlights(now, ALERT_HIGHLIGHT) if alerts else {}
+        # В кластерах отдельными точками остаются выбранный, пингуемые и подсвеченные оповещениями узлы
+        markers = {}
+        if scene['detail'] == DETAIL_CLUSTERS:
+            for ip in {selected_ip, *highlighted, *ping_results}:
+                if ip in nodes and ip not in scene['nodes']:
+                    pos = camera.to_screen(nodes[ip]['pos'])
+                    if screen_rect.collidepoint(pos): markers[ip] = pos
+        alert_log = build_alert_log(alerts) if show_alerts and alerts and alerts.recent else None
+        profiler.mark("panel")
+
+        if renderer:
+            if scene_changed:
+                renderer.invalidate()
+                labels = scene['detail'] == DETAIL_FULL
+                regions = {ip: node_region(ip, pos, scene['radius'], labels, cache, font) for ip, pos in scene['nodes'].items()}
+            elif glow_radius != last_glow_radius:
+                # Пульс задевает только свечение видимых узлов — весь экран ради него не перерисовываем
+                for rect in regions.values(): renderer.add(rect)
+            if selected_ip != last_selected:
+                for ip in (selected_ip, last_selected):
+                    if ip in regions: renderer.add(regions[ip])
+            # Плотный поток пакетов дешевле перерисовать целиком (и кадр после него — чтобы стереть следы)
+            packet_rects = packets.rects(screen_rect.size, transform) if show_packets else []
+            if len(packet_rects) > renderer.max_rects or last_packet_count > renderer.max_rects:
+                renderer.repaint_all()
+            else:
+                for rect in packet_rects: renderer.add(rect)
+            last_packet_count = len(packet_rects)
+            for ip, pos in markers.items():
+                renderer.add(node_region(ip, pos, scene['radius'], False, cache, font))
+            for ip in ping_results:
+                if ip in regions: renderer.add(regions[ip])
+            for ip in highlighted.keys() | last_highlighted:
+                if ip in regions: renderer.add(regions[ip])
+            if info_panel_rect: renderer.add(info_panel_rect)
+            if alert_log: renderer.add(alert_log['rect'])
+            if tooltip: renderer.add(tooltip)
+            if overlay: renderer.add(overlay['rect'])
+
+            # В этом режиме ребра и кластеры живут в статическом слое: фаза edges — восстановление фона.
+            # В кластерах отдельных узлов в кадре единицы — пространственный запрос не нужен
+            candidates = None if scene['detail'] == DETAIL_CLUSTERS else \
+                lambda rect: index.query_rect(camera.rect_to_world(rect.inflate(NODE_REACH * 2, NODE_REACH * 2)))
+            redraw = renderer.expand(regions, candidates)
+            renderer.restore()
+            profiler.mark("edges")
+            if show_packets: packets.draw(screen, transform)
+            profiler.mark("packets")
+        else:
+            screen.fill(BACKGROUND_COLOR)
+            if show_packets: packets.draw(screen, transform)
+            profiler.mark("packets")
+            draw_edges(screen, scene, gateway_ip, widths)
+            profiler.mark("edges")
+            for count, pos in scene['clusters']:
+                draw_cluster(screen, cache, font, count, pos)
+            redraw = scene['nodes']
+        for ip in redraw:
+            draw_node(screen, cache, font, ip, nodes[ip], scene['nodes'][ip], scene['radius'], glow_radius,
+                      ip == selected_ip, ping_results.get(ip), now, highlighted.get(ip))
+        for ip, pos in markers.items():
+            draw_node(screen, cache, font, ip, nodes[ip], pos, scene['radius'], None,
+                      ip == selected_ip, ping_results.get(ip), now, highlighted.get(ip))
+        profiler.mark("nodes")
+
+        if tooltip:
+            draw_tooltip(screen, cache, font, tooltip_text, tooltip)
+        if panel:
+            ping_button_rect, scan_button_rect = draw_info_panel(screen, cache, title_font, info_font, panel, mouse_pos)
+        if alert_log:
+            draw_alert_log(screen, cache, font, alert_log)
+        if overlay:
+            draw_profile_overlay(screen, cache, font, overlay)
+        profiler.mark("panel")
+
+        if renderer:
+            renderer.present()
+        else:
+            pygame.display.flip()
+        profiler.mark("flip")
+        profiler.end_frame()
+
+        frame_count += 1
+        if frame_count == 1:
+            startup.mark("first frame")
+            if args.startup_profile: startup.report()
+        if cprofile and frame_count == args.profile_frames:
+            cprofile.disable()
+            cprofile.dump_stats(args.profile_out)
+            print(f"Профиль {frame_count} кадров сохранен в {args.profile_out}")
+            pstats.Stats(cprofile).sort_stats("cumulative").print_stats(15)
+            cprofile = None
+
+        # Когда ничего не движется, кадр нужен только ради пульса — хватает низкой частоты
+        # Пока пользователь тащит, масштабирует или только что что-то нажал — тоже полная частота
+        interacting = dragging or now - last_input < INPUT_HOLD
+        clock.tick(FPS if not renderer or packets or ping_results or overlay or interacting else IDLE_FPS)
+        layout_changed = scene_changed = False
+        last_glow_radius, last_selected = glow_radius, selected_ip
+        last_highlighted = set(highlighted)
+        last_frame = now
 
+    core.stop()
+    if traffic: traffic.stop()
     pygame.quit()
 
 if __name__ == '__main__':
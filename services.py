@@ -0,0 +1,175 @@
+import asyncio
+import queue
+import re
+import threading
+import time
+from profiling import record
+
+# --- Параметры сканера сервисов ---
+DEFAULT_PORTS = (21, 22, 23, 25, 53, 80, 110, 139, 143, 443, 445, 554, 631, 1883,
+                 3306, 3389, 5000, 5432, 5900, 6379, 8000, 8080, 8443, 9100)
+CONNECT_TIMEOUT = 1.0    # ожидание TCP-рукопожатия, с
+BANNER_TIMEOUT = 1.0     # ожидание приветствия сервиса после соединения, с
+BANNER_BYTES = 256       # сколько байт приветствия читать
+MAX_CONNECTIONS = 512    # общий потолок одновременных соединений (держим ниже лимита дескрипторов)
+HOST_RATE = 50           # соединений в секунду на один узел, чтобы не выглядеть как атака
+CACHE_TTL = 600          # сколько результат сканирования узла считается свежим, с
+
+SERVICE_NAMES = {21: "ftp", 22: "ssh", 23: "telnet", 25: "smtp", 53: "dns", 80: "http", 110: "pop3",
+                 139: "netbios", 143: "imap", 443: "https", 445: "smb", 554: "rtsp", 631: "ipp",
+                 1883: "mqtt", 3306: "mysql", 3389: "rdp", 5000: "upnp", 5432: "postgres", 5900: "vnc",
+                 6379: "redis", 8000: "http-alt", 8080: "http-alt", 8443: "https-alt", 9100: "jetdirect"}
+HTTP_PORTS = {80, 8000, 8080}  # сервисы, которые молчат, пока их не спросят
+TLS_PORTS = {443, 8443}        # баннер без рукопожатия TLS не получить — только факт открытия
+HTTP_PROBE = b"HEAD / HTTP/1.0\r\n\r\n"
+
+
+def banner_text(data):
+    """Первая непустая строка приветствия без управляющих символов (для HTTP — заголовок Server)."""
+    text = data.decode("latin-1")
+    server = re.search(r"^Server:[ \t]*(.+)$", text, re.MULTILINE | re.IGNORECASE) if text.startswith("HTTP/") else None
+    if server: text = server.group(1)
+    for line in text.splitlines():
+        line = re.sub(r"[^\x20-\x7e]", "", line).strip()
+        if line: return line
+    return ""
+
+
+class ServiceScanner:
+    """
+    TCP connect / banner-grab сканер на одном asyncio-цикле в отдельном потоке.
+    Тысячи проверок — это корутины, а не потоки: одновременных соединений не больше
+    max_connections, соединения с одним узлом идут не чаще host_rate в секунду.
+    Результат узла — [(port, name, banner)] открытых портов — кэшируется на ttl секунд
+    и отдается в UI через очередь results: (ip, services, time.time()).
+    """
+
+    def __init__(self, ports=DEFAULT_PORTS, connect_timeout=CONNECT_TIMEOUT, banner_timeout=BANNER_TIMEOUT,
+                 max_connections=MAX_CONNECTIONS, host_rate=HOST_RATE, ttl=CACHE_TTL):
+        self.ports = tuple(ports)
+        self.connect_timeout = connect_timeout
+        self.banner_timeout = banner_timeout
+        self.max_connections = max_connections
+        self.host_rate = host_rate
+        self.ttl = ttl
+        self.results = queue.SimpleQueue()
+        self.scanning = set()  # узлы, которые сейчас сканируются (читается из UI)
+        self._cache = {}       # {ip: (time.monotonic(), [(port, name, banner)])}
+        self._next_slot = {}   # {ip: момент loop.time(), раньше которого к узлу не подключаемся}
+        self._targets = ()
+        self._loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(target=self._run, name="service-scanner", daemon=True)
+
+    # --- Публичный API (вызывается из любого потока) ---
+    def start(self):
+        self._thread.start()
+        return self
+
+    def scan(self, ip, force=False):
+        """Ставит сканирование узла в очередь; свежий результат из кэша отдается без соединений."""
+        asyncio.run_coroutine_threadsafe(self._scan_host(ip, force), self._loop)
+
+    def set_targets(self, ips):
+        """Заменяет список адресов для фонового сканирования."""
+        self._targets = tuple(ips)
+
+    def scan_every(self, interval):
+        """Сканирует все адреса из set_targets каждые interval секунд (узлы со свежим кэшем пропускаются)."""
+        asyncio.run_coroutine_threadsafe(self._periodic(interval), self._loop)
+
+    def cached(self, ip):
+        """Свежий результат сканирования узла или None."""
+        entry = self._cache.get(ip)
+        if entry is None or time.monotonic() - entry[0] > self.ttl:
+            return None
+        return entry[1]
+
+    def drain(self, limit=1024):
+        drained = []
+        while len(drained) < limit:
+            try:
+                drained.append(self.results.get_nowait())
+            except queue.Empty:
+                break
+        return drained
+
+    def stop(self):
+        if self._thread.is_alive():
+            self._loop.call_soon_threadsafe(self._loop.stop)
+            self._thread.join(timeout=2)
+
+    # --- Внутренняя часть (поток цикла) ---
+    def _run(self):
+        asyncio.set_event_loop(self._loop)
+        self._semaphore = asyncio.Semaphore(self.max_connections)
+        try:
+            self._loop.run_forever()
+        finally:
+            tasks = asyncio.all_tasks(self._loop)
+            for task in tasks:
+                task.cancel()
+            self._loop.run_until_complete(asyncio.gather(*tasks, return_exceptions=True))
+            self._loop.close()
+
+    async def _periodic(self, interval):
+        while True:
+            started = time.monotonic()
+            # Одновременно в работе не больше узлов, чем помещается в потолок соединений:
+            # корутины на каждый порт каждого узла /16 (миллионы задач) не создаются разом
+            targets = iter(self._targets)
+            workers = max(1, self.max_connections // max(1, len(self.ports)))
+            await asyncio.gather(*(self._scan_worker(targets) for _ in range(workers)))
+            await asyncio.sleep(max(0.0, interval - (time.monotonic() - started)))
+
+    async def _scan_worker(self, targets):
+        for ip in targets:  # общий итератор: каждый узел достается одному исполнителю
+            await self._scan_host(ip)
+
+    async def _scan_host(self, ip, force=False):
+        cached = None if force else self.cached(ip)
+        if cached is not None:
+            self.results.put((ip, cached, time.time()))
+            return
+        if ip in self.scanning:
+            return  # результат уже в пути
+        self.scanning.add(ip)
+        try:
+            found = await asyncio.gather(*(self._check(ip, port) for port in self.ports))
+            services = [service for service in found if service]
+            self._cache[ip] = (time.monotonic(), services)
+            self.results.put((ip, services, time.time()))
+        finally:
+            self.scanning.discard(ip)
+            self._next_slot.pop(ip, None)
+
+    async def _check(self, ip, port):
+        """(port, name, banner) для открытого порта, None — для закрытого или фильтруемого."""
+        # Слот по узлу занимается до глобального семафора: ждущие своей очереди
+        # к медленному узлу не держат соединения, нужные другим узлам
+        now = self._loop.time()
+        slot = max(now, self._next_slot.get(ip, now))
+        self._next_slot[ip] = slot + 1.0 / self.host_rate
+        if slot > now: await asyncio.sleep(slot - now)
+
+        async with self._semaphore:
+            started = time.perf_counter()
+            try:
+                reader, writer = await asyncio.wait_for(asyncio.open_connection(ip, port), self.connect_timeout)
+            except (OSError, asyncio.TimeoutError):
+                return None
+            finally:
+                record("services.connect", time.perf_counter() - started)
+            banner = ""
+            try:
+                if port not in TLS_PORTS:
+                    if port in HTTP_PORTS: writer.write(HTTP_PROBE)
+                    banner = banner_text(await asyncio.wait_for(reader.read(BANNER_BYTES), self.banner_timeout))
+            except (OSError, asyncio.TimeoutError):
+                pass
+            finally:
+                writer.close()
+                try:
+                    await writer.wait_closed()  # сокет закрывается здесь, а не сборщиком мусора
+                except OSError:
+                    pass
+            return port, SERVICE_NAMES.get(port, "tcp"), banner
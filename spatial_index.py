@@ -0,0 +1,187 @@
+import math
+
+# --- Параметры индекса ---
+CELL_SIZE = 64  # сторона ячейки сетки, px
+CLUSTER_CELLS = (128, 512, 2048, 8192)  # уровни агрегирования для мелкого масштаба (вложенные ячейки)
+
+
+class GridIndex:
+    """
+    Равномерная сетка над позициями узлов для hit-test, наведения и отсечения.
+    Вставка/перемещение/удаление — O(1); запросы смотрят только соседние ячейки.
+    """
+
+    def __init__(self, cell_size=CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = {}  # {(cx, cy): {ключ, ...}}
+        self._sums = {}   # {(cx, cy): [сумма x, сумма y]} — центр масс ячейки без обхода ключей
+        self._pos = {}    # {ключ: (x, y)}
+        self._order = {}  # {ключ: порядковый номер} — чтобы запросы сохраняли порядок отрисовки
+        self._next_order = 0
+
+    def __len__(self):
+        return len(self._pos)
+
+    def __contains__(self, key):
+        return key in self._pos
+
+    def _cell(self, pos):
+        return int(pos[0] // self.cell_size), int(pos[1] // self.cell_size)
+
+    def insert(self, key, pos):
+        if key in self._pos:
+            self.move(key, pos)
+            return
+        self._pos[key] = pos
+        self._order[key] = self._next_order
+        self._next_order += 1
+        self._add(self._cell(pos), key, pos)
+
+    def move(self, key, pos):
+        old = self._pos[key]
+        self._pos[key] = pos
+        old_cell, new_cell = self._cell(old), self._cell(pos)
+        if old_cell != new_cell:
+            self._discard(old_cell, key, old)
+            self._add(new_cell, key, pos)
+        else:
+            sums = self._sums[new_cell]
+            sums[0] += pos[0] - old[0]
+            sums[1] += pos[1] - old[1]
+
+    def remove(self, key):
+        pos = self._pos.pop(key, None)
+        if pos is not None:
+            self._order.pop(key)
+            self._discard(self._cell(pos), key, pos)
+
+    def _add(self, cell, key, pos):
+        self._cells.setdefault(cell, set()).add(key)
+        sums = self._sums.get(cell)
+        if sums is None:
+            self._sums[cell] = [pos[0], pos[1]]
+        else:
+            sums[0] += pos[0]
+            sums[1] += pos[1]
+
+    def _discard(self, cell, key, pos):
+        bucket = self._cells.get(cell)
+        if bucket is not None and key in bucket:
+            bucket.discard(key)
+            if not bucket:
+                del self._cells[cell]
+                del self._sums[cell]
+            else:
+                sums = self._sums[cell]
+                sums[0] -= pos[0]
+                sums[1] -= pos[1]
+
+    def sync(self, nodes):
+        """Приводит индекс к словарю nodes ({ключ: {'pos': ...}}), трогая только изменившиеся записи."""
+        for key in [key for key in self._pos if key not in nodes]:
+            self.remove(key)
+        for key, data in nodes.items():
+            pos = data['pos']
+            if key not in self._pos:
+                self.insert(key, pos)
+            elif self._pos[key] != pos:
+                self.move(key, pos)
+
+    def query_rect(self, rect):
+        """Ключи с позицией внутри прямоугольника (x, y, w, h), в порядке вставки."""
+        x, y, w, h = rect
+        found = []
+        for cell in self._occupied(rect):
+            bucket = self._cells[cell]
+            for key in bucket:
+                px, py = self._pos[key]
+                if x <= px <= x + w and y <= py <= y + h:
+                    found.append(key)
+        found.sort(key=self._order.__getitem__)
+        return found
+
+    def _occupied(self, rect):
+        """Занятые ячейки, пересекающие прямоугольник (x, y, w, h)."""
+        x, y, w, h = rect
+        cx0, cy0 = self._cell((x, y))
+        cx1, cy1 = self._cell((x + w, y + h))
+        # Если прямоугольник покрывает больше ячеек, чем занято, дешевле пройти по занятым
+        if (cx1 - cx0 + 1) * (cy1 - cy0 + 1) > len(self._cells):
+            return [(cx, cy) for cx, cy in self._cells if cx0 <= cx <= cx1 and cy0 <= cy <= cy1]
+        return [(cx, cy) for cx in range(cx0, cx1 + 1) for cy in range(cy0, cy1 + 1) if (cx, cy) in self._cells]
+
+    def clusters(self, rect):
+        """[(число ключей, центр масс)] по занятым ячейкам, пересекающим прямоугольник."""
+        found = []
+        for cell in self._occupied(rect):
+            n = len(self._cells[cell])
+            sx, sy = self._sums[cell]
+            found.append((n, (sx / n, sy / n)))
+        return found
+
+    def outside(self, inside):
+        """
+        Остаток каждой занятой ячейки за вычетом видимого inside ([(число, центр масс)]):
+        [(число, центр масс)] того, что за краем экрана. Стоимость — по числу ячеек, а не ключей.
+        """
+        rest = {cell: [len(bucket), *self._sums[cell]] for cell, bucket in self._cells.items()}
+        for n, (px, py) in inside:
+            entry = rest.get(self._cell((px, py)))
+            if entry is not None:
+                entry[0] -= n
+                entry[1] -= px * n
+                entry[2] -= py * n
+        return [(n, (sx / n, sy / n)) for n, sx, sy in rest.values() if n > 0]
+
+    def nearest(self, point, radius):
+        """Ближайший ключ не дальше radius от точки или None."""
+        best, best_dist = None, radius
+        for key in self.query_rect((point[0] - radius, point[1] - radius, radius * 2, radius * 2)):
+            px, py = self._pos[key]
+            dist = math.hypot(point[0] - px, point[1] - py)
+            if dist < best_dist:
+                best, best_dist = key, dist
+        return best
+
+
+class GridPyramid:
+    """
+    Стопка GridIndex с ячейками, растущими вчетверо: агрегаты узлов для любого масштаба.
+    Ячейки уровней вложены, поэтому видимое на мелком уровне вычитается из крупного.
+    """
+
+    def __init__(self, cell_sizes=CLUSTER_CELLS):
+        self.levels = [GridIndex(size) for size in cell_sizes]
+        self._pos = {}  # {ключ: (x, y)} — общая для всех уровней копия, чтобы сравнивать позиции один раз
+
+    @property
+    def coarse(self):
+        return self.levels[-1]
+
+    def sync(self, nodes, skip=()):
+        """
+        Как GridIndex.sync; ключи из skip (например, шлюз — центр ребер) в агрегаты не входят.
+        Изменения ищутся один раз, а уровни получают только их: неподвижная карта стоит
+        одного прохода сравнений, а не прохода на каждый уровень.
+        """
+        removed = [key for key in self._pos if key not in nodes or key in skip]
+        changed = [(key, data['pos']) for key, data in nodes.items()
+                   if key not in skip and self._pos.get(key) != data['pos']]
+        if not removed and not changed:
+            return
+        for key in removed:
+            del self._pos[key]
+        for key, pos in changed:
+            self._pos[key] = pos
+        for level in self.levels:
+            for key in removed:
+                level.remove(key)
+            for key, pos in changed:
+                level.insert(key, pos)  # для известного ключа — move: ячейка меняется, только если узел из нее вышел
+
+    def level(self, min_cell):
+        """Самый мелкий уровень с ячейкой не меньше min_cell (или самый крупный)."""
+        for level in self.levels:
+            if level.cell_size >= min_cell:
+                return level
+        return self.levels[-1]
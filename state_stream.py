@@ -0,0 +1,353 @@
+import ipaddress
+import os
+import queue
+import selectors
+import socket
+import struct
+import threading
+from latency import LatencyRing
+from oui import lookup
+from discovery import EVENT_JOIN, EVENT_LEAVE, EVENT_MAC_CHANGE
+
+# --- Протокол ---
+# Каждое сообщение — байт типа и полезная нагрузка фиксированной длины (сетевой порядок байт):
+#   HELLO       host_ip(4) gateway_ip(4)                 сервер -> клиент, первым сообщением
+#   JOIN        ip(4) mac(6)                             узел появился
+#   LEAVE       ip(4)                                    узел пропал
+#   MAC_CHANGE  ip(4) mac(6)                             у узла сменился MAC
+#   PING        ip(4) ok(1) rtt_us(4) ts(8)              результат пинга (rtt_us = 0xFFFFFFFF — потеря)
+#   PING_REQ    ip(4)                                    клиент -> сервер: кнопка Ping
+MSG_HELLO, MSG_JOIN, MSG_LEAVE, MSG_MAC_CHANGE, MSG_PING, MSG_PING_REQ = range(1, 7)
+_FORMATS = {
+    MSG_HELLO: struct.Struct("!4s4s"),
+    MSG_JOIN: struct.Struct("!4s6s"),
+    MSG_LEAVE: struct.Struct("!4s"),
+    MSG_MAC_CHANGE: struct.Struct("!4s6s"),
+    MSG_PING: struct.Struct("!4sBId"),
+    MSG_PING_REQ: struct.Struct("!4s"),
+}
+_EVENT_MESSAGES = {EVENT_JOIN: MSG_JOIN, EVENT_LEAVE: MSG_LEAVE, EVENT_MAC_CHANGE: MSG_MAC_CHANGE}
+_MESSAGE_EVENTS = {msg: kind for kind, msg in _EVENT_MESSAGES.items()}
+NO_RTT = 0xFFFFFFFF
+
+# --- Параметры рассылки ---
+OUTBOX_LIMIT = 4 << 20      # байт в очереди клиента (снимок /16 — ~0.7 МБ); кто отстал сильнее — отключается
+CONNECT_TIMEOUT = 5.0
+RECV_SIZE = 65536
+
+
+def parse_address(spec):
+    """
+    'HOST:PORT' -> TCP, 'unix:PATH' или абсолютный путь -> Unix-сокет. Возвращает (family, address).
+    Пустой HOST — 127.0.0.1: клиенты могут просить пинги, поэтому в сеть рассылка открывается только явно.
+    """
+    if spec.startswith("unix:"):
+        return socket.AF_UNIX, spec[5:]
+    if spec.startswith("/"):
+        return socket.AF_UNIX, spec
+    host, port = spec.rsplit(":", 1)
+    return socket.AF_INET, (host or "127.0.0.1", int(port))
+
+
+def _ip_bytes(ip):
+    return ipaddress.IPv4Address(ip).packed
+
+def _mac_bytes(mac):
+    try:
+        return bytes.fromhex(mac.replace(":", "").replace("-", ""))[:6].ljust(6, b"\0")
+    except (AttributeError, ValueError):
+        return bytes(6)
+
+def _mac_text(raw):
+    return ":".join(f"{b:02x}" for b in raw)
+
+def encode(msg, *fields):
+    return bytes((msg,)) + _FORMATS[msg].pack(*fields)
+
+def encode_event(kind, ip, mac):
+    msg = _EVENT_MESSAGES[kind]
+    if msg == MSG_LEAVE:
+        return encode(msg, _ip_bytes(ip))
+    return encode(msg, _ip_bytes(ip), _mac_bytes(mac))
+
+def encode_ping(ip, status, rtt_us, ts):
+    rtt = NO_RTT if rtt_us is None else min(int(rtt_us), NO_RTT - 1)
+    return encode(MSG_PING, _ip_bytes(ip), status == "success", rtt, ts)
+
+def decode(buffer):
+    """Разбирает все целые сообщения из bytearray (разобранное удаляется). Возвращает [(тип, поля)]."""
+    messages = []
+    offset = 0
+    while offset < len(buffer):
+        msg = buffer[offset]
+        fmt = _FORMATS.get(msg)
+        if fmt is None:
+            raise ValueError(f"неизвестный тип сообщения {msg}")
+        if offset + 1 + fmt.size > len(buffer):
+            break
+        messages.append((msg, fmt.unpack_from(buffer, offset + 1)))
+        offset += 1 + fmt.size
+    del buffer[:offset]
+    return messages
+
+
+class StatePublisher(threading.Thread):
+    """
+    Рассылка состояния подписчикам по TCP или Unix-сокету.
+    Новый клиент получает HELLO и текущий список узлов, дальше — только изменения.
+    publish() вызывается владельцем ядра после poll(); сообщение кодируется один раз на всех
+    и только дописывается в очереди клиентов. Отправляет поток рассылки по готовности сокета
+    на запись, так что медленный клиент не задерживает кадр; переполнивший очередь отключается.
+    """
+
+    def __init__(self, address, host_ip, gateway_ip, devices, on_ping=None):
+        super().__init__(name="state-publisher", daemon=True)
+        self.family, self.address = parse_address(address)
+        self.host_ip = host_ip
+        self.gateway_ip = gateway_ip
+        self.devices = devices  # () -> {ip: mac} — снимок для новых клиентов
+        self.on_ping = on_ping  # (ip) -> None — запрос пинга от клиента, вызывается в потоке рассылки
+        self._clients = {}      # {socket: (bytearray непрочитанного, bytearray неотправленного)}
+        self._lock = threading.Lock()
+        self._selector = selectors.DefaultSelector()
+        self._stop_event = threading.Event()
+        self._wake_r, self._wake_w = socket.socketpair()  # publish() будит поток рассылки
+        self._wake_r.setblocking(False)
+        self._wake_w.setblocking(False)
+        self._server = socket.socket(self.family, socket.SOCK_STREAM)
+        if self.family == socket.AF_INET:
+            self._server.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        elif os.path.exists(self.address):
+            os.unlink(self.address)  # сокет, оставшийся от прошлого запуска
+        self._server.bind(self.address)
+        self._server.listen()
+
+    def run(self):
+        self._selector.register(self._server, selectors.EVENT_READ)
+        self._selector.register(self._wake_r, selectors.EVENT_READ)
+        while not self._stop_event.is_set():
+            for key, mask in self._selector.select(timeout=0.5):
+                if key.fileobj is self._server:
+                    self._accept()
+                elif key.fileobj is self._wake_r:
+                    self._drain_wakeups()
+                else:
+                    if mask & selectors.EVENT_READ: self._read(key.fileobj)
+                    if mask & selectors.EVENT_WRITE: self._flush(key.fileobj)
+            self._update_interest()
+
+    def _wake(self):
+        try:
+            self._wake_w.send(b"\0")
+        except OSError:
+            pass  # буфер пробуждений полон — поток и так проснется
+
+    def _drain_wakeups(self):
+        try:
+            while self._wake_r.recv(RECV_SIZE):
+                pass
+        except OSError:
+            pass
+
+    def _accept(self):
+        try:
+            client, _ = self._server.accept()
+        except OSError:
+            return
+        client.setblocking(False)
+        with self._lock:
+            # Снимок ставится в очередь под той же блокировкой, что и рассылка: изменение,
+            # случившееся после снимка, клиент получит дельтой, а не потеряет
+            greeting = [encode(MSG_HELLO, _ip_bytes(self.host_ip), _ip_bytes(self.gateway_ip))]
+            greeting += [encode_event(EVENT_JOIN, ip, mac) for ip, mac in self.devices().items()]
+            self._clients[client] = (bytearray(), bytearray(b"".join(greeting)))
+        self._selector.register(client, selectors.EVENT_READ | selectors.EVENT_WRITE)
+
+    def _flush(self, client):
+        """Отправляет из очереди клиента столько, сколько примет сокет (без блокировки)."""
+        with self._lock:
+            state = self._clients.get(client)
+            if state is None: return
+            outbox = state[1]
+            try:
+                del outbox[:client.send(outbox)]
+                return
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                pass
+        self._drop(client)
+
+    def _update_interest(self):
+        """Подписка на запись — только у клиентов с непустой очередью; переполнившие очередь отключаются."""
+        with self._lock:
+            states = [(client, len(outbox)) for client, (_, outbox) in self._clients.items()]
+        for client, pending in states:
+            if pending > OUTBOX_LIMIT:
+                print("Подписчик не успевает принимать изменения и отключен")
+                self._drop(client)
+                continue
+            events = selectors.EVENT_READ | (selectors.EVENT_WRITE if pending else 0)
+            try:
+                if self._selector.get_key(client).events != events:
+                    self._selector.modify(client, events)
+            except (KeyError, ValueError):
+                pass
+
+    def _read(self, client):
+        try:
+            data = client.recv(RECV_SIZE)
+        except OSError:
+            data = b""
+        if not data:
+            self._drop(client)
+            return
+        state = self._clients.get(client)
+        if state is None: return
+        buffer = state[0]
+        buffer += data
+        try:
+            messages = decode(buffer)
+        except ValueError:
+            self._drop(client)
+            return
+        for msg, fields in messages:
+            if msg == MSG_PING_REQ and self.on_ping:
+                self.on_ping(str(ipaddress.IPv4Address(fields[0])))
+
+    def _drop(self, client):
+        with self._lock:
+            self._clients.pop(client, None)
+        try:
+            self._selector.unregister(client)
+        except (KeyError, ValueError):
+            pass
+        client.close()
+
+    def publish(self, events=(), results=()):
+        """Ставит события обнаружения и результаты пингов в очереди подписчиков; сеть не трогает."""
+        if not self._clients or not (events or results):
+            return
+        data = b"".join([encode_event(kind, ip, mac) for kind, ip, mac in events]
+                        + [encode_ping(ip, status, rtt_us, ts) for ip, status, rtt_us, ts in results])
+        with self._lock:
+            for _, outbox in self._clients.values():
+                outbox += data
+        self._wake()
+
+    def stop(self):
+        self._stop_event.set()
+        self._wake()
+        self.join(timeout=2)
+        for client in list(self._clients):
+            self._drop(client)
+        self._server.close()
+        self._wake_r.close()
+        self._wake_w.close()
+        if self.family == socket.AF_UNIX and os.path.exists(self.address):
+            os.unlink(self.address)
+
+
+class StateSubscriber(threading.Thread):
+    """
+    Клиент рассылки: повторяет интерфейс MonitorCore (host_ip, gateway_ip,
+    known_devices, latency, poll(), ping(), stop()), поэтому окно рисует
+    чужое состояние тем же кодом, не запуская своего сканирования.
+    """
+
+    def __init__(self, address):
+        super().__init__(name="state-subscriber", daemon=True)
+        family, address = parse_address(address)
+        self._sock = socket.socket(family, socket.SOCK_STREAM)
+        self._sock.settimeout(CONNECT_TIMEOUT)
+        self._sock.connect(address)
+        self._buffer = bytearray()
+        self.known_devices = []
+        self.latency = {}  # {ip: LatencyRing}
+        self.open_services = {}
+        self.services = None  # сервисы сканирует и оповещения формирует только процесс со своим сканированием сети
+        self.alerts = None
+        self.events = queue.SimpleQueue()
+        self.connected = True
+        self._closing = False
+        hello = None
+        while hello is None:
+            data = self._sock.recv(RECV_SIZE)
+            if not data:
+                raise ConnectionError("сервер закрыл соединение до приветствия")
+            self._buffer += data
+            messages = decode(self._buffer)
+            if messages:
+                msg, fields = messages[0]
+                if msg != MSG_HELLO:
+                    raise ConnectionError("сервер не прислал приветствие")
+                hello = fields
+                self._dispatch(messages[1:])
+        self.host_ip, self.gateway_ip = (str(ipaddress.IPv4Address(raw)) for raw in hello)
+        self._sock.settimeout(None)
+
+    def start(self):
+        super().start()
+        return self
+
+    def run(self):
+        while True:
+            try:
+                data = self._sock.recv(RECV_SIZE)
+            except OSError:
+                data = b""
+            if not data:
+                if not self._closing: print("Соединение с сервером состояния потеряно.")
+                self.connected = False
+                return
+            self._buffer += data
+            try:
+                self._dispatch(decode(self._buffer))
+            except ValueError as e:
+                print(f"Ошибка протокола состояния: {e}")
+                self.connected = False
+                return
+
+    def _dispatch(self, messages):
+        for msg, fields in messages:
+            ip = str(ipaddress.IPv4Address(fields[0]))
+            if msg == MSG_PING:
+                self.events.put((MSG_PING, (ip, "success" if fields[1] else "fail",
+                                            None if fields[2] == NO_RTT else fields[2], fields[3])))
+            elif msg in _MESSAGE_EVENTS:
+                mac = _mac_text(fields[1]) if len(fields) > 1 else None
+                if mac: lookup(mac)  # производитель — в потоке приема, окну достанется из кэша
+                self.events.put((msg, (_MESSAGE_EVENTS[msg], ip, mac)))
+
+    def poll(self, limit=1024):
+        """Забирает накопившиеся изменения: (события обнаружения, результаты пингов)."""
+        events, results = [], []
+        for _ in range(limit):
+            try:
+                msg, item = self.events.get_nowait()
+            except queue.Empty:
+                break
+            if msg == MSG_PING:
+                results.append(item)
+                ip, _, rtt_us, _ = item
+                if ip not in self.latency: self.latency[ip] = LatencyRing()
+                self.latency[ip].append(rtt_us)
+            else:
+                events.append(item)
+                if item[0] == EVENT_LEAVE: self.latency.pop(item[1], None)
+        return events, results
+
+    def ping(self, ip):
+        """Просит сервер пингнуть узел; результат придет всем подписчикам."""
+        try:
+            self._sock.sendall(encode(MSG_PING_REQ, _ip_bytes(ip)))
+        except OSError:
+            pass
+
+    def stop(self):
+        self._closing = True
+        try:
+            self._sock.shutdown(socket.SHUT_RDWR)
+        except OSError:
+            pass
+        self._sock.close()
@@ -0,0 +1,64 @@
+from alerts import (AlertEngine, RULE_DEVICE_DOWN, RULE_DEVICE_UP, RULE_MAC_CHANGE, RULE_MAC_CONFLICT,
+                    RULE_NEW_DEVICE)
+from discovery import EVENT_JOIN, EVENT_LEAVE, EVENT_MAC_CHANGE
+
+
+def rules(fired):
+    return [(alert['rule'], alert['ip'], alert['mac']) for alert in fired]
+
+
+def engine(**kwargs):
+    alerts = AlertEngine(**kwargs)
+    alerts.learning = False
+    return alerts
+
+
+def test_first_sweep_is_learned_silently():
+    alerts = AlertEngine()
+    assert alerts.evaluate([(EVENT_JOIN, "10.0.0.5", "aa")]) == []
+    alerts.learning = False
+    assert rules(alerts.evaluate([(EVENT_JOIN, "10.0.0.6", "bb")])) == [(RULE_NEW_DEVICE, "10.0.0.6", "bb")]
+
+
+def test_seeded_macs_are_not_new():
+    alerts = AlertEngine()
+    alerts.seed([{'ip': "10.0.0.5", 'mac': "aa"}], known_macs={"bb"})
+    assert not alerts.learning
+    assert alerts.evaluate([(EVENT_JOIN, "10.0.0.9", "bb")]) == []
+
+
+def test_down_and_up_over_arp_carry_the_mac():
+    alerts = engine(debounce=0)
+    alerts.evaluate([(EVENT_JOIN, "10.0.0.5", "aa")])
+    assert rules(alerts.evaluate([(EVENT_LEAVE, "10.0.0.5", None)])) == [(RULE_DEVICE_DOWN, "10.0.0.5", "aa")]
+    assert rules(alerts.evaluate([(EVENT_JOIN, "10.0.0.5", "aa")])) == [(RULE_DEVICE_UP, "10.0.0.5", "aa")]
+
+
+def test_ping_failures_mark_a_device_down_once():
+    alerts = engine(down_after=3)
+    alerts.evaluate([(EVENT_JOIN, "10.0.0.5", "aa")], [("10.0.0.5", "success", 100, 0)])
+    fired = alerts.evaluate(results=[("10.0.0.5", "fail", None, 0)] * 4)
+    assert rules(fired) == [(RULE_DEVICE_DOWN, "10.0.0.5", "aa")]
+    assert rules(alerts.evaluate(results=[("10.0.0.5", "success", 100, 0)])) == [(RULE_DEVICE_UP, "10.0.0.5", "aa")]
+
+
+def test_mac_change_and_conflict():
+    alerts = engine()
+    alerts.evaluate([(EVENT_JOIN, "10.0.0.5", "aa"), (EVENT_JOIN, "10.0.0.6", "bb")])
+    assert rules(alerts.evaluate([(EVENT_MAC_CHANGE, "10.0.0.5", "bb")])) == [
+        (RULE_MAC_CHANGE, "10.0.0.5", "bb"), (RULE_MAC_CONFLICT, "10.0.0.5", "bb")]
+
+
+def test_repeats_are_debounced_and_the_debounce_map_is_pruned(monkeypatch):
+    clock = [1000.0]
+    monkeypatch.setattr("alerts.time.time", lambda: clock[0])
+    alerts = engine(debounce=60)
+    alerts.evaluate([(EVENT_JOIN, "10.0.0.5", "aa")])
+    alerts.evaluate([(EVENT_LEAVE, "10.0.0.5", None)])
+    alerts.evaluate([(EVENT_JOIN, "10.0.0.5", "aa")])
+    alerts.evaluate([(EVENT_LEAVE, "10.0.0.5", None)])
+    assert alerts.counts[RULE_DEVICE_DOWN] == 1 and alerts.suppressed == 1
+    # Через debounce старые записи удаляются при следующем оповещении
+    clock[0] += 61
+    alerts.evaluate([(EVENT_JOIN, "10.0.0.9", "cc")])
+    assert set(alerts._last) == {(RULE_NEW_DEVICE, "10.0.0.9")}
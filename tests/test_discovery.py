@@ -0,0 +1,67 @@
+import threading
+from discovery import DiscoveryEngine, EVENT_JOIN, EVENT_LEAVE, EVENT_MAC_CHANGE
+from sci_fi_monitor import apply_discovery_events
+
+HOST, GATEWAY = "10.0.0.2", "10.0.0.1"
+
+
+def sweeps(*results):
+    """scan_func, который на каждом вызове отдает следующий свип из results."""
+    queue = list(results)
+    return lambda: [{'ip': ip, 'mac': mac} for ip, mac in queue.pop(0).items()]
+
+
+def run_sweeps(engine, count):
+    for _ in range(count):
+        seen = {}
+        for dev in engine.scan_func():
+            engine._observe(dev['ip'], dev['mac'], seen)
+        engine._expire(seen)
+    return engine.drain()
+
+
+def test_join_mac_change_and_debounced_leave():
+    engine = DiscoveryEngine(sweeps({"10.0.0.5": "aa", "10.0.0.6": "bb"},
+                                    {"10.0.0.5": "cc"},
+                                    {"10.0.0.5": "cc"}), leave_after=2)
+    assert run_sweeps(engine, 1) == [(EVENT_JOIN, "10.0.0.5", "aa"), (EVENT_JOIN, "10.0.0.6", "bb")]
+    # Один пропущенный свип — еще не уход
+    assert run_sweeps(engine, 1) == [(EVENT_MAC_CHANGE, "10.0.0.5", "cc")]
+    assert run_sweeps(engine, 1) == [(EVENT_LEAVE, "10.0.0.6", None)]
+
+
+def test_seeded_devices_do_not_join_again():
+    engine = DiscoveryEngine(sweeps({"10.0.0.5": "aa"}))
+    engine.seed([{'ip': "10.0.0.5", 'mac': "aa"}])
+    assert run_sweeps(engine, 1) == []
+
+
+def test_thread_reports_sweeps_and_stops_mid_sweep():
+    stop = threading.Event()
+    finished = []
+
+    def scan():
+        yield {'ip': "10.0.0.5", 'mac': "aa"}
+        stop.set()  # остановка посреди свипа: неполный результат не записывается
+        yield {'ip': "10.0.0.6", 'mac': "bb"}
+
+    engine = DiscoveryEngine(scan, interval=0, stop_event=stop, on_sweep=lambda seen, gone: finished.append(seen))
+    engine.start()
+    engine.join(timeout=2)
+    assert not engine.is_alive()
+    assert engine.drain() == [(EVENT_JOIN, "10.0.0.5", "aa")]
+    assert finished == [] and engine.sweeps == 0
+
+
+def test_gateway_and_host_get_their_real_mac():
+    nodes = {GATEWAY: {'type': 'router', 'mac': 'N/A (Gateway)'}, HOST: {'type': 'host', 'mac': 'N/A (Host)'}}
+    added, removed = apply_discovery_events(nodes, [(EVENT_JOIN, GATEWAY, "02:00:00:00:00:01"),
+                                                    (EVENT_JOIN, HOST, "02:00:00:00:00:02"),
+                                                    (EVENT_JOIN, "10.0.0.7", "02:00:00:00:00:07")], HOST, GATEWAY)
+    assert added == ["10.0.0.7"] and removed == []
+    assert nodes[GATEWAY]['mac'] == "02:00:00:00:00:01"
+    assert nodes[HOST]['mac'] == "02:00:00:00:00:02"
+    # Шлюз и хост с карты не удаляются
+    added, removed = apply_discovery_events(nodes, [(EVENT_LEAVE, GATEWAY, None), (EVENT_LEAVE, "10.0.0.7", None)],
+                                            HOST, GATEWAY)
+    assert removed == ["10.0.0.7"] and GATEWAY in nodes
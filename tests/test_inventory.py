@@ -0,0 +1,60 @@
+import sqlite3
+from inventory import Inventory, SCHEMA_VERSION
+import inventory
+
+
+def kinds(inv):
+    return [(event['kind'], event['ip']) for event in reversed(inv.history())]
+
+
+def test_sweeps_are_recorded_as_diffs(tmp_path):
+    inv = Inventory(str(tmp_path / "inv.db"))
+    inv.record_sweep({"10.0.0.5": "aa", "10.0.0.6": "bb"}, ts=100)
+    inv.record_sweep({"10.0.0.5": "cc", "10.0.0.6": "bb"}, ts=110)
+    inv.record_sweep({"10.0.0.5": "cc"}, gone=["10.0.0.6"], ts=120)
+    assert kinds(inv) == [("new", "10.0.0.5"), ("new", "10.0.0.6"), ("changed", "10.0.0.5"), ("gone", "10.0.0.6")]
+    assert [(dev['ip'], dev['mac']) for dev in inv.snapshot()] == [("10.0.0.5", "cc")]
+    assert {"aa", "bb", "cc"} <= inv.known_macs()
+    inv.close()
+
+
+def test_returning_device_is_not_new_again(tmp_path):
+    path = str(tmp_path / "inv.db")
+    inv = Inventory(path)
+    inv.record_sweep({"10.0.0.5": "aa"}, ts=100)
+    inv.record_sweep({}, gone=["10.0.0.5"], ts=110)
+    inv.close()
+    # После перезапуска offline-устройство известно из базы
+    inv = Inventory(path)
+    inv.record_sweep({"10.0.0.5": "aa"}, ts=120)
+    assert kinds(inv) == [("new", "10.0.0.5"), ("gone", "10.0.0.5"), ("returned", "10.0.0.5")]
+    assert inv.seen_since(120)[0]['first_seen'] == 100
+    inv.close()
+
+
+def test_unchanged_devices_touch_last_seen_rarely(tmp_path):
+    inv = Inventory(str(tmp_path / "inv.db"))
+    inv.record_sweep({"10.0.0.5": "aa"}, ts=100)
+    inv.record_sweep({"10.0.0.5": "aa"}, ts=101)
+    assert inv.snapshot()[0]['last_seen'] == 100
+    inv.record_sweep({"10.0.0.5": "aa"}, ts=100 + inventory.LAST_SEEN_RESOLUTION)
+    assert inv.snapshot()[0]['last_seen'] == 100 + inventory.LAST_SEEN_RESOLUTION
+    inv.close()
+
+
+def test_vendor_backfill_runs_once(tmp_path, monkeypatch):
+    path = str(tmp_path / "old.db")
+    conn = sqlite3.connect(path)
+    conn.execute("CREATE TABLE devices (ip TEXT PRIMARY KEY, mac TEXT NOT NULL, first_seen REAL NOT NULL, "
+                 "last_seen REAL NOT NULL, online INTEGER NOT NULL DEFAULT 1)")
+    conn.execute("INSERT INTO devices VALUES ('10.0.0.5', '02:00:00:00:00:05', 1, 1, 1)")
+    conn.commit()
+    conn.close()
+    looked_up = []
+    monkeypatch.setattr(inventory, "lookup", lambda mac: looked_up.append(mac))
+    Inventory(path).close()
+    Inventory(path).close()
+    assert looked_up == ["02:00:00:00:00:05"]
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    conn.close()
@@ -0,0 +1,63 @@
+import pytest
+from layout import EXACT_LIMIT, ForceLayout, _pairwise, _repulsion, ring_positions
+
+np = pytest.importorskip("numpy")
+
+K2 = 80.0 ** 2
+
+
+def exact(pos, idx):
+    return _pairwise(pos[idx, 0], pos[idx, 1], pos[None, :, 0], pos[None, :, 1], K2)
+
+
+def relative_error(force, reference):
+    return np.hypot(*(force - reference).T) / (np.hypot(*reference.T) + 1e-9)
+
+
+@pytest.mark.parametrize("shape", ["uniform", "clusters"])
+def test_barnes_hut_matches_exact_forces(shape):
+    rng = np.random.default_rng(7)
+    if shape == "uniform":
+        pos = rng.uniform(0, 3000, (2000, 2))
+    else:
+        # Плотные кластеры: раньше они вырождались в O(n^2) внутри одной ячейки сетки
+        pos = np.concatenate([rng.normal(center, 20, (400, 2)) for center in rng.uniform(0, 3000, (5, 2))])
+    idx = rng.choice(len(pos), 256, replace=False)
+    error = relative_error(_repulsion(pos, idx, K2), exact(pos, idx))
+    assert np.median(error) < 0.01
+    assert np.percentile(error, 95) < 0.05
+
+
+def test_theta_zero_is_exact():
+    rng = np.random.default_rng(3)
+    pos = rng.uniform(0, 1000, (EXACT_LIMIT + 50, 2))
+    idx = np.arange(len(pos))
+    assert np.allclose(_repulsion(pos, idx, K2, theta=0.0), exact(pos, idx))
+
+
+def test_coincident_positions_stay_finite():
+    pos = np.zeros((EXACT_LIMIT + 100, 2))
+    pos[EXACT_LIMIT:] = np.random.default_rng(1).uniform(0, 100, (100, 2))
+    force = _repulsion(pos, np.arange(len(pos)), K2)
+    assert np.isfinite(force).all()
+
+
+def test_force_layout_settles_without_overlaps():
+    nodes = {f"10.0.{i // 250}.{i % 250 + 1}": {'pos': (0, 0)} for i in range(400)}
+    gateway = "10.0.0.1"
+    layout = ForceLayout((400, 300), (800, 600))
+    layout.place(nodes, gateway)
+    steps = 0
+    while layout.step(nodes) and steps < 5000:
+        steps += 1
+    assert not layout.active.any()
+    assert nodes[gateway]['pos'] == (400, 300)
+    pos = np.array([data['pos'] for data in nodes.values()], float)
+    d = np.hypot(*(pos[:, None] - pos[None]).transpose(2, 0, 1))
+    np.fill_diagonal(d, np.inf)
+    assert d.min() > layout.spacing * 0.2
+
+
+def test_ring_positions_are_evenly_spaced():
+    positions = ring_positions(["a", "b", "c", "d"], (0, 0), 100)
+    assert positions == {"a": (100, 0), "b": (0, 100), "c": (-100, 0), "d": (0, -100)}
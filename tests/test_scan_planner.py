@@ -0,0 +1,57 @@
+import ipaddress
+import threading
+import time
+import scan_planner
+from arp_stream import sweep_targets
+from scan_planner import RateLimiter, iter_shards, sharded_sweep
+
+
+def test_shards_of_22_cover_every_host_of_the_parent():
+    network = ipaddress.ip_network("10.0.0.0/22")
+    shards = list(iter_shards([(network, "eth0")]))
+    assert [str(shard) for shard, _, _ in shards] == ["10.0.0.0/24", "10.0.1.0/24", "10.0.2.0/24", "10.0.3.0/24"]
+    swept = [ip for shard, _, scope in shards for ip in sweep_targets(shard, scope)]
+    assert swept == [str(ip) for ip in network.hosts()]
+    assert len(swept) == 1022
+    assert {"10.0.0.255", "10.0.1.0", "10.0.1.255", "10.0.2.0", "10.0.2.255", "10.0.3.0"} <= set(swept)
+
+
+def test_small_networks_keep_their_own_addresses():
+    assert sweep_targets(ipaddress.ip_network("192.168.1.0/24")) == [f"192.168.1.{i}" for i in range(1, 255)]
+    assert sweep_targets(ipaddress.ip_network("10.0.0.4/31")) == ["10.0.0.4", "10.0.0.5"]
+
+
+def test_shards_interleave_targets():
+    targets = [(ipaddress.ip_network("10.0.0.0/23"), "eth0"), (ipaddress.ip_network("10.1.0.0/24"), "eth1")]
+    assert [(str(shard), iface) for shard, iface, _ in iter_shards(targets)] == [
+        ("10.0.0.0/24", "eth0"), ("10.1.0.0/24", "eth1"), ("10.0.1.0/24", "eth0")]
+
+
+def test_rate_limiter_spaces_reservations():
+    limiter = RateLimiter(1000)
+    slots = [limiter.reserve() for _ in range(5)]
+    assert all(b - a >= 0.001 - 1e-9 for a, b in zip(slots, slots[1:]))
+
+
+def test_waiting_shards_release_their_sending_slot(monkeypatch):
+    # Каждый шард отправляет мгновенно и ждет WAIT без ответов: ожидания должны перекрываться
+    wait, shards = 0.3, 16
+    active, peak, lock = 0, 0, threading.Lock()
+
+    def fake_sweep(ip_range, interface, on_sent=None, stop=None, **kwargs):
+        nonlocal active, peak
+        with lock:
+            active += 1
+            peak = max(peak, active)
+        on_sent()
+        time.sleep(wait)
+        with lock:
+            active -= 1
+        yield {'ip': str(ipaddress.ip_network(ip_range).network_address + 1), 'mac': "02:00:00:00:00:01", 'rtt': 0.0}
+
+    monkeypatch.setattr(scan_planner, "stream_arp_sweep", fake_sweep)
+    started = time.monotonic()
+    found = list(sharded_sweep([(ipaddress.ip_network("10.0.0.0/20"), "eth0")], workers=2))
+    assert len(found) == shards
+    assert peak > 2
+    assert time.monotonic() - started < wait * shards / 2
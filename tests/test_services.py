@@ -0,0 +1,63 @@
+import socket
+import time
+import pytest
+from bench import LocalListeners
+from services import ServiceScanner
+
+BANNER_TIMEOUT = 0.3
+
+
+def scan(ports, timeout=5.0, **kwargs):
+    """Сканирует 127.0.0.1 и возвращает ([(port, name, banner)], длительность)."""
+    scanner = ServiceScanner(ports=ports, banner_timeout=BANNER_TIMEOUT, **kwargs).start()
+    try:
+        started = time.monotonic()
+        scanner.scan("127.0.0.1")
+        while time.monotonic() - started < timeout:
+            batch = scanner.drain()
+            if batch:
+                ip, services, ts = batch[0]
+                assert ip == "127.0.0.1"
+                return services, time.monotonic() - started
+            time.sleep(0.01)
+        pytest.fail("сканер не вернул результат")
+    finally:
+        scanner.stop()
+
+
+@pytest.fixture
+def listeners():
+    lan = LocalListeners(2, banner=b"SSH-2.0-test\r\n")
+    yield lan
+    lan.close()
+
+
+def free_port():
+    """Порт, на котором заведомо никто не слушает (ядро отвечает RST)."""
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def test_detects_open_ports_and_banners(listeners):
+    closed = free_port()
+    services, _ = scan(listeners.ports + [closed])
+    assert sorted(services) == [(port, "tcp", "SSH-2.0-test") for port in sorted(listeners.ports)]
+
+
+def test_closed_port_is_not_reported_and_does_not_wait_for_timeout():
+    services, elapsed = scan([free_port()], connect_timeout=2.0)
+    assert services == []
+    assert elapsed < 2.0
+
+
+def test_silent_service_is_open_after_banner_timeout():
+    # Соединение принимается ядром из очереди listen(), но приветствия нет: ждем не дольше banner_timeout
+    with socket.socket() as server:
+        server.bind(("127.0.0.1", 0))
+        server.listen(8)
+        port = server.getsockname()[1]
+        services, elapsed = scan([port])
+    assert services == [(port, "tcp", "")]
+    assert BANNER_TIMEOUT <= elapsed < BANNER_TIMEOUT + 1.0
+
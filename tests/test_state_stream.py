@@ -0,0 +1,70 @@
+import threading
+import time
+import pytest
+from discovery import EVENT_JOIN, EVENT_LEAVE, EVENT_MAC_CHANGE
+from state_stream import (MSG_JOIN, MSG_LEAVE, MSG_PING, StatePublisher, StateSubscriber, decode,
+                          encode_event, encode_ping, parse_address)
+
+
+def test_messages_survive_arbitrary_splits():
+    stream = (encode_event(EVENT_JOIN, "10.0.0.5", "02:00:00:00:00:05")
+              + encode_event(EVENT_LEAVE, "10.0.0.6", None)
+              + encode_ping("10.0.0.5", "fail", None, 12.5))
+    for cut in range(len(stream) + 1):
+        buffer = bytearray(stream[:cut])
+        messages = decode(buffer)
+        buffer += stream[cut:]
+        messages += decode(buffer)
+        assert [msg for msg, _ in messages] == [MSG_JOIN, MSG_LEAVE, MSG_PING]
+        assert buffer == b""
+    assert messages[2][1][1:] == (False, 0xFFFFFFFF, 12.5)
+
+
+def test_unknown_message_type_is_rejected():
+    with pytest.raises(ValueError):
+        decode(bytearray(b"\xff\x00"))
+
+
+def test_parse_address_defaults_to_loopback():
+    assert parse_address(":9110")[1] == ("127.0.0.1", 9110)
+    assert parse_address("unix:/tmp/x.sock")[1] == "/tmp/x.sock"
+
+
+def wait_for(poll, count, timeout=5.0):
+    events, results = [], []
+    deadline = time.monotonic() + timeout
+    while len(events) + len(results) < count and time.monotonic() < deadline:
+        new_events, new_results = poll()
+        events += new_events
+        results += new_results
+        time.sleep(0.01)
+    return events, results
+
+
+def test_subscriber_gets_snapshot_then_deltas_and_can_request_pings(tmp_path):
+    address = f"unix:{tmp_path / 'state.sock'}"
+    pinged = threading.Event()
+    publisher = StatePublisher(address, "10.0.0.2", "10.0.0.1", lambda: {"10.0.0.5": "02:00:00:00:00:05"},
+                               on_ping=lambda ip: ip == "10.0.0.5" and pinged.set())
+    publisher.start()
+    subscriber = StateSubscriber(address).start()
+    try:
+        assert (subscriber.host_ip, subscriber.gateway_ip) == ("10.0.0.2", "10.0.0.1")
+        events, _ = wait_for(subscriber.poll, 1)
+        assert events == [(EVENT_JOIN, "10.0.0.5", "02:00:00:00:00:05")]
+
+        deadline = time.monotonic() + 5
+        while not publisher._clients and time.monotonic() < deadline:
+            time.sleep(0.01)
+        publisher.publish([(EVENT_MAC_CHANGE, "10.0.0.5", "02:00:00:00:00:06"), (EVENT_LEAVE, "10.0.0.5", None)],
+                          [("10.0.0.1", "success", 1500, 100.0)])
+        events, results = wait_for(subscriber.poll, 3)
+        assert events == [(EVENT_MAC_CHANGE, "10.0.0.5", "02:00:00:00:00:06"), (EVENT_LEAVE, "10.0.0.5", None)]
+        assert results == [("10.0.0.1", "success", 1500, 100.0)]
+        assert len(subscriber.latency["10.0.0.1"]) == 1
+
+        subscriber.ping("10.0.0.5")
+        assert pinged.wait(5)
+    finally:
+        subscriber.stop()
+        publisher.stop()
@@ -0,0 +1,140 @@
+import socket
+import threading
+import time
+from profiling import timed_import
+
+# --- Параметры захвата трафика ---
+DEFAULT_BPF = "ip"   # фильтр ядра: в Python попадают только IPv4-пакеты
+WINDOW = 1.0         # окно агрегации, с
+MAX_FLOWS = 4096     # потолок числа потоков (src, dst) в одном окне
+ETHERTYPE_IPV4 = 0x0800
+VLAN_ETHERTYPES = (0x8100, 0x88a8)  # теги 802.1Q / 802.1ad перед IPv4
+
+
+class TrafficMonitor(threading.Thread):
+    """
+    Пассивный захват трафика в отдельном потоке.
+    Пакеты сворачиваются в счетчики по потокам (src, dst) за короткое окно;
+    по закрытии окна публикуется снимок {(src, dst): (байт/с, пакетов/с)}.
+    Цикл отрисовки только читает ссылку на готовый снимок — без блокировок и очередей.
+    С pcap вместо интерфейса файл проигрывается по кругу в исходном темпе.
+    """
+
+    def __init__(self, interface=None, pcap=None, bpf=DEFAULT_BPF, window=WINDOW, max_flows=MAX_FLOWS):
+        super().__init__(name="traffic", daemon=True)
+        self.interface = interface
+        self.pcap = pcap
+        self.bpf = bpf
+        self.window = window
+        self.max_flows = max_flows
+        self.dropped = 0      # пакеты новых потоков, не поместившиеся в окно
+        self._flows = {}      # {(src, dst): [байт, пакетов]} — текущее окно, только поток захвата
+        self._window_start = time.time()
+        self._rates = {}
+        self._ip_layer = None  # scapy загружается в потоке захвата, а не при старте программы
+        self._stop_event = threading.Event()
+
+    def rates(self):
+        """Последний опубликованный снимок {(src, dst): (байт/с, пакетов/с)}."""
+        return self._rates
+
+    def run(self):
+        try:
+            self._ip_layer = timed_import("scapy.layers.inet").IP
+            if self.pcap:
+                self._replay()
+            else:
+                self._capture()
+        except Exception as e:
+            print(f"Ошибка захвата трафика: {e}")
+
+    def _capture(self):
+        sock = timed_import("scapy.config").conf.L2listen(iface=self.interface, filter=self.bpf)
+        try:
+            while not self._stop_event.is_set():
+                # Ждем не дольше конца окна, чтобы снимок публиковался и в тишине
+                timeout = max(0.0, self._window_start + self.window - time.time())
+                for ready in type(sock).select([sock], timeout):
+                    # Кадр читается байтами: полный разбор scapy на каждом пакете держал бы GIL
+                    # и отнимал время у цикла отрисовки
+                    cls, frame, _ = ready.recv_raw()
+                    if frame is None: continue
+                    if cls is not None and cls.__name__ != "Ether":
+                        self._count(cls(frame))  # не Ethernet (loopback, cooked) — редкий путь через scapy
+                    else:
+                        self._count_frame(frame)
+                self._rotate(time.time())
+        finally:
+            sock.close()
+
+    def _replay(self):
+        previous = None  # сдвиг прошлого прохода: окно переносится в новое время файла, а не сбрасывается
+        while not self._stop_event.is_set():
+            offset = None  # сдвиг времени файла относительно текущего
+            with timed_import("scapy.utils").PcapReader(self.pcap) as reader:
+                for pkt in reader:
+                    if self._stop_event.is_set(): return
+                    ts = float(pkt.time)
+                    if offset is None:
+                        offset = time.time() - ts
+                        first = ts
+                        self._window_start = ts if previous is None else self._window_start + previous - offset
+                    if self._wait_until(ts, offset): return
+                    self._rotate(ts)
+                    self._count(pkt)
+            if offset is None:
+                print(f"Файл {self.pcap} не содержит пакетов."); return
+            # Проход длится не меньше окна: файл из одного пакета (или с одной меткой времени)
+            # иначе переоткрывался бы без паузы, занимая поток и GIL
+            if self._wait_until(first + max(ts - first, self.window), offset): return
+            previous = offset
+
+    def _wait_until(self, ts, offset):
+        """
+        Ждет момента ts времени файла кусками до конца текущего окна: окна в тишине закрываются
+        вовремя, а не висят на экране старыми скоростями и не делятся потом на всю паузу.
+        Возвращает True, если поток остановлен.
+        """
+        while True:
+            delay = ts + offset - time.time()
+            if delay <= 0: return False
+            window_left = self._window_start + self.window - (time.time() - offset)
+            if self._stop_event.wait(min(delay, max(0.0, window_left))): return True
+            self._rotate(time.time() - offset)
+
+    def _count(self, pkt):
+        ip = pkt.getlayer(self._ip_layer)
+        if ip is None: return
+        self._add((ip.src, ip.dst), len(pkt))
+
+    def _count_frame(self, frame):
+        """Кадр Ethernet в байтах: из заголовков берутся только адреса IPv4, длина — весь кадр."""
+        offset = 12
+        ethertype = int.from_bytes(frame[offset:offset + 2], "big")
+        while ethertype in VLAN_ETHERTYPES:
+            offset += 4
+            ethertype = int.from_bytes(frame[offset:offset + 2], "big")
+        ip = offset + 2
+        if ethertype != ETHERTYPE_IPV4 or len(frame) < ip + 20: return
+        self._add((socket.inet_ntoa(frame[ip + 12:ip + 16]), socket.inet_ntoa(frame[ip + 16:ip + 20])), len(frame))
+
+    def _add(self, key, length):
+        flow = self._flows.get(key)
+        if flow is None:
+            if len(self._flows) >= self.max_flows:
+                self.dropped += 1
+                return
+            flow = self._flows[key] = [0, 0]
+        flow[0] += length
+        flow[1] += 1
+
+    def _rotate(self, now):
+        """Закрывает окно, если оно истекло, и публикует скорости."""
+        elapsed = now - self._window_start
+        if elapsed < self.window: return
+        self._rates = {key: (b / elapsed, n / elapsed) for key, (b, n) in self._flows.items()}
+        self._flows = {}
+        self._window_start = now
+
+    def stop(self):
+        self._stop_event.set()